@@ -0,0 +1,55 @@
+"""
+Adaptive result counts: keep the candidates that score close to the best hit
+"""
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
+
+def gap_count(scores: Sequence[float], max_gap: float) -> int:
+    """Number of (descending) scores within ``max_gap`` of the best, as a fraction of the best score"""
+    scores = np.asarray(scores, dtype=np.float64)
+    if not len(scores):
+        return 0
+    cutoff = scores[0] - max_gap * abs(scores[0])
+    return int(np.count_nonzero(scores >= cutoff))
+
+
+def elbow_count(scores: Sequence[float]) -> int:
+    """Number of (descending) scores before the largest drop between neighbours"""
+    scores = np.asarray(scores, dtype=np.float64)
+    if len(scores) < 2:
+        return len(scores)
+    return int(np.argmax(scores[:-1] - scores[1:])) + 1
+
+
+def choose_k(scores: Sequence[float], min_k: int, max_k: int, max_gap: float) -> int:
+    """How many of the ranked candidates to keep.
+
+    A candidate is kept if it scores within ``max_gap`` of the best hit or
+    ranks above the elbow (the largest drop among the first ``max_k + 1``
+    scores), so one clear hit keeps few chunks and a flat run of similar
+    scores keeps many. The count is clamped to ``[min_k, max_k]`` and to the
+    number of candidates.
+    """
+    window = np.sort(np.asarray(scores, dtype=np.float64))[::-1][:max_k + 1]
+    if not len(window):
+        return 0
+    k = max(gap_count(window, max_gap), elbow_count(window))
+    return min(max(k, min_k), max_k, len(window))
+
+
+def describe(scores: Sequence[float], k: int, limit: int = 10) -> Dict[str, Any]:
+    """Score distribution of one selection, for traces and logs"""
+    window = np.sort(np.asarray(scores, dtype=np.float64))[::-1]
+    if not len(window):
+        return {"k": 0, "candidates": 0}
+    return {
+        "k": k,
+        "candidates": len(window),
+        "top_score": round(float(window[0]), 4),
+        "kth_score": round(float(window[k - 1]), 4) if k else None,
+        "next_score": round(float(window[k]), 4) if k < len(window) else None,
+        "median_score": round(float(np.median(window)), 4),
+        "scores": [round(float(score), 4) for score in window[:limit]],
+    }
@@ -4,7 +4,91 @@ Tools for the DSM-5 multi-step agent
 from langchain.tools import BaseTool
 from langchain.pydantic_v1 import BaseModel, Field
 from typing import Optional, List, Dict, Any
+from keyword_matcher import KeywordMatcher
 import json
+import re
+
+# Keyword indicators used by the heuristic assessment
+DIAGNOSTIC_KEYWORDS = [
+    "do i have", "does my patient have", "patient has", "client has",
+    "diagnosis", "diagnose", "symptoms suggest", "signs of",
+    "my patient had", "if my patient", "think i have", "could i have"
+]
+
+SYMPTOM_INDICATORS = [
+    "feel", "feeling", "experiencing", "symptoms", "problems",
+    "difficulty", "trouble", "can't sleep", "appetite", "mood",
+    "energy", "concentration", "anxiety", "depression", "sad",
+    "worried", "panic", "restless", "hyperactive", "inattentive"
+]
+
+DURATION_INDICATORS = ["weeks", "months", "years", "days", "since", "for", "started"]
+
+# First-person or patient references mark a question as being about someone specific
+PERSONAL_REFERENCE = re.compile(r"\b(i|i'm|i've|me|my|myself|patient|client)\b", re.IGNORECASE)
+
+IMPACT_INDICATORS = ["work", "school", "relationships", "daily", "functioning", "life", "severe", "mild"]
+
+# Duration words must match whole words ("for" should not match "information")
+INDICATOR_MATCHER = KeywordMatcher({
+    "diagnostic": DIAGNOSTIC_KEYWORDS,
+    "symptom": SYMPTOM_INDICATORS,
+    "duration": DURATION_INDICATORS,
+    "impact": IMPACT_INDICATORS,
+}, whole_word=["duration"])
+
+def score_information_need(question: str, conversation_history: List[str],
+                           history_hits: Dict[str, str] = None) -> Dict[str, Any]:
+    """Keyword-based scoring of whether a question has enough detail to answer.
+    
+    ``history_hits`` may hold an already-merged ``INDICATOR_MATCHER`` scan of
+    the history (e.g. from ``ConversationState``), in which case
+    ``conversation_history`` is not rescanned.
+    
+    Returns the detected signals and the resulting action
+    (``provide_information``, ``provide_cautious_information`` or
+    ``ask_clarifying_questions``).
+    """
+    question_hits = INDICATOR_MATCHER.scan(question)
+    is_diagnostic = bool(INDICATOR_MATCHER.found(question_hits, "diagnostic"))
+    
+    # Check current question and history for symptom details
+    if history_hits is None:
+        history_hits = INDICATOR_MATCHER.scan_all(conversation_history)
+    hits = dict(question_hits)
+    for indicator, context in history_hits.items():
+        hits.setdefault(indicator, context)
+    symptoms = INDICATOR_MATCHER.found(hits, "symptom")
+    details_count = len(symptoms)
+    mentioned_details = [hits[indicator] for indicator in symptoms]
+    
+    has_duration = bool(INDICATOR_MATCHER.found(hits, "duration"))
+    has_impact = bool(INDICATOR_MATCHER.found(hits, "impact"))
+    
+    missing_aspects = []
+    if details_count < 2:
+        missing_aspects.append("specific symptoms")
+    if not has_duration:
+        missing_aspects.append("duration/timeline")
+    if not has_impact:
+        missing_aspects.append("functional impact")
+    
+    if not is_diagnostic or (details_count >= 3 and has_duration and has_impact):
+        action = "provide_information"
+    elif details_count >= 2 and (has_duration or has_impact):
+        action = "provide_cautious_information"
+    else:
+        action = "ask_clarifying_questions"
+    
+    return {
+        "is_diagnostic": is_diagnostic,
+        "details_count": details_count,
+        "mentioned_details": mentioned_details,
+        "has_duration": has_duration,
+        "has_impact": has_impact,
+        "missing_aspects": missing_aspects,
+        "action": action
+    }
 
 class AssessInformationNeedInput(BaseModel):
     """Input for assessing if more information is needed"""
@@ -19,69 +103,27 @@ class AssessInformationNeedTool(BaseTool):
     
     def _run(self, question: str, conversation_history: List[str]) -> str:
         """Assess if more information is needed"""
+        score = score_information_need(question, conversation_history)
         
-        # Check if it's a diagnostic question
-        diagnostic_keywords = [
-            "do i have", "does my patient have", "patient has", "client has",
-            "diagnosis", "diagnose", "symptoms suggest", "signs of",
-            "my patient had", "if my patient", "think i have", "could i have"
-        ]
-        
-        question_lower = question.lower()
-        is_diagnostic = any(keyword in question_lower for keyword in diagnostic_keywords)
-        
-        if not is_diagnostic:
+        if not score["is_diagnostic"]:
             return json.dumps({
                 "needs_more_info": False,
                 "reason": "Not a diagnostic question - can provide general information",
                 "action": "provide_information"
             })
         
-        # Extract symptoms/details from conversation
-        symptom_indicators = [
-            "feel", "feeling", "experiencing", "symptoms", "problems",
-            "difficulty", "trouble", "can't sleep", "appetite", "mood",
-            "energy", "concentration", "anxiety", "depression", "sad",
-            "worried", "panic", "restless", "hyperactive", "inattentive"
-        ]
-        
-        details_count = 0
-        mentioned_details = []
-        
-        # Check current question and history for symptom details
-        all_text = question + " " + " ".join(conversation_history)
-        all_text_lower = all_text.lower()
-        
-        for indicator in symptom_indicators:
-            if indicator in all_text_lower:
-                details_count += 1
-                # Extract context around the indicator
-                words = all_text_lower.split()
-                for i, word in enumerate(words):
-                    if indicator in word:
-                        context_start = max(0, i-3)
-                        context_end = min(len(words), i+4)
-                        context = " ".join(words[context_start:context_end])
-                        mentioned_details.append(context)
-                        break
-        
-        # Check for duration indicators
-        duration_indicators = ["weeks", "months", "years", "days", "since", "for", "started"]
-        has_duration = any(indicator in all_text_lower for indicator in duration_indicators)
-        
-        # Check for severity/impact indicators
-        impact_indicators = ["work", "school", "relationships", "daily", "functioning", "life", "severe", "mild"]
-        has_impact = any(indicator in all_text_lower for indicator in impact_indicators)
+        details_count = score["details_count"]
+        mentioned_details = score["mentioned_details"]
         
         # Decision logic
-        if details_count >= 3 and has_duration and has_impact:
+        if score["action"] == "provide_information":
             return json.dumps({
                 "needs_more_info": False,
                 "reason": f"Sufficient information provided: {details_count} symptoms, duration mentioned, impact described",
                 "action": "provide_information",
                 "details_found": mentioned_details[:3]
             })
-        elif details_count >= 2 and (has_duration or has_impact):
+        elif score["action"] == "provide_cautious_information":
             return json.dumps({
                 "needs_more_info": False,
                 "reason": f"Adequate information for educational response: {details_count} symptoms with context",
@@ -89,14 +131,7 @@ class AssessInformationNeedTool(BaseTool):
                 "details_found": mentioned_details[:3]
             })
         else:
-            missing_aspects = []
-            if details_count < 2:
-                missing_aspects.append("specific symptoms")
-            if not has_duration:
-                missing_aspects.append("duration/timeline")
-            if not has_impact:
-                missing_aspects.append("functional impact")
-                
+            missing_aspects = score["missing_aspects"]
             return json.dumps({
                 "needs_more_info": True,
                 "reason": f"Need more information about: {', '.join(missing_aspects)}",
@@ -177,10 +212,16 @@ class RetrieveDSM5InfoTool(BaseTool):
     name = "retrieve_dsm5_info"
     description = "Retrieves relevant information from DSM-5 knowledge base"
     args_schema = RetrieveDSM5InfoInput
+    vector_store: Any = None
+    retriever: Any = None
+    k: int = 5
+    fetch_k: int = 20
+    mmr_lambda: Optional[float] = 0.5
     
-    def __init__(self, vector_store):
-        super().__init__()
-        self.vector_store = vector_store
+    def __init__(self, vector_store, retriever=None, k: int = 5, fetch_k: int = 20, mmr_lambda: Optional[float] = 0.5):
+        # Pass the chatbot's HybridRetriever to search vectors and BM25 together; without one the
+        # vector store is searched directly, diversified by MMR unless mmr_lambda is None
+        super().__init__(vector_store=vector_store, retriever=retriever, k=k, fetch_k=fetch_k, mmr_lambda=mmr_lambda)
     
     def _run(self, query: str, context_details: List[str]) -> str:
         """Retrieve DSM-5 information"""
@@ -191,8 +232,14 @@ class RetrieveDSM5InfoTool(BaseTool):
             enhanced_query += " " + " ".join(context_details)
         
         # Retrieve relevant documents
-        retriever = self.vector_store.as_retriever(search_kwargs={"k": 5})
-        relevant_docs = retriever.get_relevant_documents(enhanced_query)
+        retriever = self.retriever
+        if retriever is None and self.mmr_lambda is None:
+            retriever = self.vector_store.as_retriever(search_kwargs={"k": self.k})
+        elif retriever is None:
+            retriever = self.vector_store.as_retriever(search_type="mmr", search_kwargs={
+                "k": self.k, "fetch_k": self.fetch_k, "lambda_mult": self.mmr_lambda
+            })
+        relevant_docs = retriever.invoke(enhanced_query)
         
         # Format the retrieved information
         context_info = []
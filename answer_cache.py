@@ -0,0 +1,183 @@
+"""
+Semantic answer cache for repeated general-information questions
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+class SemanticAnswerCache:
+    """Stores answers keyed by the embedding of the standalone question.
+
+    A lookup returns a stored answer when the cosine similarity between the
+    new question and a cached one is at least ``threshold``. When
+    ``max_entries`` is reached the least recently used entry is replaced.
+    If ``persist_path`` is set the cache is loaded from that ``.npz`` file
+    and written back at most every ``save_interval`` seconds after a change,
+    on ``save()`` and at interpreter exit, so it survives restarts without
+    rewriting the whole file on every answer.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 500,
+                 persist_path: Optional[str] = None, save_interval: float = 30.0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_saved = time.monotonic()
+
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: List[Dict[str, Any]] = []
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._clock = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if persist_path:
+            if os.path.exists(persist_path):
+                self.load()
+            atexit.register(self.save)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query_vector) -> Optional[Dict[str, Any]]:
+        """Return the closest cached answer above the threshold, if any"""
+        query = self._normalize(query_vector)
+        with self._lock:
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            scores = self._vectors[: len(self._entries)] @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self._clock += 1
+            self._last_used[best] = self._clock
+            self.hits += 1
+            entry = self._entries[best]
+
+        return {
+            "question": entry["question"],
+            "answer": entry["answer"],
+            "sources": [Document(**source) for source in entry["sources"]],
+            "similarity": float(scores[best]),
+        }
+
+    def add(self, question: str, query_vector, answer: str, sources: List[Document]):
+        """Cache an answer, evicting the least recently used entry when full"""
+        vector = self._normalize(query_vector)
+        entry = {
+            "question": question,
+            "answer": answer,
+            "sources": [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in sources],
+        }
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+
+            if len(self._entries) < self.max_entries:
+                slot = len(self._entries)
+                self._entries.append(entry)
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._entries[slot] = entry
+                self.evictions += 1
+
+            self._vectors[slot] = vector
+            self._clock += 1
+            self._last_used[slot] = self._clock
+            self._dirty = True
+
+        if self.persist_path and time.monotonic() - self._last_saved >= self.save_interval:
+            # Another thread already writing will pick up this entry on the next save
+            if self._save_lock.acquire(blocking=False):
+                try:
+                    self._write()
+                finally:
+                    self._save_lock.release()
+
+    def clear(self):
+        """Drop every entry, including the persisted copy"""
+        with self._save_lock, self._lock:
+            self._vectors = None
+            self._entries = []
+            self._last_used[:] = 0
+            self._dirty = False
+            if self.persist_path and os.path.exists(self.persist_path):
+                os.remove(self.persist_path)
+
+    def save(self):
+        """Write pending changes to ``persist_path`` now"""
+        if self.persist_path:
+            with self._save_lock:
+                self._write()
+
+    def _write(self):
+        """Atomically replace ``persist_path`` with the current entries (caller holds ``_save_lock``)"""
+        with self._lock:
+            if not self._dirty or self._vectors is None:
+                return
+            count = len(self._entries)
+            vectors = self._vectors[:count].copy()
+            entries = json.dumps(self._entries)
+            last_used = self._last_used[:count].copy()
+            self._dirty = False
+            self._last_saved = time.monotonic()
+
+        directory = os.path.dirname(os.path.abspath(self.persist_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp.npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, vectors=vectors, entries=np.array(entries), last_used=last_used)
+            os.replace(tmp_path, self.persist_path)
+        except BaseException:
+            os.remove(tmp_path)
+            with self._lock:
+                self._dirty = True
+            raise
+
+    def load(self):
+        with np.load(self.persist_path, allow_pickle=False) as data:
+            vectors = data["vectors"][: self.max_entries]
+            entries = json.loads(str(data["entries"]))[: self.max_entries]
+            last_used = data["last_used"][: self.max_entries]
+
+        with self._lock:
+            self._vectors = np.zeros((self.max_entries, vectors.shape[1]), dtype=np.float32)
+            self._vectors[: len(vectors)] = vectors
+            self._entries = entries
+            self._last_used[: len(last_used)] = last_used
+            self._clock = int(last_used.max()) if len(last_used) else 0
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
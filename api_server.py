@@ -0,0 +1,231 @@
+"""
+ASGI HTTP service for the DSM-5 chatbot with per-client sessions
+
+    uvicorn api_server:create_app --factory --host 0.0.0.0 --port 8000
+
+Endpoints:
+    POST   /chat                          {"question": ..., "session_id": ...} -> response JSON
+    POST   /chat/stream                   same body -> newline-delimited JSON events
+    DELETE /sessions/{session_id}         clear a session
+    GET    /sessions/{session_id}/summary conversation summary
+    GET    /health                        session, assessor, retrieval, LLM limiter and per-stage latency stats
+
+Clients identify their conversation with ``session_id`` in the body or an
+``X-Session-ID`` header; when neither is given a new id is issued and
+returned in the ``X-Session-ID`` response header.
+"""
+import asyncio
+import json
+import os
+import threading
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.pydantic_v1 import PrivateAttr
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from rag_chatbot import DSM5Chatbot
+
+
+class ConcurrencyLimitedChatModel(BaseChatModel):
+    """Chat model wrapper that caps in-flight calls to the underlying model.
+
+    Async calls (and whole streams) wait on an asyncio semaphore, sync calls
+    on a thread semaphore of the same size, so a burst of users queues in
+    the service instead of tripping the provider's rate limits.
+    """
+    llm: Any  # not BaseChatModel: pydantic would validate it into a copy
+    max_concurrency: int = 16
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    calls: int = 0
+    _async_slots: Any = PrivateAttr(default=None)
+    _sync_slots: Any = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default=None)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._async_slots = asyncio.Semaphore(self.max_concurrency)
+        self._sync_slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+
+    @property
+    def _llm_type(self) -> str:
+        return f"limited-{self.llm._llm_type}"
+
+    def _enter(self):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        with self._sync_slots:
+            self._enter()
+            try:
+                return self.llm._generate(messages, stop=stop, **kwargs)
+            finally:
+                self._exit()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        async with self._async_slots:
+            self._enter()
+            try:
+                return await self.llm._agenerate(messages, stop=stop, **kwargs)
+            finally:
+                self._exit()
+
+    def _streams(self) -> bool:
+        return type(self.llm)._stream is not BaseChatModel._stream
+
+    @staticmethod
+    def _as_chunk(result: ChatResult) -> ChatGenerationChunk:
+        return ChatGenerationChunk(message=AIMessageChunk(content=result.generations[0].message.content))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        if not self._streams():
+            yield self._as_chunk(self._generate(messages, stop=stop, **kwargs))
+            return
+        with self._sync_slots:
+            self._enter()
+            try:
+                for chunk in self.llm._stream(messages, stop=stop, **kwargs):
+                    if run_manager:
+                        run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                    yield chunk
+            finally:
+                self._exit()
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        if not self._streams():
+            yield self._as_chunk(await self._agenerate(messages, stop=stop, **kwargs))
+            return
+        async with self._async_slots:
+            self._enter()
+            try:
+                async for chunk in self.llm._astream(messages, stop=stop, **kwargs):
+                    if run_manager:
+                        await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                    yield chunk
+            finally:
+                self._exit()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "calls": self.calls,
+        }
+
+
+def serialize_response(response: Dict) -> Dict:
+    """JSON-safe copy of a chat response (sources become content + metadata)"""
+    return {
+        **response,
+        "sources": [
+            {"content": doc.page_content, "metadata": doc.metadata}
+            for doc in response.get("sources", [])
+        ],
+    }
+
+
+def _serialize_event(event: Dict) -> Dict:
+    if event["type"] == "sources":
+        return serialize_response(event)
+    if event["type"] == "done":
+        return {"type": "done", "response": serialize_response(event["response"])}
+    return event
+
+
+async def _read_turn(request: Request):
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        body = None
+    if not isinstance(body, dict) or not str(body.get("question", "")).strip():
+        return None, None
+    session_id = body.get("session_id") or request.headers.get("x-session-id") or uuid.uuid4().hex
+    return body["question"], session_id
+
+
+def create_app(chatbot: DSM5Chatbot = None, llm_concurrency: int = None) -> Starlette:
+    """Build the ASGI app around a chatbot whose LLM calls are concurrency-limited"""
+    chatbot = chatbot or DSM5Chatbot()
+    if llm_concurrency is None:
+        llm_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    if not isinstance(chatbot.llm, ConcurrencyLimitedChatModel):
+        chatbot.llm = ConcurrencyLimitedChatModel(llm=chatbot.llm, max_concurrency=llm_concurrency)
+        chatbot.setup_chains()
+
+    async def chat(request: Request):
+        question, session_id = await _read_turn(request)
+        if question is None:
+            return JSONResponse({"error": "question is required"}, status_code=400)
+        response = await chatbot.achat(question, session_id)
+        return JSONResponse({**serialize_response(response), "session_id": session_id},
+                            headers={"X-Session-ID": session_id})
+
+    async def chat_stream(request: Request):
+        question, session_id = await _read_turn(request)
+        if question is None:
+            return JSONResponse({"error": "question is required"}, status_code=400)
+
+        async def lines():
+            async for event in chatbot.achat_stream(question, session_id):
+                yield json.dumps(_serialize_event(event)) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson",
+                                 headers={"X-Session-ID": session_id})
+
+    async def clear_session(request: Request):
+        await run_in_threadpool(chatbot.clear_memory, request.path_params["session_id"])
+        return JSONResponse({"cleared": request.path_params["session_id"]})
+
+    async def summary(request: Request):
+        session_id = request.path_params["session_id"]
+        # Persisted sessions evicted from memory are restored by get_session_history
+        if not await run_in_threadpool(chatbot.store.exists, session_id):
+            return JSONResponse({"error": "unknown session"}, status_code=404)
+        return JSONResponse(await run_in_threadpool(chatbot.get_conversation_summary, session_id))
+
+    async def health(request: Request):
+        return JSONResponse({
+            "status": "ok",
+            "sessions": chatbot.store.stats(),
+            "assessor": chatbot.assessor.stats() if chatbot.assessor else None,
+            "llm": chatbot.llm.stats(),
+            "retrieval": chatbot.retriever.stats(),
+            "context": chatbot.context_packer.stats(),
+            "traces": chatbot.trace_histograms.stats(),
+        })
+
+    app = Starlette(routes=[
+        Route("/chat", chat, methods=["POST"]),
+        Route("/chat/stream", chat_stream, methods=["POST"]),
+        Route("/sessions/{session_id}", clear_session, methods=["DELETE"]),
+        Route("/sessions/{session_id}/summary", summary, methods=["GET"]),
+        Route("/health", health, methods=["GET"]),
+    ])
+    app.state.chatbot = chatbot
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(create_app(), host=os.getenv("API_HOST", "127.0.0.1"), port=int(os.getenv("API_PORT", "8000")))
@@ -28,7 +28,9 @@ def main():
     st.markdown("Ask questions about mental health diagnoses based on DSM-5 content.")
     
     # Check if required environment variables are set
-    required_vars = ["OPENAI_API_KEY", "SUPABASE_URL", "SUPABASE_KEY"]
+    required_vars = ["OPENAI_API_KEY"]
+    if os.getenv("VECTOR_STORE_BACKEND", "supabase") == "supabase":
+        required_vars += ["SUPABASE_URL", "SUPABASE_KEY"]
     missing_vars = [var for var in required_vars if not os.getenv(var)]
     
     if missing_vars:
@@ -46,8 +48,13 @@ def main():
             with st.spinner("Downloading and processing DSM-5... This may take several minutes..."):
                 try:
                     chatbot = init_chatbot()
-                    chatbot.add_documents()
+                    report = chatbot.add_documents()
                     st.success("✅ DSM-5 content loaded successfully!")
+                    cache = report.get("embedding_cache", {})
+                    st.caption(
+                        f"{report['upserted']} chunks in {report['elapsed_seconds']}s · "
+                        f"Embedding cache: {cache.get('hits', 0)} hits, {cache.get('misses', 0)} new embeddings"
+                    )
                 except Exception as e:
                     st.error(f"❌ Error loading DSM-5: {str(e)}")
         
@@ -95,48 +102,90 @@ def main():
         
         # Get bot response
         with st.chat_message("assistant"):
+            # Use session ID for conversation continuity
+            session_id = "streamlit_session"
+            # Sync stream: the cached chatbot's async clients must not outlive a per-run event loop
+            events = chatbot.chat_stream(prompt, session_id)
+            response = {}
+            
+            def answer_tokens(first_token):
+                yield first_token
+                for event in events:
+                    if event["type"] == "token":
+                        yield event["content"]
+                    elif event["type"] == "done":
+                        response.update(event["response"])
+            
+            # The spinner only covers the wait for the first answer token
             with st.spinner("Analyzing your question..."):
-                # Use session ID for conversation continuity
-                session_id = "streamlit_session"
-                response = chatbot.chat(prompt, session_id)
+                for event in events:
+                    if event["type"] == "assessment":
+                        # Show status indicators based on assessment
+                        if event["assessment"] == "ASK_CLARIFYING":
+                            st.info("🤔 I need to understand your situation better before providing information. Let me ask some clarifying questions.")
+                        elif event["assessment"] in ["PROVIDE_INFO", "PROVIDE_CAUTIOUS"]:
+                            st.warning("⚠️ Remember: This is educational information only. Please consult a qualified mental health professional for proper evaluation and diagnosis.")
+                    elif event["type"] in ("token", "done"):
+                        break
+            
+            if event["type"] == "token":
+                st.write_stream(answer_tokens(event["content"]))
+            else:
+                response.update(event["response"])
+                st.markdown(response["answer"])
+            events.close()
+            
+            answer = response["answer"]
+            sources = response["sources"]
+            needs_more_info = response.get("needs_more_info", False)
+            assessment = response.get("assessment", "")
+            action_taken = response.get("action_taken", "")
+            cache_hit = response.get("cache_hit", False)
+            
+            if cache_hit:
+                st.caption("⚡ Answered from cache")
+            
+            # Show sources if available and not just asking clarifying questions
+            if sources and not needs_more_info:
+                with st.expander("📚 DSM-5 Sources"):
+                    for i, source in enumerate(sources[:3]):  # Show top 3 sources
+                        st.markdown(f"**Source {i+1}:**")
+                        st.markdown(source.page_content[:300] + "...")
+                        if hasattr(source, 'metadata') and 'page' in source.metadata:
+                            st.markdown(f"*Page: {source.metadata['page']}*")
+                        st.markdown("---")
+            
+            # Show conversation progress
+            summary = chatbot.get_conversation_summary(session_id)
+            
+            with st.expander("💬 Conversation Analysis"):
+                st.write(f"**Assessment:** {assessment}")
+                st.write(f"**Action Taken:** {action_taken}")
+                st.write(f"**Messages exchanged:** {summary['total_messages']}")
+                st.write(f"**User messages:** {summary['user_messages']}")
+                st.write(f"**Symptom mentions:** {summary['symptom_mentions']}")
+                packing = response.get("context_packing")
+                if packing:
+                    st.write(f"**Context:** {packing['tokens_after']} prompt tokens "
+                             f"({packing['tokens_saved']} saved by merging and deduplicating sources)")
+                timings = response.get("timings", {})
+                if timings:
+                    st.write("**Timings:** " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
+                trace = response.get("trace")
+                if trace and trace["spans"]:
+                    st.write(f"**Stage breakdown** ({trace['total_ms']:.0f} ms total):")
+                    st.table([{
+                        "stage": span["name"],
+                        "start (ms)": round(span["start_ms"]),
+                        "duration (ms)": round(span["duration_ms"]),
+                        "prompt tokens": span.get("prompt_tokens", ""),
+                        "completion tokens": span.get("completion_tokens", ""),
+                        "docs": span.get("docs", span.get("k", "")),
+                    } for span in trace["spans"]])
                 
-                answer = response["answer"]
-                sources = response["sources"]
-                needs_more_info = response.get("needs_more_info", False)
-                assessment = response.get("assessment", "")
-                action_taken = response.get("action_taken", "")
-                
-                # Show status indicators based on assessment
-                if assessment == "ASK_CLARIFYING":
-                    st.info("🤔 I need to understand your situation better before providing information. Let me ask some clarifying questions.")
-                elif assessment in ["PROVIDE_INFO", "PROVIDE_CAUTIOUS"]:
-                    st.warning("⚠️ Remember: This is educational information only. Please consult a qualified mental health professional for proper evaluation and diagnosis.")
-                
-                st.markdown(answer)
-                
-                # Show sources if available and not just asking clarifying questions
-                if sources and not needs_more_info:
-                    with st.expander("📚 DSM-5 Sources"):
-                        for i, source in enumerate(sources[:3]):  # Show top 3 sources
-                            st.markdown(f"**Source {i+1}:**")
-                            st.markdown(source.page_content[:300] + "...")
-                            if hasattr(source, 'metadata') and 'page' in source.metadata:
-                                st.markdown(f"*Page: {source.metadata['page']}*")
-                            st.markdown("---")
-                
-                # Show conversation progress
-                summary = chatbot.get_conversation_summary(session_id)
-                
-                with st.expander("💬 Conversation Analysis"):
-                    st.write(f"**Assessment:** {assessment}")
-                    st.write(f"**Action Taken:** {action_taken}")
-                    st.write(f"**Messages exchanged:** {summary['total_messages']}")
-                    st.write(f"**User messages:** {summary['user_messages']}")
-                    st.write(f"**Symptom mentions:** {summary['symptom_mentions']}")
-                    
-                    if not summary['has_enough_context'] and assessment == "ASK_CLARIFYING":
-                        st.info("💡 Providing more details about symptoms, their duration, and impact will help me give you more relevant information.")
-        
+                if not summary['has_enough_context'] and assessment == "ASK_CLARIFYING":
+                    st.info("💡 Providing more details about symptoms, their duration, and impact will help me give you more relevant information.")
+    
         # Add assistant response
         st.session_state.messages.append({"role": "assistant", "content": answer})
     
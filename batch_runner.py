@@ -0,0 +1,191 @@
+"""
+Replay a JSONL file of logged questions through the chatbot, many sessions at once
+
+Each input line is a turn: ``{"session_id": ..., "question": ...}`` (other
+fields, e.g. an ``id``, are copied to the output). Turns of one session run
+in file order; independent sessions run concurrently on ``--workers``
+workers. Every finished turn is appended to the output JSONL with its
+answer, assessment, sources and timings, so an interrupted run can be
+continued with ``--resume``:
+
+    python batch_runner.py questions.jsonl answers.jsonl --workers 8
+    python batch_runner.py questions.jsonl answers.jsonl --workers 8 --resume
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+OUTPUT_FIELDS = ("answer", "assessment", "action_taken", "needs_more_info", "cache_hit", "timings")
+
+
+def read_turns(path: str) -> Dict[str, List[Dict]]:
+    """Turns grouped by session, in file order (a line without ``session_id`` is its own session)"""
+    sessions: Dict[str, List[Dict]] = {}
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            turn = json.loads(line)
+            if not turn.get("question"):
+                raise ValueError(f"{path}:{number}: turn has no question")
+            session_id = str(turn.get("session_id") or f"line-{number}")
+            sessions.setdefault(session_id, []).append({**turn, "session_id": session_id})
+    return sessions
+
+
+def completed_turns(path: str, sessions: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+    """Results already in ``path``: per session, the leading turns that finished without error.
+
+    A turn after a failed or missing one ran on an incomplete history, so it
+    is run again; so are turns whose question no longer matches the input.
+    A line cut off by an interrupted write is ignored.
+    """
+    results: Dict[str, Dict[int, Dict]] = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                results.setdefault(str(record["session_id"]), {})[record["turn"]] = record
+
+    completed = {}
+    for session_id, turns in sessions.items():
+        done = []
+        for index, turn in enumerate(turns):
+            record = results.get(session_id, {}).get(index)
+            if record is None or record.get("error") or record["question"] != turn["question"]:
+                break
+            done.append(record)
+        completed[session_id] = done
+    return completed
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+class BatchRunner:
+    """Runs sessions of turns through ``DSM5Chatbot.achat`` with a bounded worker pool.
+
+    Sessions are replayed under ``batch:<session_id>`` so they never mix
+    with live conversations, starting from an empty history (or the history
+    of their already completed turns when resuming).
+    """
+
+    def __init__(self, chatbot, workers: int = 8, progress_every: int = 25):
+        self.chatbot = chatbot
+        self.workers = workers
+        self.progress_every = progress_every
+
+    @staticmethod
+    def _record(turn: Dict, index: int, response: Dict) -> Dict:
+        record = {**turn, "turn": index, **{field: response.get(field) for field in OUTPUT_FIELDS}}
+        record["sources"] = [{"content": doc.page_content, "metadata": doc.metadata}
+                             for doc in response.get("sources") or []]
+        if response.get("assessment") == "ERROR":
+            record["error"] = response["answer"]
+        return record
+
+    async def _run_session(self, session_id: str, turns: List[Dict], done: List[Dict], write, stats: Dict):
+        key = f"batch:{session_id}"
+        self.chatbot.clear_memory(key)
+        history = self.chatbot.get_session_history(key)
+        for record in done:
+            history.add_user_message(record["question"])
+            history.add_ai_message(record["answer"])
+
+        for index in range(len(done), len(turns)):
+            turn = turns[index]
+            record = self._record(turn, index, await self.chatbot.achat(turn["question"], key))
+            write(record)
+            stats["run"] += 1
+            stats["errors"] += "error" in record
+            stats["assessments"][record["assessment"]] += 1
+            stats["latencies"].append((record["timings"] or {}).get("total", 0.0))
+            if stats["run"] % self.progress_every == 0:
+                print(f"📝 {stats['run']}/{stats['pending']} turns answered ({stats['errors']} errors)")
+        self.chatbot.clear_memory(key)
+
+    async def run(self, sessions: Dict[str, List[Dict]], output_path: str, resume: bool = False) -> Dict:
+        """Answer every turn not yet in ``output_path`` and return a summary report"""
+        completed = completed_turns(output_path, sessions) if resume else {session_id: [] for session_id in sessions}
+        # Keep only the results that stand; the rest are run again and re-appended
+        with open(output_path + ".tmp", "w", encoding="utf-8") as f:
+            for records in completed.values():
+                for record in records:
+                    f.write(json.dumps(record, default=str) + "\n")
+        os.replace(output_path + ".tmp", output_path)
+
+        resumed = sum(len(records) for records in completed.values())
+        total = sum(len(turns) for turns in sessions.values())
+        stats = {"run": 0, "errors": 0, "pending": total - resumed, "assessments": Counter(), "latencies": []}
+        queue: asyncio.Queue = asyncio.Queue()
+        for session_id, turns in sessions.items():
+            if len(completed[session_id]) < len(turns):
+                queue.put_nowait(session_id)
+
+        with open(output_path, "a", encoding="utf-8") as output:
+            def write(record: Dict):
+                output.write(json.dumps(record, default=str) + "\n")
+                output.flush()
+
+            async def worker():
+                while not queue.empty():
+                    session_id = queue.get_nowait()
+                    await self._run_session(session_id, sessions[session_id], completed[session_id], write, stats)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(max(1, self.workers))))
+            elapsed = time.perf_counter() - started
+
+        latencies = stats["latencies"]
+        return {
+            "sessions": len(sessions),
+            "turns": total,
+            "resumed": resumed,
+            "run": stats["run"],
+            "errors": stats["errors"],
+            "workers": self.workers,
+            "elapsed_seconds": round(elapsed, 3),
+            "turns_per_sec": round(stats["run"] / elapsed, 2) if elapsed else 0.0,
+            "latency_p50": round(_percentile(latencies, 50), 4),
+            "latency_p95": round(_percentile(latencies, 95), 4),
+            "latency_max": round(max(latencies, default=0.0), 4),
+            "assessments": dict(stats["assessments"]),
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of {session_id, question} turns")
+    parser.add_argument("output", help="JSONL file the answers are appended to")
+    parser.add_argument("--workers", type=int, default=8, help="Sessions answered concurrently")
+    parser.add_argument("--resume", action="store_true", help="Skip turns already answered in the output")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.output) and not args.resume:
+        print(f"❌ {args.output} already exists; pass --resume to continue that run or remove it")
+        sys.exit(1)
+
+    sessions = read_turns(args.input)
+    from rag_chatbot import DSM5Chatbot
+    runner = BatchRunner(DSM5Chatbot(), workers=args.workers)
+    print(f"🚀 {sum(map(len, sessions.values()))} turns in {len(sessions)} sessions on {args.workers} workers")
+    report = asyncio.run(runner.run(sessions, args.output, resume=args.resume))
+    print(f"✅ Answered {report['run']} turns ({report['resumed']} already done, {report['errors']} errors) "
+          f"in {report['elapsed_seconds']}s")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+Offline micro-benchmarks (run with ``python -m benchmarks.<name>``)
+"""
@@ -0,0 +1,64 @@
+"""
+Micro-benchmark: keyword assessment cost per turn as a conversation grows to 100 turns
+
+    python -m benchmarks.bench_keyword_matcher
+"""
+import random
+import time
+
+from agent_tools import DIAGNOSTIC_KEYWORDS, DURATION_INDICATORS, IMPACT_INDICATORS, SYMPTOM_INDICATORS
+from agent_tools import score_information_need
+
+FILLER = ("the", "and", "it", "was", "really", "then", "we", "talked", "about", "that", "again", "today")
+
+
+def legacy_score(question, conversation_history):
+    """The previous implementation: joins and rescans the whole history per indicator"""
+    question_lower = question.lower()
+    is_diagnostic = any(keyword in question_lower for keyword in DIAGNOSTIC_KEYWORDS)
+    details_count = 0
+    mentioned_details = []
+    all_text_lower = (question + " " + " ".join(conversation_history)).lower()
+    for indicator in SYMPTOM_INDICATORS:
+        if indicator in all_text_lower:
+            details_count += 1
+            words = all_text_lower.split()
+            for i, word in enumerate(words):
+                if indicator in word:
+                    mentioned_details.append(" ".join(words[max(0, i-3):min(len(words), i+4)]))
+                    break
+    has_duration = any(indicator in all_text_lower for indicator in DURATION_INDICATORS)
+    has_impact = any(indicator in all_text_lower for indicator in IMPACT_INDICATORS)
+    return is_diagnostic, details_count, mentioned_details, has_duration, has_impact
+
+
+def make_message(rng, words=40):
+    vocabulary = FILLER * 4 + tuple(SYMPTOM_INDICATORS) + tuple(IMPACT_INDICATORS) + ("weeks", "months")
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def time_per_call(fn, question, history, repeats=20):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(question, history)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main(turns=100, checkpoints=(1, 10, 25, 50, 100)):
+    rng = random.Random(0)
+    question = "Do I have depression? I feel sad and have trouble sleeping for weeks"
+    history = []
+
+    print(f"{'turns':>6} {'legacy ms':>10} {'matcher ms':>11} {'speedup':>8}")
+    for turn in range(1, turns + 1):
+        history.append(make_message(rng))
+        # Each turn scores the conversation so far, as the chatbot does
+        score_information_need(question, history)
+        if turn in checkpoints:
+            legacy = time_per_call(legacy_score, question, history)
+            matcher = time_per_call(score_information_need, question, history)
+            print(f"{turn:>6} {legacy:>10.3f} {matcher:>11.3f} {legacy / matcher:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Micro-benchmark: MMR diversification cost per query over fetch_k candidates of 1536-d embeddings
+
+    python -m benchmarks.bench_mmr
+"""
+import time
+
+import numpy as np
+from langchain_community.vectorstores.utils import maximal_marginal_relevance as langchain_mmr
+
+from mmr import maximal_marginal_relevance
+
+DIM = 1536  # text-embedding-ada-002
+
+
+def make_candidates(rng, fetch_k, dim=DIM):
+    """Candidates in small clusters of near-duplicates, like criteria repeated on consecutive pages"""
+    query = rng.standard_normal(dim).astype(np.float32)
+    centers = rng.standard_normal((max(1, fetch_k // 4), dim)).astype(np.float32) + query
+    candidates = centers[np.arange(fetch_k) % len(centers)]
+    return query, candidates + 0.1 * rng.standard_normal((fetch_k, dim)).astype(np.float32)
+
+
+def time_per_call(fn, repeats=200):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times)), float(np.percentile(times, 99))
+
+
+def main(k=5, lambda_mult=0.7, sizes=(20, 50, 100), budget_ms=1.0):
+    rng = np.random.default_rng(0)
+    medians = {}
+    print(f"{'fetch_k':>8} {'numpy p50 ms':>13} {'p99 ms':>8} {'langchain p50 ms':>17} {'speedup':>8}")
+    for fetch_k in sizes:
+        query, candidates = make_candidates(rng, fetch_k)
+        ours, ours_p99 = time_per_call(lambda: maximal_marginal_relevance(query, candidates, k, lambda_mult))
+        theirs, _ = time_per_call(lambda: langchain_mmr(query, list(candidates), lambda_mult, k))
+        print(f"{fetch_k:>8} {ours:>13.3f} {ours_p99:>8.3f} {theirs:>17.3f} {theirs / ours:>7.1f}x")
+        medians[fetch_k] = ours
+    if 50 in medians:
+        verdict = "✅" if medians[50] < budget_ms else "⚠️"
+        print(f"{verdict} fetch_k=50: {medians[50]:.3f} ms median (budget {budget_ms} ms)")
+
+
+if __name__ == "__main__":
+    main()
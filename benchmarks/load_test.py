@@ -0,0 +1,108 @@
+"""
+Load test for the ASGI chat service
+
+Simulates many concurrent users, each holding its own session, against
+either an in-process app built on fakes (default, no API keys) or a running
+server:
+
+    python -m benchmarks.load_test --users 50 --turns 3 --llm-latency 0.2
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --users 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+import httpx
+
+QUESTIONS = [
+    "What are the DSM-5 criteria for major depressive disorder?",
+    "How is generalized anxiety disorder defined?",
+    "Do I have depression?",
+    "I've been feeling anxious lately",
+    "What is the difference between bipolar I and bipolar II?",
+    "My patient has trouble sleeping and low energy for months, affecting work. Could it be depression?",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def simulate_user(client: httpx.AsyncClient, user: int, turns: int, latencies: List[float],
+                        errors: List[str], rng: random.Random):
+    session_id = f"load-user-{user}"
+    for _ in range(turns):
+        question = rng.choice(QUESTIONS)
+        started = time.perf_counter()
+        reply = await client.post("/chat", json={"question": question, "session_id": session_id})
+        latencies.append(time.perf_counter() - started)
+        if reply.status_code != 200 or reply.json().get("assessment") == "ERROR":
+            errors.append(reply.text[:200])
+
+
+async def run_load(client: httpx.AsyncClient, users: int, turns: int, seed: int = 0) -> Dict:
+    rng = random.Random(seed)
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(simulate_user(client, user, turns, latencies, errors, rng) for user in range(users)))
+    elapsed = time.perf_counter() - started
+    health = (await client.get("/health")).json()
+    return {
+        "users": users,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_p50": round(percentile(latencies, 50), 4),
+        "latency_p95": round(percentile(latencies, 95), 4),
+        "latency_max": round(max(latencies, default=0.0), 4),
+        "llm": health.get("llm"),
+        "sessions": health.get("sessions", {}).get("sessions"),
+    }
+
+
+async def run_in_process(users: int, turns: int, llm_latency: float, token_latency: float,
+                         llm_concurrency: int) -> Dict:
+    from api_server import create_app
+    from fakes import build_fake_chatbot
+
+    with tempfile.TemporaryDirectory() as workdir:
+        chatbot = build_fake_chatbot(workdir, latency=llm_latency, token_latency=token_latency)
+        app = create_app(chatbot, llm_concurrency=llm_concurrency)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            return await run_load(client, users, turns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process fakes)")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fake LLM round trip (seconds)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Fake LLM per-token delay (seconds)")
+    parser.add_argument("--llm-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"🚀 {args.users} users x {args.turns} turns against {args.url or 'in-process fakes'}")
+    if args.url:
+        async def remote():
+            async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+                return await run_load(client, args.users, args.turns)
+        report = asyncio.run(remote())
+    else:
+        report = asyncio.run(run_in_process(args.users, args.turns, args.llm_latency,
+                                            args.token_latency, args.llm_concurrency))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Offline end-to-end benchmark suite: chat latency per path, ingest throughput and memory growth
+
+Builds DSM5Chatbot against the local fakes (fake LLM, fake embeddings, local
+vector store; no API keys), writes JSON results and compares them against a
+stored baseline:
+
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --output results.json
+
+Exits with status 1 when a metric regressed by more than --tolerance.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+from benchmarks.load_test import percentile
+
+CLARIFYING_QUESTIONS = [
+    "Do I have depression?",
+    "Does my patient have bipolar disorder?",
+    "Could I have ADHD?",
+]
+
+RAG_QUESTIONS = [
+    "What are the DSM-5 criteria for major depressive disorder?",
+    "How is generalized anxiety disorder defined?",
+    "What is the difference between bipolar I and bipolar II?",
+]
+
+# Unmeasured turns per path first, so one-off setup (lazy imports, caches) isn't timed
+WARMUP_TURNS = 5
+
+# Metrics where a larger value is better; every other metric is better when smaller
+HIGHER_IS_BETTER = ("_per_sec",)
+
+
+def _quiet():
+    """Silence the pipeline's progress prints while measuring"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def _latency_stats(seconds: List[float]) -> Dict[str, float]:
+    ms = [value * 1000 for value in seconds]
+    return {
+        "turns": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p90_ms": round(percentile(ms, 90), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "max_ms": round(max(ms, default=0.0), 3),
+    }
+
+
+def chat_path(response: Dict[str, Any]) -> str:
+    if response.get("needs_more_info"):
+        return "clarifying"
+    return "cache" if response.get("cache_hit") else "rag"
+
+
+def bench_chat(chatbot, turns: int) -> Dict[str, Dict[str, float]]:
+    """Per-turn latency of ``chat``, grouped by the path each turn took"""
+    latencies: Dict[str, List[float]] = {}
+    for turn in range(-WARMUP_TURNS, turns):
+        for kind, questions in (("clarifying", CLARIFYING_QUESTIONS), ("rag", RAG_QUESTIONS)):
+            # A fresh session per turn, so every turn takes the path its question asks for
+            session_id = f"bench-{kind}-{turn}"
+            started = time.perf_counter()
+            response = chatbot.chat(questions[turn % len(questions)], session_id)
+            if turn >= 0:
+                latencies.setdefault(chat_path(response), []).append(time.perf_counter() - started)
+    return {path: _latency_stats(values) for path, values in sorted(latencies.items())}
+
+
+def _sample_chunks(corpus_copies: int):
+    from dsm5_splitter import DSM5StructureSplitter
+    from fakes import sample_dsm5_pages
+
+    pages = [page for seed in range(corpus_copies) for page in sample_dsm5_pages(seed=seed)]
+    return pages, DSM5StructureSplitter().split_documents(pages)
+
+
+def bench_ingest(workdir: str, corpus_copies: int, embedding_latency: float) -> Dict[str, Dict[str, float]]:
+    """Chunks per second through ``upload_to_supabase`` and ``DSM5Chatbot.add_documents``"""
+    from bm25_index import BM25Index
+    from entity_index import EntityIndex
+    from fakes import FakeEmbeddings, build_fake_chatbot
+    from ingest_manifest import ChunkManifest
+    from load_dsm5 import upload_to_supabase
+    from local_vector_store import LocalVectorStore
+
+    pages, chunks = _sample_chunks(corpus_copies)
+    results = {}
+
+    store = LocalVectorStore(FakeEmbeddings(size=256, latency=embedding_latency), os.path.join(workdir, "upload"))
+    manifest = ChunkManifest(path=os.path.join(workdir, "upload_manifest.sqlite"))
+    started = time.perf_counter()
+    with _quiet():
+        report = upload_to_supabase(chunks, vector_store=store, manifest=manifest,
+                                    lexical_index=BM25Index(), entity_index=EntityIndex())
+    elapsed = time.perf_counter() - started
+    results["upload"] = {
+        "chunks": report["upserted"],
+        "seconds": round(elapsed, 3),
+        "chunks_per_sec": round(report["upserted"] / elapsed, 1),
+    }
+
+    # add_documents streams a file through parse -> split -> embed -> upsert
+    corpus_path = os.path.join(workdir, "dsm5_sample.txt")
+    with open(corpus_path, "w") as f:
+        f.write("\n".join(page.page_content for page in pages))
+    chatbot = build_fake_chatbot(os.path.join(workdir, "add_documents"), texts=[], embedding_size=256,
+                                 embedding_latency=embedding_latency)
+    started = time.perf_counter()
+    with _quiet():
+        report = chatbot.add_documents(corpus_path)
+    elapsed = time.perf_counter() - started
+    results["add_documents"] = {
+        "chunks": report["upserted"],
+        "seconds": round(elapsed, 3),
+        "chunks_per_sec": round(report["upserted"] / elapsed, 1),
+    }
+    return results
+
+
+def bench_memory(chatbot, session_turns: int, sessions: int) -> Dict[str, Dict[str, float]]:
+    """Traced Python heap growth over one long session and over many short ones"""
+    questions = CLARIFYING_QUESTIONS + RAG_QUESTIONS
+    results = {}
+    tracemalloc.start()
+    try:
+        gc.collect()
+        baseline = tracemalloc.get_traced_memory()[0]
+        checkpoints = {}
+        for turn in range(1, session_turns + 1):
+            chatbot.chat(questions[turn % len(questions)], "bench-long-session")
+            if turn in (session_turns // 4, session_turns // 2, session_turns):
+                gc.collect()
+                checkpoints[turn] = tracemalloc.get_traced_memory()[0] - baseline
+        # Growth over the second half shows whether a long session keeps growing
+        half = session_turns // 2
+        late_growth = checkpoints[session_turns] - checkpoints.get(half, 0)
+        results["long_session"] = {
+            "turns": session_turns,
+            "growth_kb": round(checkpoints[session_turns] / 1024, 1),
+            "kb_per_turn": round(checkpoints[session_turns] / 1024 / session_turns, 3),
+            "late_kb_per_turn": round(late_growth / 1024 / max(1, session_turns - half), 3),
+        }
+
+        gc.collect()
+        baseline = tracemalloc.get_traced_memory()[0]
+        for session in range(sessions):
+            chatbot.chat(questions[session % len(questions)], f"bench-session-{session}")
+        gc.collect()
+        growth = tracemalloc.get_traced_memory()[0] - baseline
+        results["sessions"] = {
+            "sessions": sessions,
+            "growth_kb": round(growth / 1024, 1),
+            "kb_per_session": round(growth / 1024 / sessions, 3),
+            "peak_mb": round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2),
+        }
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def flatten(sections: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """``{"chat": {"rag": {"p50_ms": 1}}}`` -> ``{"chat.rag.p50_ms": 1}``"""
+    flat = {}
+    for key, value in sections.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def run_suite(turns: int = 50, session_turns: int = 200, sessions: int = 100, corpus_copies: int = 3,
+              llm_latency: float = 0.0, token_latency: float = 0.0, answer_words: int = 60,
+              embedding_latency: float = 0.0) -> Dict[str, Any]:
+    from fakes import build_fake_chatbot
+
+    config = {
+        "turns": turns, "session_turns": session_turns, "sessions": sessions, "corpus_copies": corpus_copies,
+        "llm_latency": llm_latency, "token_latency": token_latency, "answer_words": answer_words,
+        "embedding_latency": embedding_latency,
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        chatbot = build_fake_chatbot(os.path.join(workdir, "chat"), latency=llm_latency,
+                                     token_latency=token_latency, answer_words=answer_words,
+                                     embedding_latency=embedding_latency)
+        chat = bench_chat(chatbot, turns)
+        memory = bench_memory(build_fake_chatbot(os.path.join(workdir, "memory"), answer_words=answer_words),
+                              session_turns, sessions)
+        ingest = bench_ingest(workdir, corpus_copies, embedding_latency)
+
+    sections = {"chat": chat, "ingest": ingest, "memory": memory}
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        **sections,
+        # Only rates, latencies and memory per unit are compared: counts and totals depend on
+        # the config, and a single slowest turn is too noisy to compare
+        "metrics": {name: value for name, value in flatten(sections).items()
+                    if name.endswith(("_ms", "_per_sec", "_per_turn", "_per_session"))
+                    and not name.endswith("max_ms")},
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25) -> List[Dict[str, Any]]:
+    """Per-metric change against the baseline; ``status`` is ``regression`` when a
+    metric got worse by more than ``tolerance`` (a fraction), ``improvement`` when better"""
+    rows = []
+    for name, current in sorted(results["metrics"].items()):
+        previous = baseline.get("metrics", {}).get(name)
+        if previous is None:
+            continue
+        change = (current - previous) / abs(previous) if previous else 0.0
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        status = "regression" if worse > tolerance else "improvement" if worse < -tolerance else "ok"
+        rows.append({
+            "metric": name,
+            "baseline": previous,
+            "current": current,
+            "change_pct": round(100 * change, 1),
+            "status": status,
+        })
+    return rows
+
+
+def print_results(results: Dict[str, Any]):
+    print(f"{'chat path':>12} {'turns':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for path, stats in results["chat"].items():
+        print(f"{path:>12} {stats['turns']:>6} {stats['p50_ms']:>9} {stats['p90_ms']:>9} "
+              f"{stats['p99_ms']:>9} {stats['max_ms']:>9}")
+    for name, stats in results["ingest"].items():
+        print(f"📥 {name}: {stats['chunks']} chunks in {stats['seconds']}s ({stats['chunks_per_sec']} chunks/s)")
+    long_session, sessions = results["memory"]["long_session"], results["memory"]["sessions"]
+    print(f"🧠 One {long_session['turns']}-turn session: +{long_session['growth_kb']} KB "
+          f"({long_session['late_kb_per_turn']} KB/turn over the second half)")
+    print(f"🧠 {sessions['sessions']} sessions: +{sessions['growth_kb']} KB ({sessions['kb_per_session']} KB/session)")
+
+
+def print_comparison(rows: List[Dict[str, Any]]):
+    marks = {"regression": "❌", "improvement": "✅", "ok": "  "}
+    for row in rows:
+        print(f"{marks[row['status']]} {row['metric']:<40} {row['baseline']:>10} -> {row['current']:>10} "
+              f"({row['change_pct']:+}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50, help="Chat turns measured per path")
+    parser.add_argument("--session-turns", type=int, default=200, help="Turns in the long-session memory run")
+    parser.add_argument("--sessions", type=int, default=100, help="Sessions in the many-sessions memory run")
+    parser.add_argument("--corpus-copies", type=int, default=3, help="Copies of the sample corpus to ingest")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Fake LLM round trip (seconds)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Fake LLM per-token delay (seconds)")
+    parser.add_argument("--answer-words", type=int, default=60, help="Words in each fake RAG answer")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Fake embedding request delay (seconds)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results stored in this file")
+    parser.add_argument("--save-baseline", help="Store these results as the baseline in this file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    print("🏁 Running the offline benchmark suite...")
+    results = run_suite(args.turns, args.session_turns, args.sessions, args.corpus_copies, args.llm_latency,
+                        args.token_latency, args.answer_words, args.embedding_latency)
+    print_results(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"💾 Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != results["config"]:
+            print("⚠️ Baseline was recorded with a different configuration; comparing anyway")
+        rows = compare(results, baseline, args.tolerance)
+        print_comparison(rows)
+        regressions = [row for row in rows if row["status"] == "regression"]
+        if regressions:
+            print(f"❌ {len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+        print("✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+In-process BM25 inverted index over ingested chunks, persisted as JSON
+"""
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from heapq import nlargest
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langchain.schema import Document
+
+# ICD-10 (F32.1, F43.10), DSM-IV/ICD-9 (296.2x, 309.81) codes, then plain words
+TOKEN_PATTERN = re.compile(r"[a-z]\d{2}(?:\.[0-9a-z]+)?\b|\d{3}\.[0-9a-z]+\b|[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can do does for from had has have how i if in into is it its
+me my of on or our so such than that the their them then there these they this to was we were
+what when which who will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms with stopwords dropped and simple plurals folded.
+
+    Diagnostic codes are kept whole and also indexed under their category
+    ("F32.1" yields "f32.1" and "f32"), so a query for a specific code still
+    matches text that only lists the category, and vice versa.
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if "." in token:
+            terms.append(token)
+            terms.append(token.split(".", 1)[0])
+            continue
+        token = token.split("'", 1)[0]
+        if token in STOPWORDS or (len(token) < 2 and not token.isdigit()):
+            continue
+        if len(token) > 4 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
+class BM25Index:
+    """Okapi BM25 over chunks keyed by the same row ids as the vector store.
+
+    ``add`` upserts chunks (text plus metadata) and ``remove`` deletes them,
+    so the index follows ingestion and stale-chunk pruning. Postings are
+    rebuilt from the stored texts on load; only texts and metadata are
+    written, atomically, by ``save``. Thread-safe, so ingestion stages can
+    update it while it is being searched.
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+        self.dirty = False
+        if path and os.path.exists(path):
+            self.load()
+
+    @classmethod
+    def from_documents(cls, documents: Sequence[Document], ids: Sequence[str] = None, **kwargs) -> "BM25Index":
+        index = cls(**kwargs)
+        index.add(ids or [str(i) for i in range(len(documents))], documents)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docs
+
+    def _index(self, doc_id: str, text: str, metadata: Dict[str, Any]):
+        terms = Counter(tokenize(text))
+        self._docs[doc_id] = (text, metadata)
+        self._lengths[doc_id] = sum(terms.values())
+        self._total_length += self._lengths[doc_id]
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = count
+
+    def _unindex(self, doc_id: str):
+        text, _ = self._docs.pop(doc_id)
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in set(tokenize(text)):
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def add(self, ids: Sequence[str], documents: Sequence[Document]):
+        """Insert or replace chunks by id (unchanged chunks are left alone)"""
+        with self._lock:
+            for doc_id, doc in zip(ids, documents):
+                doc_id = str(doc_id)
+                current = self._docs.get(doc_id)
+                if current is not None:
+                    if current[0] == doc.page_content and current[1] == doc.metadata:
+                        continue
+                    self._unindex(doc_id)
+                self._index(doc_id, doc.page_content, dict(doc.metadata))
+                self.dirty = True
+
+    def remove(self, ids: Iterable[str]):
+        with self._lock:
+            for doc_id in ids:
+                if str(doc_id) in self._docs:
+                    self._unindex(str(doc_id))
+                    self.dirty = True
+
+    def _document(self, doc_id: str) -> Document:
+        text, metadata = self._docs[doc_id]
+        return Document(id=doc_id, page_content=text, metadata=dict(metadata))
+
+    def get(self, ids: Iterable[str]) -> List[Document]:
+        """Stored chunks for the given ids, skipping unknown ones"""
+        with self._lock:
+            return [self._document(doc_id) for doc_id in ids if doc_id in self._docs]
+
+    def search(self, query: str, k: int = 5, ids: Optional[Iterable[str]] = None) -> List[Tuple[Document, float]]:
+        """Top ``k`` chunks for ``query`` by BM25 score, best first (only among ``ids`` if given)"""
+        with self._lock:
+            if not self._docs:
+                return []
+            n = len(self._docs)
+            avg_length = self._total_length / n or 1.0
+            candidates = None if ids is None else [doc_id for doc_id in ids if doc_id in self._docs]
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                if candidates is None:
+                    matches = posting.items()
+                else:
+                    matches = [(doc_id, posting[doc_id]) for doc_id in candidates if doc_id in posting]
+                for doc_id, tf in matches:
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            top = nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(self._document(doc_id), score) for doc_id, score in top]
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given for the lexical index")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            payload = {"k1": self.k1, "b": self.b, "docs": self._docs}
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+            self.dirty = False
+
+    def load(self, path: Optional[str] = None):
+        with open(path or self.path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        with self._lock:
+            self.k1 = payload.get("k1", self.k1)
+            self.b = payload.get("b", self.b)
+            self._docs, self._postings, self._lengths, self._total_length = {}, {}, {}, 0
+            for doc_id, (text, metadata) in payload["docs"].items():
+                self._index(doc_id, text, metadata)
+            self.dirty = False
@@ -0,0 +1,182 @@
+"""
+Token-budgeted context packing between retrieval and generation
+"""
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+
+from token_counter import count_tokens, truncate_to_tokens
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def overlap_join(left: str, right: str, min_overlap: int = 20) -> Optional[str]:
+    """``left + right`` without the text they share (left's tail = right's head), or None"""
+    probe = right[:min_overlap]
+    if len(probe) < min_overlap:
+        return None
+    pos = left.find(probe, max(0, len(left) - len(right)))
+    while pos != -1:
+        if right.startswith(left[pos:]):
+            return left + right[len(left) - pos:]
+        pos = left.find(probe, pos + 1)
+    return None
+
+
+class _Passage:
+    """One or more retrieved chunks merged into a contiguous passage"""
+
+    def __init__(self, doc: Document):
+        self.text = doc.page_content
+        self.metadata = dict(doc.metadata)
+        self.source = doc.metadata.get("source")
+        self.pages = {doc.metadata["page"]} if "page" in doc.metadata else set()
+        self.chunk_ids = {doc.metadata["chunk_id"]} if isinstance(doc.metadata.get("chunk_id"), int) else set()
+        self.merged = 1
+
+    def near(self, doc: Document) -> bool:
+        """Same source and within one page of this passage's page range"""
+        if doc.metadata.get("source") != self.source:
+            return False
+        page = doc.metadata.get("page")
+        return page is None or not self.pages or min(self.pages) - 1 <= page <= max(self.pages) + 1
+
+    def absorb(self, doc: Document) -> bool:
+        """Merge an overlapping, contained or adjacent chunk; False if it isn't one"""
+        text = doc.page_content
+        chunk_id = doc.metadata.get("chunk_id")
+        if text in self.text:
+            merged = self.text
+        elif self.text in text:
+            merged = text
+        else:
+            merged = overlap_join(self.text, text) or overlap_join(text, self.text)
+        if merged is None and isinstance(chunk_id, int) and self.chunk_ids:
+            # Consecutive chunks of the same source read on from each other
+            if chunk_id == max(self.chunk_ids) + 1:
+                merged = f"{self.text}\n{text}"
+            elif chunk_id == min(self.chunk_ids) - 1:
+                merged = f"{text}\n{self.text}"
+        if merged is None:
+            return False
+        self.text = merged
+        if "page" in doc.metadata:
+            self.pages.add(doc.metadata["page"])
+        if isinstance(chunk_id, int):
+            self.chunk_ids.add(chunk_id)
+        self.merged += 1
+        return True
+
+    def document(self) -> Document:
+        metadata = dict(self.metadata)
+        if self.merged > 1:
+            if self.pages:
+                metadata["pages"] = sorted(self.pages)
+            if self.chunk_ids:
+                metadata["chunk_ids"] = sorted(self.chunk_ids)
+            metadata["merged_chunks"] = self.merged
+        return Document(page_content=self.text, metadata=metadata)
+
+
+class ContextPacker:
+    """Shrinks retrieved chunks into the context actually sent to the LLM.
+
+    In rank order, chunks from the same source and page range that overlap,
+    contain one another or are consecutive are merged into one passage
+    (removing the splitter's overlap), passages whose word 3-grams are at
+    least ``duplicate_threshold`` contained in a higher-ranked passage are
+    dropped, and passages are added until ``max_tokens`` is reached (the
+    last one truncated if at least ``min_tail_tokens`` still fit). Tokens
+    are counted with the model tokenizer (see ``token_counter``).
+    """
+
+    def __init__(self, max_tokens: int = 1500, duplicate_threshold: float = 0.8, min_tail_tokens: int = 64):
+        self.max_tokens = max_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.min_tail_tokens = min_tail_tokens
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    @classmethod
+    def from_env(cls) -> "ContextPacker":
+        return cls(
+            max_tokens=int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500")),
+            duplicate_threshold=float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.8")),
+        )
+
+    def _merge(self, docs: List[Document]) -> List[_Passage]:
+        passages: List[_Passage] = []
+        for doc in docs:
+            if not any(passage.near(doc) and passage.absorb(doc) for passage in passages):
+                passages.append(_Passage(doc))
+        return passages
+
+    def _dedupe(self, passages: List[_Passage]) -> List[_Passage]:
+        kept, kept_shingles = [], []
+        for passage in passages:
+            shingles = _shingles(passage.text)
+            duplicate = any(
+                shingles and len(shingles & other) / min(len(shingles), len(other)) >= self.duplicate_threshold
+                for other in kept_shingles if other
+            )
+            if not duplicate:
+                kept.append(passage)
+                kept_shingles.append(shingles)
+        return kept
+
+    def pack(self, docs: List[Document]) -> Tuple[List[Document], Dict[str, Any]]:
+        """Packed context documents and a report of what packing saved"""
+        tokens_before = sum(count_tokens(doc.page_content) for doc in docs)
+        merged = self._merge(docs)
+        passages = self._dedupe(merged)
+
+        packed, used, truncated = [], 0, False
+        for passage in passages:
+            doc = passage.document()
+            tokens = count_tokens(doc.page_content)
+            if used + tokens > self.max_tokens:
+                remaining = self.max_tokens - used
+                if remaining >= self.min_tail_tokens:
+                    doc.page_content = truncate_to_tokens(doc.page_content, remaining)
+                    used += count_tokens(doc.page_content)
+                    packed.append(doc)
+                truncated = True
+                break
+            packed.append(doc)
+            used += tokens
+
+        with self._lock:
+            self.requests += 1
+            self.tokens_before += tokens_before
+            self.tokens_after += used
+        return packed, {
+            "retrieved_chunks": len(docs),
+            "packed_passages": len(packed),
+            "merged_chunks": len(docs) - len(merged),
+            "duplicates_dropped": len(merged) - len(passages),
+            "truncated": truncated,
+            "tokens_before": tokens_before,
+            "tokens_after": used,
+            "tokens_saved": tokens_before - used,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        saved = self.tokens_before - self.tokens_after
+        return {
+            "max_tokens": self.max_tokens,
+            "requests": self.requests,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": saved,
+            "saved_pct": round(100 * saved / self.tokens_before, 1) if self.tokens_before else 0.0,
+        }
@@ -0,0 +1,86 @@
+"""
+Running per-session conversation analytics, updated as messages are added
+"""
+from typing import Any, Dict
+
+from langchain_community.chat_message_histories import ChatMessageHistory
+from langchain_core.messages import BaseMessage
+from langchain_core.pydantic_v1 import Field
+
+from agent_tools import INDICATOR_MATCHER, PERSONAL_REFERENCE
+
+# Symptom keywords counted per user message for the conversation summary
+SUMMARY_SYMPTOM_KEYWORDS = ["feel", "feeling", "symptoms", "problems", "difficulty", "trouble"]
+
+
+class ConversationState:
+    """Message counts and keyword signals accumulated one message at a time.
+
+    Only user messages contribute keyword signals. ``hits`` holds every
+    indicator seen so far with the context of its first occurrence, which is
+    what the assessment heuristics need, so neither the summary nor the
+    assessor has to rescan the history.
+    """
+
+    def __init__(self):
+        self.total_messages = 0
+        self.user_messages = 0
+        self.symptom_mentions = 0
+        self.personal_reference = False
+        self.hits: Dict[str, str] = {}
+
+    def update(self, message: BaseMessage):
+        self.total_messages += 1
+        if message.type != "human":
+            return
+
+        self.user_messages += 1
+        content = str(message.content)
+        self.personal_reference = self.personal_reference or bool(PERSONAL_REFERENCE.search(content))
+        message_hits = INDICATOR_MATCHER.scan(content)
+        self.symptom_mentions += sum(1 for keyword in SUMMARY_SYMPTOM_KEYWORDS if keyword in message_hits)
+        for keyword, context in message_hits.items():
+            self.hits.setdefault(keyword, context)
+
+    @property
+    def is_diagnostic(self) -> bool:
+        return bool(INDICATOR_MATCHER.found(self.hits, "diagnostic"))
+
+    @property
+    def has_duration(self) -> bool:
+        return bool(INDICATOR_MATCHER.found(self.hits, "duration"))
+
+    @property
+    def has_impact(self) -> bool:
+        return bool(INDICATOR_MATCHER.found(self.hits, "impact"))
+
+    @property
+    def has_enough_context(self) -> bool:
+        return self.symptom_mentions >= 3
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total_messages": self.total_messages,
+            "user_messages": self.user_messages,
+            "symptom_mentions": self.symptom_mentions,
+            "has_duration": self.has_duration,
+            "has_impact": self.has_impact,
+            "has_enough_context": self.has_enough_context
+        }
+
+
+class TrackedChatMessageHistory(ChatMessageHistory):
+    """In-memory chat history that keeps a ConversationState up to date"""
+
+    state: ConversationState = Field(default_factory=ConversationState)
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def add_message(self, message: BaseMessage) -> None:
+        super().add_message(message)
+        self.state.update(message)
+
+    def clear(self) -> None:
+        super().clear()
+        self.state = ConversationState()
@@ -2,18 +2,57 @@ import os
 from supabase import create_client, Client
 from langchain_community.vectorstores import SupabaseVectorStore
 from langchain_openai import OpenAIEmbeddings
+from local_vector_store import LocalVectorStore
+from embedding_cache import CachedEmbeddings
+from ingest_manifest import ChunkManifest
+from bm25_index import BM25Index
+from entity_index import EntityIndex
+from rate_limiter import RateLimitedEmbeddings
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class SupabaseDB:
-    def __init__(self):
+    def __init__(self, backend: str = None, embeddings=None):
+        # "supabase" (default) or "local" for the embedded on-disk store
+        self.backend = backend or os.getenv("VECTOR_STORE_BACKEND", "supabase")
+        self.local_store_path = os.getenv("LOCAL_VECTOR_STORE_PATH", "./vector_store")
+        # In-memory codes searched by the local store (none, float16, int8 or pq)
+        self.local_quantization = os.getenv("LOCAL_VECTOR_QUANTIZATION", "none")
+        self.local_rescore = int(os.getenv("LOCAL_VECTOR_RESCORE", "4"))
+        self.retrieval_index_dir = os.getenv("RETRIEVAL_INDEX_DIR", "./retrieval_index")
+        self.manifest_path = os.getenv("INGEST_MANIFEST_PATH", f"./ingest_manifest.{self.backend}.sqlite")
         self.supabase_url = os.getenv("SUPABASE_URL")
         self.supabase_key = os.getenv("SUPABASE_KEY")
-        self.client: Client = create_client(self.supabase_url, self.supabase_key)
-        self.embeddings = OpenAIEmbeddings()
+        self.client: Client = None
+        if self.backend == "supabase":
+            self.client = create_client(self.supabase_url, self.supabase_key)
+        elif self.backend != "local":
+            raise ValueError(f"Unknown vector store backend: {self.backend}")
+        # API calls (cache misses only) go through request/token budgets
+        self.rate_limiter = RateLimitedEmbeddings(
+            embeddings or OpenAIEmbeddings(),
+            requests_per_minute=float(os.getenv("EMBEDDING_RPM", "3000")),
+            tokens_per_minute=float(os.getenv("EMBEDDING_TPM", "1000000")),
+            # OpenAIEmbeddings sends at most chunk_size (1000) inputs per request
+            max_batch_size=1000,
+            max_concurrency=int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "8"))
+        )
+        self.embeddings = CachedEmbeddings(
+            self.rate_limiter,
+            cache_path=os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.sqlite"),
+            query_cache_size=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+            query_cache_ttl=float(os.getenv("QUERY_CACHE_TTL", "3600"))
+        )
         
     def get_vector_store(self, table_name="documents"):
+        if self.backend == "local":
+            return LocalVectorStore(
+                embedding=self.embeddings,
+                persist_directory=os.path.join(self.local_store_path, table_name),
+                quantization=self.local_quantization,
+                rescore=self.local_rescore
+            )
         return SupabaseVectorStore(
             client=self.client,
             embedding=self.embeddings,
@@ -21,6 +60,21 @@ class SupabaseDB:
             query_name="match_documents"
         )
     
+    def get_manifest(self, table_name="documents"):
+        """Chunk manifest for resumable ingestion, kept separately per backend"""
+        return ChunkManifest(
+            path=self.manifest_path,
+            table_name=table_name
+        )
+    
+    def get_lexical_index(self, table_name="documents"):
+        """BM25 index over the ingested chunks, kept next to the vector store per backend"""
+        return BM25Index(path=os.path.join(self.retrieval_index_dir, f"{self.backend}.{table_name}.bm25.json"))
+    
+    def get_entity_index(self, table_name="documents"):
+        """Disorder name / ICD code -> chunk id index built alongside the lexical index"""
+        return EntityIndex(path=os.path.join(self.retrieval_index_dir, f"{self.backend}.{table_name}.entities.json"))
+    
     def create_tables(self):
         """Create necessary tables for storing DSM-5 documents and embeddings"""
         # This assumes you have the pgvector extension enabled in Supabase
@@ -32,15 +86,19 @@ class SupabaseDB:
             embedding VECTOR(1536)
         );
         
+        -- Returns embeddings too, so MMR can diversify results without re-embedding them
+        -- A loose floor and a generous row cap: the retriever decides how many candidates to keep
+        DROP FUNCTION IF EXISTS match_documents(VECTOR(1536), FLOAT, INT);
         CREATE OR REPLACE FUNCTION match_documents(
             query_embedding VECTOR(1536),
-            match_threshold FLOAT DEFAULT 0.78,
-            match_count INT DEFAULT 10
+            match_threshold FLOAT DEFAULT 0.5,
+            match_count INT DEFAULT 50
         )
         RETURNS TABLE(
             id BIGINT,
             content TEXT,
             metadata JSONB,
+            embedding VECTOR(1536),
             similarity FLOAT
         )
         LANGUAGE SQL STABLE
@@ -49,6 +107,7 @@ class SupabaseDB:
                 dsm5_documents.id,
                 dsm5_documents.content,
                 dsm5_documents.metadata,
+                dsm5_documents.embedding,
                 1 - (dsm5_documents.embedding <=> query_embedding) AS similarity
             FROM dsm5_documents
             WHERE 1 - (dsm5_documents.embedding <=> query_embedding) > match_threshold
@@ -1,22 +1,27 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import TextLoader, PyPDFLoader
+from langchain_community.document_loaders import TextLoader
 from langchain.schema import Document
-from typing import List
+from pdf_extraction import load_pdf_pages, iter_pdf_pages
+from dsm5_splitter import create_text_splitter
+from typing import Iterator, List
 import os
 import requests
 import tempfile
 
 class DSM5Processor:
-    def __init__(self, chunk_size=1000, chunk_overlap=200):
-        self.text_splitter = RecursiveCharacterTextSplitter(
+    def __init__(self, chunk_size=1000, chunk_overlap=200, pdf_workers=None, chunking_strategy=None):
+        # Number of processes for PDF text extraction (None = PDF_WORKERS or CPU count)
+        self.pdf_workers = pdf_workers
+        # "structure" splits along DSM-5 headings and criteria; chunk_size/chunk_overlap
+        # apply to the fixed-size "recursive" strategy
+        self.text_splitter = create_text_splitter(
+            chunking_strategy or os.getenv("CHUNKING_STRATEGY", "structure"),
             chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", ". ", " ", ""]
+            chunk_overlap=chunk_overlap
         )
         self.dsm5_url = "https://dn790004.ca.archive.org/0/items/APA-DSM-5/DSM5.pdf"
     
-    def load_dsm5_from_url(self) -> List[Document]:
-        """Load DSM-5 PDF directly from the archive.org URL"""
+    def _download_dsm5(self) -> str:
+        """Download the DSM-5 PDF to a temporary file and return its path"""
         print("Downloading DSM-5 PDF from archive.org...")
         
         # Download the PDF
@@ -27,22 +32,29 @@ class DSM5Processor:
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
             for chunk in response.iter_content(chunk_size=8192):
                 temp_file.write(chunk)
-            temp_path = temp_file.name
+            return temp_file.name
+    
+    def _add_dsm5_page_metadata(self, doc: Document, index: int) -> Document:
+        """Add page numbers and source info to metadata"""
+        doc.metadata.update({
+            "source": "DSM-5",
+            "source_url": self.dsm5_url,
+            "page": index + 1,
+            "document_type": "diagnostic_manual"
+        })
+        return doc
+    
+    def load_dsm5_from_url(self) -> List[Document]:
+        """Load DSM-5 PDF directly from the archive.org URL"""
+        temp_path = self._download_dsm5()
         
         try:
             # Load and process the PDF
             print("Processing DSM-5 PDF...")
-            loader = PyPDFLoader(temp_path)
-            documents = loader.load()
+            documents = load_pdf_pages(temp_path, max_workers=self.pdf_workers)
             
-            # Add page numbers and source info to metadata
             for i, doc in enumerate(documents):
-                doc.metadata.update({
-                    "source": "DSM-5",
-                    "source_url": self.dsm5_url,
-                    "page": i + 1,
-                    "document_type": "diagnostic_manual"
-                })
+                self._add_dsm5_page_metadata(doc, i)
             
             return self.split_documents(documents)
         
@@ -50,18 +62,37 @@ class DSM5Processor:
             # Clean up temporary file
             os.unlink(temp_path)
     
+    def iter_dsm5_pages_from_url(self) -> Iterator[Document]:
+        """Download DSM-5 and lazily yield its pages (unsplit) for streaming ingestion"""
+        temp_path = self._download_dsm5()
+        
+        try:
+            print("Processing DSM-5 PDF...")
+            for i, doc in enumerate(iter_pdf_pages(temp_path, max_workers=self.pdf_workers)):
+                yield self._add_dsm5_page_metadata(doc, i)
+        
+        finally:
+            # Clean up temporary file
+            os.unlink(temp_path)
+    
+    def iter_documents(self, file_path: str) -> Iterator[Document]:
+        """Lazily yield unsplit documents (one per PDF page) from a file"""
+        if file_path.endswith('.pdf'):
+            return iter_pdf_pages(file_path, max_workers=self.pdf_workers)
+        return TextLoader(file_path).lazy_load()
+    
     def load_dsm5_documents(self, file_path: str) -> List[Document]:
         """Load DSM-5 documents from file"""
         if file_path.endswith('.pdf'):
-            loader = PyPDFLoader(file_path)
+            documents = load_pdf_pages(file_path, max_workers=self.pdf_workers)
         else:
-            loader = TextLoader(file_path)
-        
-        documents = loader.load()
+            documents = TextLoader(file_path).load()
         return self.split_documents(documents)
     
     def split_documents(self, documents: List[Document]) -> List[Document]:
         """Split documents into chunks"""
+        if hasattr(self.text_splitter, "reset"):
+            self.text_splitter.reset()
         return self.text_splitter.split_documents(documents)
     
     def add_metadata(self, documents: List[Document], source_type="dsm5") -> List[Document]:
@@ -0,0 +1,287 @@
+"""
+DSM-5 structure-aware chunking along headings, criteria, specifiers and code lines
+"""
+import re
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter, TextSplitter
+
+from token_counter import count_tokens
+
+# ICD-10-CM (F32.1, F43.10, G47.33) and ICD-9-CM (296.2x, 300.02) diagnostic codes
+CODE_PATTERN = re.compile(r"\b[A-Z]\d{2}(?:\.[0-9A-Za-z]{1,4})?\b|\b\d{3}\.\d{1,2}x?\b|\b\d{3}\.x\b")
+
+# Fixed sub-headings that recur inside every disorder's text
+SECTION_HEADINGS = (
+    "Diagnostic Criteria", "Specifiers", "Subtypes", "Recording Procedures", "Coding and Recording Procedures",
+    "Diagnostic Features", "Associated Features Supporting Diagnosis", "Prevalence", "Development and Course",
+    "Risk and Prognostic Factors", "Culture-Related Diagnostic Issues", "Gender-Related Diagnostic Issues",
+    "Suicide Risk", "Functional Consequences", "Differential Diagnosis", "Comorbidity", "Diagnostic Markers",
+    "Relationship to Other Classifications",
+)
+
+# Words that stay lowercase in title-case headings
+HEADING_SMALL_WORDS = frozenset("a an and as at by due for from in of on or the to with without".split())
+
+# Words that mark a title-case line as a disorder heading
+DISORDER_NOUNS = frozenset("""
+Disorder Syndrome Dysphoria Disability Dysfunction Delirium Schizophrenia Narcolepsy Pica Enuresis
+Encopresis Trichotillomania Hypersomnolence Apnea Hypoventilation Catatonia Intoxication Withdrawal
+""".split())
+
+CRITERION_START = re.compile(r"^([A-Z])\.\s+\S")
+SPECIFIER_START = re.compile(r"^(?:Specify|Coding note|Code based on)\b")
+
+
+def _is_title_case(line: str) -> bool:
+    words = line.split()
+    if not 1 <= len(words) <= 12 or line[-1] in ".:;,?!" or not line[0].isupper():
+        return False
+    return all(
+        word[0].isupper() or word[0].isdigit() or word.lower() in HEADING_SMALL_WORDS or not word[0].isalpha()
+        for word in words
+    )
+
+
+def legacy_text_splitter(chunk_size: int = 1000, chunk_overlap: int = 200) -> RecursiveCharacterTextSplitter:
+    """The fixed-size splitter the corpus was originally chunked with"""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+
+
+class DSM5StructureSplitter(TextSplitter):
+    """Splits DSM-5 text along its own structure instead of every N characters.
+
+    Lines are classified as chapter headings ("Depressive Disorders"),
+    disorder headings ("Major Depressive Disorder"), section headings
+    ("Diagnostic Criteria", "Prevalence", ...), code lines ("296.2x (F32.x)"),
+    criterion starts ("A. ...") and specifier starts ("Specify if: ...").
+    Criteria and specifiers begin new blocks (numbered items stay with their
+    criterion); consecutive blocks under the same heading path are packed
+    into chunks of at most ``max_chars`` with no overlap. Only a single block
+    longer than ``max_chars`` is split further, by the legacy splitter.
+
+    Every chunk gets ``heading_path`` ("chapter > disorder > section"),
+    ``disorder``, ``section``, ``codes`` and ``criteria`` metadata. The
+    heading path carries across pages of the same source, so pages can be
+    fed one at a time in order (as the ingest pipeline does).
+    """
+
+    def __init__(self, max_chars: int = 1500, **kwargs: Any):
+        super().__init__(chunk_size=max_chars, chunk_overlap=0, **kwargs)
+        self.max_chars = max_chars
+        self._fallback = legacy_text_splitter(max_chars, 0)
+        self.reset()
+
+    def reset(self):
+        """Forget the current heading path (start of a new document)"""
+        self._source = None
+        self._chapter = ""
+        self._disorder = ""
+        self._section = ""
+        self._codes: List[str] = []
+
+    # ------------------------------------------------------------------
+    # Line classification
+    # ------------------------------------------------------------------
+    def _heading(self, line: str) -> Optional[str]:
+        """'chapter', 'disorder' or 'section' if the line is a heading"""
+        if CRITERION_START.match(line) or SPECIFIER_START.match(line) or not _is_title_case(line):
+            return None
+        if any(line.startswith(heading) for heading in SECTION_HEADINGS):
+            return "section"
+        if line.endswith("Disorders"):
+            return "chapter"
+        words = line.replace("/", " ").split()
+        if DISORDER_NOUNS & set(words) and (len(words) >= 2 or line != "Disorder"):
+            return "disorder"
+        return None
+
+    def _apply_heading(self, kind: str, line: str) -> bool:
+        """Update the heading path; False for a repeated running page header"""
+        if kind == "chapter":
+            if line == self._chapter:
+                return False
+            self._chapter, self._disorder, self._section, self._codes = line, "", "", []
+        elif kind == "disorder":
+            # DSM-5 repeats the disorder name as a running head on alternate pages
+            if line == self._disorder:
+                return False
+            self._disorder, self._section, self._codes = line, "", []
+        else:
+            self._section = line
+        return True
+
+    def _metadata(self) -> Dict[str, Any]:
+        path = [part for part in (self._chapter, self._disorder, self._section) if part]
+        return {
+            "heading_path": " > ".join(path),
+            "disorder": self._disorder,
+            "section": self._section,
+            "codes": list(self._codes),
+        }
+
+    # ------------------------------------------------------------------
+    # Splitting
+    # ------------------------------------------------------------------
+    def _blocks(self, text: str) -> List[tuple]:
+        """(metadata, lines) per structural block, in text order"""
+        blocks = []
+        lines: List[str] = []
+        headings_only = True
+        metadata = self._metadata()
+
+        def flush():
+            nonlocal lines, headings_only
+            # Headings with no text of their own open the next block instead
+            if lines and not headings_only:
+                blocks.append((metadata, lines))
+                lines = []
+            headings_only = True
+
+        for raw in text.splitlines():
+            line = raw.strip()
+            if not line or line.isdigit():
+                continue  # blank line or page number
+            codes = CODE_PATTERN.findall(line)
+            remainder = CODE_PATTERN.sub("", line).strip(" ()\t,")
+            kind = self._heading(remainder if codes else line)
+            if codes and not remainder:
+                # Code line for the current disorder
+                self._codes.extend(code for code in codes if code not in self._codes)
+                metadata = {**metadata, "codes": list(self._codes)}
+            elif kind:
+                if not self._apply_heading(kind, remainder if codes else line):
+                    continue  # running page header
+                flush()
+                self._codes.extend(code for code in codes if code not in self._codes)
+                metadata = self._metadata()
+            elif CRITERION_START.match(line) or SPECIFIER_START.match(line):
+                flush()
+                headings_only = False
+            else:
+                headings_only = False
+            lines.append(line)
+        headings_only = False  # a page ending in headings keeps them as a block
+        flush()
+        return blocks
+
+    def _pack(self, blocks: List[tuple]) -> List[tuple]:
+        """Greedily merge consecutive blocks with the same heading path up to max_chars"""
+        chunks = []
+        current_meta, current = None, []
+        for metadata, lines in blocks:
+            text = "\n".join(lines)
+            same_path = current_meta is not None and metadata["heading_path"] == current_meta["heading_path"]
+            if current and same_path and len("\n".join(current)) + 1 + len(text) <= self.max_chars:
+                current.append(text)
+                current_meta = {**current_meta, "codes": metadata["codes"]}
+                continue
+            if current:
+                chunks.append((current_meta, "\n".join(current)))
+            current_meta, current = metadata, [text]
+        if current:
+            chunks.append((current_meta, "\n".join(current)))
+
+        packed = []
+        for metadata, text in chunks:
+            pieces = [text] if len(text) <= self.max_chars else self._fallback.split_text(text)
+            for piece in pieces:
+                criteria = sorted({m.group(1) for m in (CRITERION_START.match(l) for l in piece.splitlines()) if m})
+                packed.append(({**metadata, "criteria": criteria}, piece))
+        return packed
+
+    def split_text(self, text: str) -> List[str]:
+        return [text for _, text in self._pack(self._blocks(text))]
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Document]:
+        chunks = []
+        for doc in documents:
+            source = doc.metadata.get("source")
+            if source != self._source:
+                self.reset()
+                self._source = source
+            for metadata, text in self._pack(self._blocks(doc.page_content)):
+                chunks.append(Document(page_content=text, metadata={**doc.metadata, **metadata}))
+        return chunks
+
+
+def create_text_splitter(strategy: str = "structure", chunk_size: int = 1000, chunk_overlap: int = 200,
+                         max_chars: int = 1500) -> TextSplitter:
+    """Splitter for the DSM-5 corpus: 'structure' (default) or the legacy 'recursive'"""
+    if strategy == "recursive":
+        return legacy_text_splitter(chunk_size, chunk_overlap)
+    if strategy != "structure":
+        raise ValueError(f"Unknown chunking strategy: {strategy}")
+    return DSM5StructureSplitter(max_chars=max_chars)
+
+
+def _splitter_stats(chunks: List[Document]) -> Dict[str, Any]:
+    sizes = [len(chunk.page_content) for chunk in chunks]
+    return {
+        "chunks": len(chunks),
+        "chars": sum(sizes),
+        "embedding_tokens": sum(count_tokens(chunk.page_content) for chunk in chunks),
+        "avg_chunk_chars": round(sum(sizes) / len(sizes), 1) if sizes else 0.0,
+        "max_chunk_chars": max(sizes, default=0),
+    }
+
+
+def chunking_report(pages: List[Document], splitter: TextSplitter = None,
+                    baseline: TextSplitter = None) -> Dict[str, Any]:
+    """Corpus size, chunk counts and embedding tokens for two splitters over the same pages"""
+    splitter = splitter or DSM5StructureSplitter()
+    baseline = baseline or legacy_text_splitter()
+    corpus_chars = sum(len(page.page_content) for page in pages)
+    if hasattr(splitter, "reset"):
+        splitter.reset()
+    structured = _splitter_stats(splitter.split_documents([Document(**page.dict()) for page in pages]))
+    legacy = _splitter_stats(baseline.split_documents([Document(**page.dict()) for page in pages]))
+    saved = legacy["embedding_tokens"] - structured["embedding_tokens"]
+    return {
+        "pages": len(pages),
+        "corpus_chars": corpus_chars,
+        "corpus_tokens": sum(count_tokens(page.page_content) for page in pages),
+        "structured": structured,
+        "legacy": legacy,
+        "tokens_saved": saved,
+        "tokens_saved_pct": round(100 * saved / legacy["embedding_tokens"], 1) if legacy["embedding_tokens"] else 0.0,
+        "stored_overhead_pct": {
+            name: round(100 * (stats["chars"] / corpus_chars - 1), 1) if corpus_chars else 0.0
+            for name, stats in (("structured", structured), ("legacy", legacy))
+        },
+    }
+
+
+def print_chunking_report(report: Dict[str, Any]):
+    print(f"📚 Corpus: {report['pages']} pages, {report['corpus_chars']:,} chars, "
+          f"~{report['corpus_tokens']:,} tokens")
+    for name in ("legacy", "structured"):
+        stats = report[name]
+        print(f"   {name:>10}: {stats['chunks']} chunks (avg {stats['avg_chunk_chars']} chars, "
+              f"max {stats['max_chunk_chars']}), {stats['embedding_tokens']:,} embedding tokens, "
+              f"{report['stored_overhead_pct'][name]:+}% stored vs corpus")
+    print(f"💰 Structure-aware chunking saves {report['tokens_saved']:,} embedding tokens "
+          f"({report['tokens_saved_pct']}%)")
+
+
+def main():
+    """Chunking report for a DSM-5 PDF/text file, or the synthetic sample corpus"""
+    from document_processor import DSM5Processor
+    from fakes import sample_dsm5_pages
+
+    if len(sys.argv) > 1:
+        pages = list(DSM5Processor().iter_documents(sys.argv[1]))
+    else:
+        print("ℹ️ No file given; using the synthetic DSM-5 sample corpus")
+        pages = sample_dsm5_pages()
+    print_chunking_report(chunking_report(pages))
+
+
+if __name__ == "__main__":
+    main()
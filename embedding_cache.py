@@ -0,0 +1,129 @@
+"""
+Embedding caches: a persistent cache for chunk embeddings so re-ingesting
+unchanged chunks doesn't call the API, and an in-process LRU/TTL cache for
+query embeddings on the retrieval path
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from lru_ttl_cache import LRUTTLCache
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an Embeddings model with a SQLite cache keyed by (model, SHA-256 of text).
+
+    Only texts that are not already cached are sent to the underlying model,
+    so a re-run over an unchanged corpus makes no embedding API calls.
+
+    Query embeddings go through a separate bounded LRU cache with a TTL, keyed
+    on normalized query text, so repeated questions skip the API call.
+    """
+
+    def __init__(self, underlying: Embeddings, cache_path: str = "./embedding_cache.sqlite",
+                 model_name: str = None, query_cache_size: int = 1024,
+                 query_cache_ttl: float = 3600):
+        self.underlying = underlying
+        self.query_cache = LRUTTLCache(maxsize=query_cache_size, ttl=query_cache_ttl)
+        self.model_name = model_name or getattr(underlying, "model", None) or type(underlying).__name__
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+
+        cache_dir = os.path.dirname(cache_path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )"""
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model_name, *batch],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [
+                    (self.model_name, text_hash, np.asarray(vector, dtype=np.float32).tobytes())
+                    for text_hash, vector in items.items()
+                ],
+            )
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, calling the underlying model only for cache misses"""
+        hashes = [self.hash_text(text) for text in texts]
+        vectors = self._lookup(list(set(hashes)))
+
+        # Deduplicate misses so repeated chunks are embedded once
+        missing = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in vectors and text_hash not in missing:
+                missing[text_hash] = text
+
+        if missing:
+            new_vectors = self.underlying.embed_documents(list(missing.values()))
+            # Round through float32 so hits and misses return identical values
+            computed = {
+                text_hash: np.asarray(vector, dtype=np.float32).tolist()
+                for text_hash, vector in zip(missing.keys(), new_vectors)
+            }
+            self._store(computed)
+            vectors.update(computed)
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+
+        return [vectors[text_hash] for text_hash in hashes]
+
+    @staticmethod
+    def normalize_query(text: str) -> str:
+        """Case-fold, collapse whitespace and drop trailing punctuation"""
+        return " ".join(text.lower().split()).rstrip("?.! ")
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self.normalize_query(text)
+        vector = self.query_cache.get(key)
+        if vector is None:
+            vector = self.underlying.embed_query(text)
+            self.query_cache.put(key, vector)
+        return vector
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counts for document embeddings since this object was created"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
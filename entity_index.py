@@ -0,0 +1,204 @@
+"""
+Disorder name / alias / ICD code index for direct chunk lookup
+"""
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from langchain.schema import Document
+
+from dsm5_splitter import CODE_PATTERN
+
+# Common abbreviations and lay names -> DSM-5 disorder names
+DISORDER_ALIASES = {
+    "Attention-Deficit/Hyperactivity Disorder": ["ADHD", "attention deficit disorder", "attention deficit hyperactivity"],
+    "Autism Spectrum Disorder": ["ASD", "autism"],
+    "Major Depressive Disorder": ["MDD", "major depression", "clinical depression"],
+    "Persistent Depressive Disorder": ["dysthymia", "dysthymic disorder"],
+    "Bipolar I Disorder": ["bipolar 1", "bipolar i", "bipolar one"],
+    "Bipolar II Disorder": ["bipolar 2", "bipolar ii", "bipolar two"],
+    "Generalized Anxiety Disorder": ["GAD"],
+    "Social Anxiety Disorder": ["social phobia"],
+    "Posttraumatic Stress Disorder": ["PTSD", "post traumatic stress disorder", "post-traumatic stress"],
+    "Obsessive-Compulsive Disorder": ["OCD"],
+    "Borderline Personality Disorder": ["BPD"],
+    "Insomnia Disorder": ["insomnia"],
+    "Anorexia Nervosa": ["anorexia"],
+    "Bulimia Nervosa": ["bulimia"],
+}
+
+# Chunks without heading metadata: a disorder name opening the chunk
+LEADING_DISORDER = re.compile(r"^((?:[A-Z][\w'/-]*\s+){0,6}?(?:Disorder|Syndrome|Nervosa))\b")
+CODE_IN_TEXT = re.compile(CODE_PATTERN.pattern, re.IGNORECASE)
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower().replace("'", "")))
+
+
+_ALIASES_BY_NAME = {normalize_name(name): aliases for name, aliases in DISORDER_ALIASES.items()}
+
+
+def code_keys(code: str) -> List[str]:
+    """Lookup keys for a code, most specific first ("F43.10" -> F43.10, F43.1X, F43)"""
+    code = code.upper()
+    keys = [code]
+    if "." in code:
+        category, detail = code.split(".", 1)
+        if len(detail) > 1 and not detail.endswith("X"):
+            keys.append(f"{category}.{detail[:-1]}X")
+        keys.append(category)
+    return keys
+
+
+class EntityIndex:
+    """Maps disorder names, their aliases and ICD codes to the ids of their chunks.
+
+    Entities come from the ``disorder`` and ``codes`` metadata written by the
+    structure-aware splitter, or, for chunks without it, from a disorder name
+    and codes at the start of the chunk. ``resolve`` finds entities in a
+    question with dictionary lookups only: codes by regex, names by sliding
+    n-grams up to the longest indexed name. Same ``add``/``remove``/``save``
+    interface as ``BM25Index``, so ingestion keeps both in sync.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._chunks: Dict[str, Dict[str, None]] = {}  # entity key -> ordered set of chunk ids
+        self._chunk_keys: Dict[str, List[str]] = {}    # chunk id -> entity keys
+        self._names: Dict[str, str] = {}               # normalized name or alias -> entity key
+        self._max_words = 1
+        self._lock = threading.Lock()
+        self.dirty = False
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._chunk_keys)
+
+    @property
+    def entities(self) -> int:
+        return len(self._chunks)
+
+    def _register_name(self, name: str, key: str):
+        normalized = normalize_name(name)
+        if normalized and normalized not in self._names:
+            self._names[normalized] = key
+            self._max_words = max(self._max_words, len(normalized.split()))
+
+    def _entity_keys(self, doc: Document) -> List[str]:
+        metadata = doc.metadata
+        disorder = metadata.get("disorder")
+        codes = list(metadata.get("codes") or [])
+        if not disorder and not codes:
+            head = doc.page_content[:160]
+            match = LEADING_DISORDER.match(head)
+            disorder = match.group(1) if match else None
+            codes = CODE_IN_TEXT.findall(head) if match else []
+
+        keys = []
+        if disorder:
+            name = normalize_name(disorder)
+            key = f"disorder:{name}"
+            keys.append(key)
+            self._register_name(name, key)
+            for alias in _ALIASES_BY_NAME.get(name, ()):
+                self._register_name(alias, key)
+        keys.extend(f"code:{code.upper()}" for code in codes)
+        keys.extend(f"code:{code.split('.', 1)[0].upper()}" for code in codes if "." in code)
+        return list(dict.fromkeys(keys))
+
+    def _unindex(self, chunk_id: str):
+        for key in self._chunk_keys.pop(chunk_id, ()):
+            chunks = self._chunks.get(key)
+            if chunks is not None:
+                chunks.pop(chunk_id, None)
+                if not chunks:
+                    del self._chunks[key]
+
+    def _index(self, chunk_id: str, keys: List[str]):
+        if keys:
+            self._chunk_keys[chunk_id] = keys
+        for key in keys:
+            self._chunks.setdefault(key, {})[chunk_id] = None
+
+    def add(self, ids: Sequence[str], documents: Sequence[Document]):
+        with self._lock:
+            for chunk_id, doc in zip(ids, documents):
+                chunk_id = str(chunk_id)
+                keys = self._entity_keys(doc)
+                if self._chunk_keys.get(chunk_id, []) == keys:
+                    continue
+                self._unindex(chunk_id)
+                self._index(chunk_id, keys)
+                self.dirty = True
+
+    def remove(self, ids: Iterable[str]):
+        with self._lock:
+            for chunk_id in ids:
+                if str(chunk_id) in self._chunk_keys:
+                    self._unindex(str(chunk_id))
+                    self.dirty = True
+
+    def _lookup_code(self, code: str) -> Optional[str]:
+        for candidate in code_keys(code):
+            if f"code:{candidate}" in self._chunks:
+                return f"code:{candidate}"
+        return None
+
+    def resolve_entities(self, question: str) -> List[str]:
+        """Entity keys named in a question (codes first, then names, in order)"""
+        keys = []
+        for code in CODE_IN_TEXT.findall(question):
+            key = self._lookup_code(code)
+            if key:
+                keys.append(key)
+
+        tokens = normalize_name(question).split()
+        i = 0
+        while i < len(tokens):
+            for n in range(min(self._max_words, len(tokens) - i), 0, -1):
+                key = self._names.get(" ".join(tokens[i:i + n]))
+                if key:
+                    keys.append(key)
+                    i += n
+                    break
+            else:
+                i += 1
+        return list(dict.fromkeys(key for key in keys if key in self._chunks))
+
+    def resolve(self, question: str) -> List[str]:
+        """Ids of the chunks for every entity named in a question"""
+        with self._lock:
+            chunk_ids: Dict[str, None] = {}
+            for key in self.resolve_entities(question):
+                chunk_ids.update(self._chunks[key])
+            return list(chunk_ids)
+
+    def save(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given for the entity index")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            payload = {"chunks": self._chunk_keys, "names": self._names}
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+            self.dirty = False
+
+    def load(self, path: Optional[str] = None):
+        with open(path or self.path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        with self._lock:
+            self._chunks, self._chunk_keys, self._names, self._max_words = {}, {}, {}, 1
+            for chunk_id, keys in payload["chunks"].items():
+                self._index(chunk_id, keys)
+            for name, key in payload["names"].items():
+                self._register_name(name, key)
+            self.dirty = False
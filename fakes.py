@@ -0,0 +1,381 @@
+"""
+Deterministic local stand-ins for external services, for offline tests and benchmarks
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import textwrap
+import threading
+import time
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.language_models import SimpleChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+def fake_embedding(text: str, size: int = 1536) -> List[float]:
+    """Deterministic unit vector derived from the text's hash"""
+    seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+    vector = np.random.default_rng(seed).standard_normal(size)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class BagOfWordsEmbeddings(Embeddings):
+    """Hashed bag-of-words vectors, so texts sharing words embed close together"""
+
+    def __init__(self, size: int = 256):
+        self.size = size
+        self.queries = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.size)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[zlib.crc32(word.encode()) % self.size] += 1
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.queries += 1
+        return self._embed(text)
+
+
+class FakeEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic fake embeddings with a simulated per-request ``latency`` (seconds)"""
+    latency: float = 0.0
+    calls: int = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return super().embed_query(text)
+
+
+class FakeEmbeddingServer:
+    """Local HTTP server speaking the OpenAI ``/v1/embeddings`` API with rate limits.
+
+    Requests and (estimated) tokens are counted over a sliding window of
+    ``window`` seconds; a request that would exceed ``requests_per_window`` or
+    ``tokens_per_window``, or that sends more than ``max_inputs`` inputs,
+    gets a 429 (or 400) like the real API. Point an OpenAI client or
+    ``OpenAIEmbeddings(base_url=..., api_key="test", max_retries=0)`` at
+    ``base_url``. Inputs may be strings or token-id arrays.
+    """
+
+    def __init__(self, requests_per_window: int = 60, tokens_per_window: int = 1_000_000,
+                 window: float = 1.0, max_inputs: int = 2048, dimensions: int = 64, latency: float = 0.0):
+        self.requests_per_window = requests_per_window
+        self.tokens_per_window = tokens_per_window
+        self.window = window
+        self.max_inputs = max_inputs
+        self.dimensions = dimensions
+        self.latency = latency
+
+        self._log = deque()  # (timestamp, tokens) of accepted requests
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+        self.max_batch_seen = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                status, payload, headers = server.handle(body)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def handle(self, body):
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        if len(inputs) > self.max_inputs:
+            return 400, {"error": {"message": f"Too many inputs (max {self.max_inputs})"}}, {}
+
+        # Token-id arrays (as sent by OpenAIEmbeddings) count exactly, strings are estimated
+        tokens = sum(len(item) if isinstance(item, list) else len(item) // 4 + 1 for item in inputs)
+        with self._lock:
+            now = time.monotonic()
+            while self._log and now - self._log[0][0] > self.window:
+                self._log.popleft()
+            used_tokens = sum(t for _, t in self._log)
+            if len(self._log) >= self.requests_per_window or used_tokens + tokens > self.tokens_per_window:
+                self.rejected += 1
+                retry_after = max(0.01, self.window - (now - self._log[0][0])) if self._log else self.window
+                return 429, {"error": {"message": "Rate limit reached", "type": "requests"}}, {
+                    "retry-after": f"{retry_after:.3f}"
+                }
+            self._log.append((now, tokens))
+            self.accepted += 1
+            self.max_batch_seen = max(self.max_batch_seen, len(inputs))
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        return 200, {
+            "object": "list",
+            "model": body.get("model", "fake-embedding"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(json.dumps(item), self.dimensions)}
+                for i, item in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }, {}
+
+
+class FakeChatModel(SimpleChatModel):
+    """Chat model that answers by matching substrings of the prompt.
+
+    ``rules`` is a list of ``(substring, response)`` pairs checked in order
+    against the concatenated prompt messages; ``default`` is returned when
+    nothing matches. Unlike ``FakeListChatModel`` the answer does not depend
+    on call order, so concurrent calls stay deterministic. ``latency`` adds a
+    per-call delay to simulate the API round trip and ``token_latency`` a
+    per-token delay; streaming yields the response word by word. Async calls
+    wait with ``asyncio.sleep`` so many can be in flight on one event loop.
+    ``last_prompt`` holds the text of the most recent prompt.
+    """
+    rules: List[Tuple[str, str]] = []
+    default: str = "This is educational information from the DSM-5."
+    latency: float = 0.0
+    token_latency: float = 0.0
+    calls: int = 0
+    last_prompt: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        self.calls += 1
+        prompt = "\n".join(str(message.content) for message in messages)
+        self.last_prompt = prompt
+        response = next((response for substring, response in self.rules if substring in prompt), self.default)
+        return re.findall(r"\S+\s*", response)
+
+    def _call(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+              run_manager: Any = None, **kwargs: Any) -> str:
+        tokens = self._tokens(messages)
+        time.sleep(self.latency + self.token_latency * len(tokens))
+        return "".join(tokens)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        tokens = self._tokens(messages)
+        time.sleep(self.latency)
+        for token in tokens:
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency + self.token_latency * len(tokens))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency)
+        for token in tokens:
+            await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+# Short DSM-5-style passages for offline chatbots, tests and benchmarks
+SAMPLE_DSM5_TEXTS = [
+    "Major Depressive Disorder 296.2x (F32.x). Criterion A: Five (or more) of the following symptoms "
+    "have been present during the same 2-week period: depressed mood, markedly diminished interest "
+    "or pleasure, significant weight loss, insomnia or hypersomnia, psychomotor agitation, fatigue.",
+    "Generalized Anxiety Disorder 300.02 (F41.1). Excessive anxiety and worry occurring more days than "
+    "not for at least 6 months, about a number of events or activities, difficult to control.",
+    "Attention-Deficit/Hyperactivity Disorder 314.01 (F90.2). A persistent pattern of inattention "
+    "and/or hyperactivity-impulsivity that interferes with functioning or development.",
+    "Bipolar I Disorder 296.4x (F31.x). Criteria have been met for at least one manic episode: a "
+    "distinct period of abnormally and persistently elevated, expansive, or irritable mood.",
+    "Posttraumatic Stress Disorder 309.81 (F43.10). Exposure to actual or threatened death, serious "
+    "injury, or sexual violence, followed by intrusion symptoms and persistent avoidance.",
+    "Panic Disorder 300.01 (F41.0). Recurrent unexpected panic attacks: an abrupt surge of intense "
+    "fear or intense discomfort that reaches a peak within minutes.",
+    "Obsessive-Compulsive Disorder 300.3 (F42). Presence of obsessions, compulsions, or both, that "
+    "are time-consuming or cause clinically significant distress or impairment in functioning.",
+    "Insomnia Disorder 307.42 (F51.01). A predominant complaint of dissatisfaction with sleep "
+    "quantity or quality, occurring at least 3 nights per week for at least 3 months.",
+]
+
+# Chapters and disorders (with ICD-9/ICD-10 codes) for the synthetic DSM-5 corpus
+SAMPLE_DSM5_DISORDERS = [
+    ("Depressive Disorders", "Major Depressive Disorder", "296.2x (F32.x)"),
+    ("Depressive Disorders", "Persistent Depressive Disorder", "300.4 (F34.1)"),
+    ("Depressive Disorders", "Premenstrual Dysphoric Disorder", "625.4 (N94.3)"),
+    ("Bipolar and Related Disorders", "Bipolar I Disorder", "296.4x (F31.x)"),
+    ("Bipolar and Related Disorders", "Cyclothymic Disorder", "301.13 (F34.0)"),
+    ("Anxiety Disorders", "Generalized Anxiety Disorder", "300.02 (F41.1)"),
+    ("Anxiety Disorders", "Panic Disorder", "300.01 (F41.0)"),
+    ("Anxiety Disorders", "Social Anxiety Disorder", "300.23 (F40.10)"),
+    ("Trauma- and Stressor-Related Disorders", "Posttraumatic Stress Disorder", "309.81 (F43.10)"),
+    ("Trauma- and Stressor-Related Disorders", "Acute Stress Disorder", "308.3 (F43.0)"),
+    ("Obsessive-Compulsive and Related Disorders", "Obsessive-Compulsive Disorder", "300.3 (F42)"),
+    ("Obsessive-Compulsive and Related Disorders", "Hoarding Disorder", "300.3 (F42)"),
+    ("Sleep-Wake Disorders", "Insomnia Disorder", "307.42 (F51.01)"),
+    ("Sleep-Wake Disorders", "Narcolepsy", "347.00 (G47.419)"),
+    ("Neurodevelopmental Disorders", "Attention-Deficit/Hyperactivity Disorder", "314.01 (F90.2)"),
+    ("Neurodevelopmental Disorders", "Autism Spectrum Disorder", "299.00 (F84.0)"),
+]
+
+_SAMPLE_WORDS = (
+    "symptoms persistent mood sleep appetite energy concentration worry interest functioning social "
+    "occupational clinically significant distress impairment episode duration onset course individuals "
+    "adults children adolescents prevalence risk factors family history stressful events medical "
+    "condition substance physiological effects criteria diagnosis associated features typically often "
+    "may must present most days weeks months behavior thoughts feelings avoidance agitation fatigue"
+).split()
+
+
+def _sample_prose(rng, sentences: int) -> List[str]:
+    text = " ".join(
+        " ".join(rng.choice(_SAMPLE_WORDS) for _ in range(rng.randint(10, 22))).capitalize() + "."
+        for _ in range(sentences)
+    )
+    return textwrap.wrap(text, 90)
+
+
+def sample_dsm5_lines(disorders=SAMPLE_DSM5_DISORDERS, seed: int = 0) -> List[str]:
+    """Lines of synthetic DSM-5-formatted text: chapter and disorder headings,
+    code lines, lettered criteria with numbered items, specifiers and the
+    usual descriptive sections"""
+    rng = random.Random(seed)
+    lines, chapter = [], None
+    for chapter_name, name, codes in disorders:
+        if chapter_name != chapter:
+            chapter = chapter_name
+            lines += [chapter_name, *_sample_prose(rng, 3)]
+        lines += [name, "Diagnostic Criteria " + codes]
+        for letter in "ABCDE"[:rng.randint(3, 5)]:
+            criterion = _sample_prose(rng, 1)
+            lines.append(f"{letter}. {criterion[0]}")
+            lines += criterion[1:]
+            if letter == "A":
+                for item in range(1, rng.randint(4, 9)):
+                    item_lines = _sample_prose(rng, 1)
+                    lines.append(f"{item}. {item_lines[0]}")
+                    lines += item_lines[1:]
+        lines.append("Specify if:")
+        lines += [f"With {rng.choice(_SAMPLE_WORDS)} features: " + " ".join(_sample_prose(rng, 1))
+                  for _ in range(rng.randint(1, 3))]
+        for section in ("Diagnostic Features", "Prevalence", "Development and Course", "Differential Diagnosis"):
+            lines += [section, *_sample_prose(rng, rng.randint(3, 10))]
+    return lines
+
+
+def sample_dsm5_pages(disorders=SAMPLE_DSM5_DISORDERS, lines_per_page: int = 40, seed: int = 0) -> List[Document]:
+    """The synthetic corpus laid out as PDF pages with running headers and page numbers"""
+    lines = sample_dsm5_lines(disorders, seed)
+    pages, chapter = [], disorders[0][0]
+    chapters = {entry[0] for entry in disorders}
+    for start in range(0, len(lines), lines_per_page):
+        body = lines[start:start + lines_per_page]
+        number = len(pages) + 1
+        pages.append(Document(page_content="\n".join([chapter, *body, str(number)]),
+                              metadata={"source": "DSM-5", "page": number}))
+        chapter = next((line for line in reversed(body) if line in chapters), chapter)
+    return pages
+
+
+# Prompt substrings -> canned replies for the chatbot's prompts
+CHATBOT_RULES = [
+    ("You are a diagnostic assessment agent", "PROVIDE_CAUTIOUS"),
+    ("formulate a standalone question", "What are the DSM-5 criteria for this condition?"),
+    ("clarifying questions", "Could you tell me how long you have noticed these symptoms, "
+                             "and how they affect your work, school or relationships?"),
+]
+
+
+def build_fake_chatbot(workdir: str, latency: float = 0.0, token_latency: float = 0.0,
+                       answer_words: int = 60, texts: List[str] = None, embedding_size: int = 64,
+                       embedding_latency: float = 0.0, llm: "FakeChatModel" = None, **chatbot_kwargs):
+    """DSM5Chatbot wired to a local vector store, fake embeddings and FakeChatModel.
+
+    ``latency``/``token_latency`` shape the simulated LLM calls,
+    ``embedding_latency`` the embedding requests and ``answer_words`` the
+    length of RAG answers; ``llm`` replaces the default model (and its
+    rules) entirely. Everything lives under ``workdir``; no API keys or
+    network are needed.
+    """
+    from database import SupabaseDB
+    from ingest_pipeline import IngestPipeline
+    from rag_chatbot import DSM5Chatbot
+
+    overrides = {
+        "LOCAL_VECTOR_STORE_PATH": os.path.join(workdir, "store"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embedding_cache.sqlite"),
+        "RETRIEVAL_INDEX_DIR": os.path.join(workdir, "retrieval_index"),
+        "INGEST_MANIFEST_PATH": os.path.join(workdir, "ingest_manifest.sqlite"),
+    }
+    previous = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    try:
+        db = SupabaseDB(backend="local", embeddings=FakeEmbeddings(size=embedding_size, latency=embedding_latency))
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    store = db.get_vector_store()
+    if texts is None:
+        texts = SAMPLE_DSM5_TEXTS
+    if texts and not len(store):
+        documents = [Document(page_content=text, metadata={"page": i + 1, "source": "DSM-5"})
+                     for i, text in enumerate(texts)]
+        IngestPipeline(store, db.embeddings, verbose=False, indexes=[db.get_lexical_index(), db.get_entity_index()]).run(documents)
+
+    answer = " ".join(["According to the DSM-5 criteria, this condition involves"] +
+                      ["symptoms"] * max(0, answer_words - 8))
+    if llm is None:
+        llm = FakeChatModel(rules=CHATBOT_RULES, default=answer, latency=latency, token_latency=token_latency)
+    return DSM5Chatbot(db=db, llm=llm, **chatbot_kwargs)
@@ -0,0 +1,244 @@
+"""
+Hybrid retrieval: vector similarity and BM25 fused by reciprocal rank
+"""
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.pydantic_v1 import PrivateAttr
+from langchain_core.retrievers import BaseRetriever
+
+import tracing
+from adaptive_k import choose_k, describe
+from local_vector_store import LocalVectorStore
+from mmr import maximal_marginal_relevance
+
+RETRIEVAL_MODES = ("hybrid", "vector", "lexical")
+
+
+def _doc_key(doc: Document) -> str:
+    # Vector store results carry no row id, so chunks are matched by content
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def _fused_scores(ranked_lists: Sequence[Sequence[Document]], rrf_k: int) -> List[Tuple[Document, float]]:
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked):
+            key = _doc_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [(docs[key], scores[key]) for key in ordered]
+
+
+def reciprocal_rank_fusion(ranked_lists: Sequence[Sequence[Document]], k: int,
+                           rrf_k: int = 60) -> List[Document]:
+    """Merge ranked document lists by summing 1 / (rrf_k + rank) per chunk.
+
+    A chunk found by several retrievers outranks one found by a single
+    retriever at a similar rank; scores are never compared across lists, so
+    BM25 and cosine scores need no normalization.
+    """
+    return [doc for doc, _ in _fused_scores(ranked_lists, rrf_k)[:k]]
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever that fuses vector search with a BM25 lexical index.
+
+    Each side returns ``fetch_k`` candidates and the fused top ``k`` are kept.
+    In ``hybrid`` mode a failing vector search (e.g. the embedding API is
+    down) degrades to lexical results instead of failing the question;
+    ``lexical`` mode never calls the embedding API at all.
+
+    With an ``entity_index``, a question naming a disorder or ICD code is
+    answered from that entity's chunks only: up to ``k`` of them are fetched
+    directly (no embedding call), more are ranked by vector and BM25 search
+    restricted to them. ``stats()`` reports how often this shortcut fired.
+
+    With ``mmr`` on, the fused ``fetch_k`` candidates are diversified down to
+    ``k`` by maximal marginal relevance (``mmr_lambda`` trades relevance for
+    diversity), so near-identical chunks don't fill every slot. Vector
+    candidates are fetched with their embeddings; lexical-only ones are
+    looked up in the vector store by id where it supports that.
+
+    With ``adaptive_k`` on, the number of fused results is chosen per query
+    from the candidates' scores (cosine similarity, or BM25 without vectors)
+    instead of always ``k``: those within ``score_gap`` of the best hit or
+    above the largest score drop are kept, between ``min_k`` and ``max_k``.
+
+    While a chat trace is active, the query embedding, the vector search and
+    the BM25 search are each recorded as a span with its document count, and
+    an adaptive choice as a ``select_k`` span with the score distribution.
+    """
+
+    vector_store: Any
+    lexical_index: Any = None
+    entity_index: Any = None
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+    mode: str = "hybrid"
+    mmr: bool = False
+    mmr_lambda: float = 0.5
+    adaptive_k: bool = False
+    min_k: int = 2
+    max_k: int = 8
+    score_gap: float = 0.05
+    queries: int = 0
+    selections: int = 0
+    selected: int = 0
+    entity_shortcuts: int = 0
+    vector_failures: int = 0
+    _lock: Any = PrivateAttr(default=None)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Counters are updated from executor threads when queries run concurrently
+        self._lock = threading.Lock()
+
+    def _vector_results(self, query: str, k: int, embeddings: Optional[Dict[str, np.ndarray]] = None,
+                        scores: Optional[List[float]] = None, **kwargs: Any) -> Optional[List[Document]]:
+        """Vector search results; with an ``embeddings`` dict, also collect the candidates' vectors,
+        with a ``scores`` list their similarities"""
+        try:
+            with tracing.span("embed"):
+                vector = self.vector_store.embeddings.embed_query(query)
+            with tracing.span("vector_search") as span:
+                if embeddings is not None:
+                    results = self.vector_store.similarity_search_by_vector_returning_embeddings(vector, k, **kwargs)
+                    for doc, _, embedding in results:
+                        if len(embedding):
+                            embeddings[_doc_key(doc)] = embedding
+                    scored = [(doc, score) for doc, score, _ in results]
+                elif scores is not None:
+                    scored = self.vector_store.similarity_search_by_vector_with_relevance_scores(vector, k, **kwargs)
+                else:
+                    scored = [(doc, None) for doc in self.vector_store.similarity_search_by_vector(vector, k=k, **kwargs)]
+                docs = [doc for doc, _ in scored]
+                if scores is not None:
+                    scores.extend(score for _, score in scored)
+                span.set(docs=len(docs))
+            return docs
+        except Exception as e:
+            if self.mode == "vector" or not self.lexical_index:
+                raise
+            with self._lock:
+                self.vector_failures += 1
+            print(f"⚠️ Vector search failed ({e}); using lexical results only")
+            return None
+
+    def _lexical_results(self, query: str, k: int, ids: Optional[List[str]] = None,
+                         scores: Optional[List[float]] = None) -> List[Document]:
+        with tracing.span("lexical_search") as span:
+            results = self.lexical_index.search(query, k, ids=ids)
+            span.set(docs=len(results))
+        if scores is not None:
+            scores.extend(score for _, score in results)
+        return [doc for doc, _ in results]
+
+    def _select_k(self, vector_scores: Optional[List[float]], lexical_scores: Optional[List[float]]) -> int:
+        """Number of fused results to return: ``k``, or chosen from the candidates' scores"""
+        if not self.adaptive_k:
+            return self.k
+        # BM25 scores only decide when there are no similarities to go by
+        scores = vector_scores or lexical_scores or []
+        k = choose_k(scores, self.min_k, self.max_k, self.score_gap)
+        with tracing.span("select_k", source="vector" if vector_scores else "lexical", **describe(scores, k)):
+            with self._lock:
+                self.selections += 1
+                self.selected += k
+        return k
+
+    def _top(self, ranked_lists: List[List[Document]], embeddings: Optional[Dict[str, np.ndarray]],
+             k: int = None) -> List[Document]:
+        """Fused top ``k``, diversified by MMR over the fused candidates when enabled"""
+        k = self.k if k is None else k
+        if embeddings is None:
+            return reciprocal_rank_fusion(ranked_lists, k, self.rrf_k)
+        candidates = _fused_scores(ranked_lists, self.rrf_k)[:self.fetch_k]
+        if len(candidates) <= k:
+            return [doc for doc, _ in candidates]
+
+        keys = [_doc_key(doc) for doc, _ in candidates]
+        missing = [doc.id for (doc, _), key in zip(candidates, keys) if key not in embeddings and doc.id]
+        stored = self.vector_store.get_vectors(missing) if missing and hasattr(self.vector_store, "get_vectors") else {}
+        vectors = [embeddings.get(key, stored.get(doc.id)) for (doc, _), key in zip(candidates, keys)]
+        dim = next((len(vector) for vector in vectors if vector is not None), 1)
+        matrix = np.array([np.zeros(dim, dtype=np.float32) if vector is None else vector for vector in vectors])
+
+        scores = np.array([score for _, score in candidates], dtype=np.float32)
+        picked = maximal_marginal_relevance(None, matrix, k, self.mmr_lambda, relevance=scores / scores[0])
+        return [candidates[i][0] for i in picked]
+
+    def _entity_results(self, query: str, ids: List[str]) -> Optional[List[Document]]:
+        """Chunks of the entities named in the query, or None if they can't be ranked here"""
+        has_lexical = self.mode != "vector" and bool(self.lexical_index)
+        ids_filter = isinstance(self.vector_store, LocalVectorStore)
+        if not has_lexical and not ids_filter:
+            return None
+
+        vector_scores = [] if self.adaptive_k else None
+        lexical_scores = [] if self.adaptive_k else None
+        ranked = [self._lexical_results(query, len(ids), ids, lexical_scores)] if has_lexical else []
+        if len(ids) <= self.k:
+            # Few enough to return them all: order by BM25, no embedding call needed
+            direct = self.lexical_index.get(ids) if has_lexical else self.vector_store.get_by_ids(ids)
+            return reciprocal_rank_fusion(ranked + [direct], self.k, self.rrf_k)
+
+        embeddings = {} if self.mmr else None
+        if ids_filter and self.mode != "lexical":
+            vector_docs = self._vector_results(query, self.fetch_k, embeddings, vector_scores, ids=ids)
+            if vector_docs is not None:
+                ranked.append(vector_docs)
+        return self._top(ranked, embeddings, self._select_k(vector_scores, lexical_scores))
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        if self.mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {self.mode}")
+        with self._lock:
+            self.queries += 1
+        entity_ids = self.entity_index.resolve(query) if self.entity_index is not None else []
+        if entity_ids:
+            docs = self._entity_results(query, entity_ids)
+            if docs:
+                with self._lock:
+                    self.entity_shortcuts += 1
+                return docs
+
+        embeddings = {} if self.mmr else None
+        vector_scores = [] if self.adaptive_k else None
+        lexical_scores = [] if self.adaptive_k else None
+        # A single ranking is over-fetched only when MMR or the adaptive count needs candidates
+        single_k = self.fetch_k if self.mmr or self.adaptive_k else self.k
+        use_lexical = self.mode != "vector" and self.lexical_index is not None and len(self.lexical_index) > 0
+        if self.mode == "lexical" and use_lexical:
+            ranked = [self._lexical_results(query, single_k, scores=lexical_scores)]
+        elif not use_lexical:
+            ranked = [self._vector_results(query, single_k, embeddings, vector_scores)]
+        else:
+            vector_docs = self._vector_results(query, self.fetch_k, embeddings, vector_scores)
+            lexical_docs = self._lexical_results(query, self.fetch_k, scores=lexical_scores)
+            ranked = [lexical_docs] if vector_docs is None else [vector_docs, lexical_docs]
+        return self._top(ranked, embeddings, self._select_k(vector_scores, lexical_scores))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queries, shortcuts, failures = self.queries, self.entity_shortcuts, self.vector_failures
+            selections, selected = self.selections, self.selected
+        return {
+            "mode": self.mode,
+            "mmr": self.mmr,
+            "adaptive_k": self.adaptive_k,
+            "mean_k": round(selected / selections, 2) if selections else self.k,
+            "queries": queries,
+            "entity_shortcuts": shortcuts,
+            "shortcut_rate": round(shortcuts / queries, 3) if queries else 0.0,
+            "vector_failures": failures,
+        }
@@ -0,0 +1,115 @@
+"""
+Local manifest of ingested chunks for resumable, idempotent ingestion
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Tuple
+
+from langchain.schema import Document
+
+# Namespace for deterministic row ids: uuid5(namespace, "<table>:<source>:<chunk_id>")
+ROW_ID_NAMESPACE = uuid.UUID("5b1f3c1e-8d2a-4f4e-9a57-2f0d6c3e9b41")
+
+
+def deterministic_row_id(source: str, chunk_id, table_name: str = "documents") -> str:
+    """Stable row id for a chunk so re-ingesting it upserts instead of duplicating"""
+    return str(uuid.uuid5(ROW_ID_NAMESPACE, f"{table_name}:{source}:{chunk_id}"))
+
+
+class ChunkManifest:
+    """Tracks (source, chunk_id) -> (content hash, row id, status) in SQLite.
+
+    Status is ``done`` once a chunk's upsert succeeded and ``failed`` when its
+    batch failed. On re-run, chunks that are ``done`` with an unchanged hash
+    are skipped; everything else (new, changed or failed) is upserted again
+    under the same deterministic row id, so nothing is duplicated.
+    """
+
+    def __init__(self, path: str = "./ingest_manifest.sqlite", table_name: str = "documents"):
+        self.path = path
+        self.table_name = table_name
+
+        manifest_dir = os.path.dirname(path)
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS chunks (
+                table_name TEXT NOT NULL,
+                source TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                row_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (table_name, source, chunk_id)
+            )"""
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def content_hash(doc: Document) -> str:
+        """SHA-256 over chunk text and metadata"""
+        payload = doc.page_content + "\0" + json.dumps(doc.metadata, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def row_id(self, source: str, chunk_id) -> str:
+        return deterministic_row_id(source, chunk_id, self.table_name)
+
+    def load_source(self, source: str) -> Dict[str, Tuple[str, str]]:
+        """Return {chunk_id: (content_hash, status)} for one source"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id, content_hash, status FROM chunks WHERE table_name = ? AND source = ?",
+                (self.table_name, source),
+            ).fetchall()
+        return {chunk_id: (content_hash, status) for chunk_id, content_hash, status in rows}
+
+    def mark(self, entries: Iterable[Tuple[str, str, str]], status: str):
+        """Record (source, chunk_id, content_hash) entries with the given status"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                """INSERT OR REPLACE INTO chunks
+                   (table_name, source, chunk_id, content_hash, row_id, status, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                [
+                    (self.table_name, source, str(chunk_id), content_hash,
+                     self.row_id(source, chunk_id), status, now)
+                    for source, chunk_id, content_hash in entries
+                ],
+            )
+            self._conn.commit()
+
+    def stale_chunks(self, source: str, seen_chunk_ids: Iterable) -> List[Tuple[str, str]]:
+        """(chunk_id, row_id) pairs stored for ``source`` but not produced this run"""
+        seen = {str(chunk_id) for chunk_id in seen_chunk_ids}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id, row_id FROM chunks WHERE table_name = ? AND source = ?",
+                (self.table_name, source),
+            ).fetchall()
+        return [(chunk_id, row_id) for chunk_id, row_id in rows if chunk_id not in seen]
+
+    def remove(self, source: str, chunk_ids: Iterable[str]):
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM chunks WHERE table_name = ? AND source = ? AND chunk_id = ?",
+                [(self.table_name, source, str(chunk_id)) for chunk_id in chunk_ids],
+            )
+            self._conn.commit()
+
+    def counts(self) -> Dict[str, int]:
+        """Number of chunks per status"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM chunks WHERE table_name = ? GROUP BY status",
+                (self.table_name,),
+            ).fetchall()
+        return dict(rows)
@@ -0,0 +1,412 @@
+"""
+Streaming, bounded-memory ingestion pipeline: parse -> split -> embed -> upsert
+"""
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from langchain.schema import Document
+from ingest_manifest import ChunkManifest, deterministic_row_id
+from rate_limiter import RateLimitedEmbeddings
+
+_DONE = object()
+
+
+class _Aborted(Exception):
+    """Raised inside a stage when another stage has failed"""
+
+
+class StageStats:
+    """Item count and busy time for one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_sec": round(self.items / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+        }
+
+
+class IngestPipeline:
+    """Runs ingestion as four threads connected by bounded queues.
+
+    Pages are pulled lazily from the input iterable (parse), split into chunks
+    (split), embedded in batches (embed) and written to the vector store
+    (upsert). Each queue holds at most ``queue_size`` items, so memory stays
+    bounded regardless of document size and all stages overlap.
+
+    If ``text_splitter`` is None the input is assumed to be chunks already.
+    A failed embed/upsert batch is logged and skipped, like the old batch
+    uploader; errors while parsing or splitting abort the run.
+
+    Chunks are numbered per source and upserted under deterministic row ids.
+    With a ``manifest``, chunks already stored with the same content hash are
+    skipped, failed batches are retried on the next run, and (with
+    ``prune_stale``) chunks a source no longer produces are deleted.
+
+    Embedding batches run concurrently. With a ``rate_limiter`` (the
+    ``RateLimitedEmbeddings`` behind ``embeddings``) the batch size and number
+    of in-flight batches follow its adaptive values; otherwise ``batch_size``
+    and ``embed_concurrency`` are fixed.
+
+    ``indexes`` are side indexes over the chunks (e.g. a ``BM25Index``) with
+    ``add(ids, documents)``, ``remove(ids)`` and ``save()``. They receive every
+    upserted batch and the chunks skipped as unchanged (no embedding needed),
+    drop pruned chunks, and are saved after the run when they have a ``path``.
+    """
+
+    def __init__(self, vector_store, embeddings, text_splitter=None, batch_size: int = 64,
+                 queue_size: int = 8, metadata: Optional[Dict[str, Any]] = None, verbose: bool = True,
+                 manifest: Optional[ChunkManifest] = None, prune_stale: bool = True,
+                 rate_limiter: Optional[RateLimitedEmbeddings] = None, embed_concurrency: int = 1,
+                 indexes: Sequence[Any] = ()):
+        self.vector_store = vector_store
+        self.embeddings = embeddings
+        self.text_splitter = text_splitter
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.metadata = metadata or {}
+        self.verbose = verbose
+        self.manifest = manifest
+        self.prune_stale = prune_stale
+        self.rate_limiter = rate_limiter
+        self.embed_concurrency = embed_concurrency
+        self.indexes = list(indexes or ())
+        self.table_name = manifest.table_name if manifest else getattr(vector_store, "table_name", "documents")
+
+        self.stats = {name: StageStats(name) for name in ("parse", "split", "embed", "upsert")}
+        self.failed_batches = 0
+        self.skipped = 0
+        self._chunk_counters: Dict[str, int] = defaultdict(int)
+        self._seen: Dict[str, Set[str]] = defaultdict(set)
+        self._known: Dict[str, Dict[str, tuple]] = {}
+        self._abort = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    # ------------------------------------------------------------------
+    # Queue helpers
+    # ------------------------------------------------------------------
+    def _put(self, q: queue.Queue, item):
+        while True:
+            if self._abort.is_set():
+                raise _Aborted()
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue):
+        while True:
+            if self._abort.is_set():
+                raise _Aborted()
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _finish(self, q: queue.Queue):
+        try:
+            q.put(_DONE, timeout=1)
+        except queue.Full:
+            pass
+
+    def _prepare_chunk(self, chunk: Document) -> bool:
+        """Attach metadata and chunk id; return False if the manifest says it's unchanged"""
+        chunk.metadata.update(self.metadata)
+        source = str(chunk.metadata.setdefault("source", "unknown"))
+        if "chunk_id" not in chunk.metadata:
+            chunk.metadata["chunk_id"] = self._chunk_counters[source]
+            self._chunk_counters[source] += 1
+        chunk_id = str(chunk.metadata["chunk_id"])
+        self._seen[source].add(chunk_id)
+
+        if self.manifest is None:
+            return True
+        if source not in self._known:
+            self._known[source] = self.manifest.load_source(source)
+        return self._known[source].get(chunk_id) != (ChunkManifest.content_hash(chunk), "done")
+
+    def _manifest_entries(self, batch: List[Document]):
+        return [
+            (str(doc.metadata["source"]), doc.metadata["chunk_id"], ChunkManifest.content_hash(doc))
+            for doc in batch
+        ]
+
+    def _row_ids(self, batch: List[Document]) -> List[str]:
+        return [
+            deterministic_row_id(str(doc.metadata["source"]), doc.metadata["chunk_id"], self.table_name)
+            for doc in batch
+        ]
+
+    def _index(self, batch: List[Document], ids: List[str]):
+        for index in self.indexes:
+            index.add(ids, batch)
+
+    def _mark(self, batch: List[Document], status: str):
+        if self.manifest is not None:
+            self.manifest.mark(self._manifest_entries(batch), status)
+
+    def _fail(self, error: BaseException):
+        if self._error is None:
+            self._error = error
+        self._abort.set()
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+    def _parse_stage(self, pages: Iterable[Document], outbox: queue.Queue):
+        stats = self.stats["parse"]
+        try:
+            iterator = iter(pages)
+            while True:
+                start = time.perf_counter()
+                page = next(iterator, _DONE)
+                stats.busy_seconds += time.perf_counter() - start
+                if page is _DONE:
+                    break
+                stats.items += 1
+                self._put(outbox, page)
+        except _Aborted:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._finish(outbox)
+
+    def _split_stage(self, inbox: queue.Queue, outbox: queue.Queue):
+        stats = self.stats["split"]
+        batch: List[Document] = []
+        try:
+            while True:
+                page = self._get(inbox)
+                if page is _DONE:
+                    break
+                start = time.perf_counter()
+                chunks = self.text_splitter.split_documents([page]) if self.text_splitter else [page]
+                stats.items += len(chunks)
+                changed = [self._prepare_chunk(chunk) for chunk in chunks]
+                unchanged = [chunk for chunk, is_changed in zip(chunks, changed) if not is_changed]
+                self.skipped += len(unchanged)
+                if self.indexes and unchanged:
+                    self._index(unchanged, self._row_ids(unchanged))
+                chunks = [chunk for chunk, is_changed in zip(chunks, changed) if is_changed]
+                stats.busy_seconds += time.perf_counter() - start
+
+                for chunk in chunks:
+                    batch.append(chunk)
+                    if len(batch) >= self.batch_size:
+                        self._put(outbox, batch)
+                        batch = []
+            if batch:
+                self._put(outbox, batch)
+        except _Aborted:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._finish(outbox)
+
+    def _embed_batch(self, batch: List[Document]):
+        return batch, self.embeddings.embed_documents([doc.page_content for doc in batch])
+
+    def _target_batch_size(self) -> int:
+        return self.rate_limiter.batch_size if self.rate_limiter else self.batch_size
+
+    def _target_concurrency(self) -> int:
+        return self.rate_limiter.concurrency if self.rate_limiter else self.embed_concurrency
+
+    def _embed_stage(self, inbox: queue.Queue, outbox: queue.Queue):
+        """Re-batch chunks to the current batch size and embed several batches concurrently"""
+        stats = self.stats["embed"]
+        buffer: List[Document] = []
+        in_flight = set()
+        busy_since = None
+        input_done = False
+
+        def collect(futures):
+            nonlocal busy_since
+            for future in futures:
+                in_flight.discard(future)
+                try:
+                    batch, vectors = future.result()
+                except Exception as e:
+                    batch = future.batch
+                    self.failed_batches += 1
+                    self._mark(batch, "failed")
+                    self._log(f"❌ Error embedding batch of {len(batch)} chunks: {e}")
+                else:
+                    stats.items += len(batch)
+                    self._put(outbox, (batch, vectors))
+            if not in_flight and busy_since is not None:
+                stats.busy_seconds += time.perf_counter() - busy_since
+                busy_since = None
+
+        max_workers = self.rate_limiter.max_concurrency if self.rate_limiter else self.embed_concurrency
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ingest-embed")
+        try:
+            while not input_done or buffer or in_flight:
+                # Pull chunks until a full batch is buffered or the input ends
+                while not input_done and len(buffer) < self._target_batch_size():
+                    item = self._get(inbox)
+                    if item is _DONE:
+                        input_done = True
+                    else:
+                        buffer.extend(item)
+
+                # Dispatch full batches (or the tail) while concurrency allows
+                while buffer and (input_done or len(buffer) >= self._target_batch_size()):
+                    while len(in_flight) >= max(1, self._target_concurrency()):
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    size = self._target_batch_size()
+                    batch, buffer = buffer[:size], buffer[size:]
+                    if busy_since is None:
+                        busy_since = time.perf_counter()
+                    future = executor.submit(self._embed_batch, batch)
+                    future.batch = batch
+                    in_flight.add(future)
+
+                if in_flight and (input_done or not buffer):
+                    done, _ = wait(in_flight, timeout=0 if not input_done else None,
+                                   return_when=FIRST_COMPLETED)
+                    collect(done)
+        except _Aborted:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._finish(outbox)
+
+    def _upsert_stage(self, inbox: queue.Queue):
+        stats = self.stats["upsert"]
+        try:
+            while True:
+                item = self._get(inbox)
+                if item is _DONE:
+                    break
+                batch, vectors = item
+                ids = self._row_ids(batch)
+                start = time.perf_counter()
+                try:
+                    self.vector_store.add_vectors(vectors, batch, ids)
+                except Exception as e:
+                    self.failed_batches += 1
+                    self._mark(batch, "failed")
+                    self._log(f"❌ Error upserting batch of {len(batch)} chunks: {e}")
+                    continue
+                finally:
+                    stats.busy_seconds += time.perf_counter() - start
+                self._mark(batch, "done")
+                self._index(batch, ids)
+                stats.items += len(batch)
+                self._log(f"✅ Uploaded {stats.items} chunks")
+        except _Aborted:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+    # ------------------------------------------------------------------
+    # Driver
+    # ------------------------------------------------------------------
+    def run(self, pages: Iterable[Document]) -> Dict[str, Any]:
+        """Run all stages to completion and return a throughput report"""
+        pages_q = queue.Queue(maxsize=self.queue_size)
+        chunks_q = queue.Queue(maxsize=self.queue_size)
+        vectors_q = queue.Queue(maxsize=self.queue_size)
+
+        threads = [
+            threading.Thread(target=self._parse_stage, args=(pages, pages_q), name="ingest-parse"),
+            threading.Thread(target=self._split_stage, args=(pages_q, chunks_q), name="ingest-split"),
+            threading.Thread(target=self._embed_stage, args=(chunks_q, vectors_q), name="ingest-embed"),
+            threading.Thread(target=self._upsert_stage, args=(vectors_q,), name="ingest-upsert"),
+        ]
+
+        # Structure-aware splitters carry the heading path across pages; start fresh
+        if hasattr(self.text_splitter, "reset"):
+            self.text_splitter.reset()
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        if self._error is not None:
+            raise self._error
+
+        deleted = self._prune_stale() if self.manifest is not None and self.prune_stale else 0
+        for index in self.indexes:
+            if getattr(index, "path", None):
+                index.save()
+
+        report = {
+            "pages": self.stats["parse"].items,
+            "chunks": self.stats["split"].items,
+            "upserted": self.stats["upsert"].items,
+            "skipped_unchanged": self.skipped,
+            "deleted_stale": deleted,
+            "failed_batches": self.failed_batches,
+            "elapsed_seconds": round(elapsed, 3),
+            "chunks_per_sec": round(self.stats["upsert"].items / elapsed, 1) if elapsed else 0.0,
+            "stages": {name: stage.as_dict() for name, stage in self.stats.items()},
+        }
+        if hasattr(self.embeddings, "stats"):
+            report["embedding_cache"] = self.embeddings.stats()
+        if self.rate_limiter is not None:
+            report["rate_limiter"] = self.rate_limiter.stats()
+        return report
+
+    def _prune_stale(self) -> int:
+        """Delete chunks that a re-ingested source no longer produces"""
+        deleted = 0
+        for source, seen in self._seen.items():
+            stale = self.manifest.stale_chunks(source, seen)
+            if not stale:
+                continue
+            chunk_ids, row_ids = zip(*stale)
+            try:
+                self.vector_store.delete(list(row_ids))
+            except Exception as e:
+                self._log(f"❌ Error deleting {len(row_ids)} stale chunks for {source}: {e}")
+                continue
+            self.manifest.remove(source, chunk_ids)
+            for index in self.indexes:
+                index.remove(row_ids)
+            deleted += len(row_ids)
+        return deleted
+
+    @staticmethod
+    def print_report(report: Dict[str, Any]):
+        print(f"📊 {report['pages']} pages -> {report['chunks']} chunks, "
+              f"{report['upserted']} upserted in {report['elapsed_seconds']}s "
+              f"({report['chunks_per_sec']} chunks/sec)")
+        for name, stage in report["stages"].items():
+            print(f"   {name:>6}: {stage['items']} items, {stage['busy_seconds']}s busy, "
+                  f"{stage['items_per_sec']}/sec")
+        if report.get("skipped_unchanged") or report.get("deleted_stale"):
+            print(f"♻️ {report['skipped_unchanged']} unchanged chunks skipped, "
+                  f"{report['deleted_stale']} stale chunks deleted")
+        if report["failed_batches"]:
+            print(f"⚠️ {report['failed_batches']} batches failed - re-run to retry them")
+        if "embedding_cache" in report:
+            cache = report["embedding_cache"]
+            print(f"🗃️ Embedding cache: {cache['hits']} hits, {cache['misses']} misses")
+        if "rate_limiter" in report:
+            limiter = report["rate_limiter"]
+            print(f"🚦 Embedding API: {limiter['api_calls']} calls, {limiter['rate_limited']} rate limited, "
+                  f"final batch size {limiter['batch_size']}, concurrency {limiter['concurrency']}")
@@ -0,0 +1,79 @@
+"""
+Single-pass multi-keyword matching with word boundaries and context windows
+"""
+import bisect
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence
+
+
+class KeywordMatcher:
+    """Finds every keyword of several categories in one regex pass over a text.
+
+    All keywords are compiled into one alternation (longest first) anchored at
+    a word boundary. Keywords match at the start of a word and may run into
+    the rest of it ("feel" matches "feels"), except those in ``whole_word``
+    categories, which must match whole words ("for" does not match "format").
+    A word matching a longer keyword also counts its keyword prefixes
+    ("feeling" counts both "feeling" and "feel").
+
+    ``scan`` returns ``{keyword: context}`` with the ``window`` words either
+    side of each keyword's first occurrence. Results are memoized per text, so
+    rescanning an unchanged conversation history only costs dictionary lookups
+    (treat returned dicts as read-only).
+    """
+
+    def __init__(self, categories: Dict[str, Sequence[str]], whole_word: Iterable[str] = (),
+                 window: int = 3, cache_size: int = 4096):
+        self.categories = {name: [keyword.lower() for keyword in keywords] for name, keywords in categories.items()}
+        self.window = window
+        self._exact = {keyword for name in whole_word for keyword in self.categories[name]}
+        self._keywords = sorted({k for keywords in self.categories.values() for k in keywords}, key=len, reverse=True)
+
+        alternation = "|".join(re.escape(keyword).replace(r"\ ", r"\s+") for keyword in self._keywords)
+        self._pattern = re.compile(rf"\b(?:{alternation})[\w']*")
+        self._credited = {}
+        self.scan = lru_cache(maxsize=cache_size)(self._scan)
+
+    def _credit(self, token: str) -> List[str]:
+        """Keywords a matched token counts for (memoized per distinct token)"""
+        credited = self._credited.get(token)
+        if credited is None:
+            normalized = " ".join(token.split())
+            credited = [
+                keyword for keyword in self._keywords
+                if normalized.startswith(keyword) and (keyword not in self._exact or normalized == keyword)
+            ]
+            self._credited[token] = credited
+        return credited
+
+    def _scan(self, text: str) -> Dict[str, str]:
+        lowered = text.lower()
+        first_offsets = {}
+        for match in self._pattern.finditer(lowered):
+            for keyword in self._credit(match.group()):
+                first_offsets.setdefault(keyword, match.start())
+
+        if not first_offsets:
+            return {}
+
+        # Map character offsets to word positions once for all context windows
+        words = [(m.start(), m.group()) for m in re.finditer(r"\S+", lowered)]
+        starts = [start for start, _ in words]
+        contexts = {}
+        for keyword, offset in first_offsets.items():
+            i = bisect.bisect_right(starts, offset) - 1
+            contexts[keyword] = " ".join(word for _, word in words[max(0, i - self.window):i + self.window + 1])
+        return contexts
+
+    def found(self, hits: Dict[str, str], category: str) -> List[str]:
+        """Keywords of ``category`` present in a ``scan`` result, in category order"""
+        return [keyword for keyword in self.categories[category] if keyword in hits]
+
+    def scan_all(self, texts: Iterable[str]) -> Dict[str, str]:
+        """Merge scans of several texts; each keyword keeps its earliest context"""
+        merged = {}
+        for text in texts:
+            for keyword, context in self.scan(text).items():
+                merged.setdefault(keyword, context)
+        return merged
@@ -4,19 +4,29 @@ Robust DSM-5 loader with better error handling and progress tracking
 import os
 import requests
 import tempfile
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import SupabaseVectorStore
-from langchain_openai import OpenAIEmbeddings
-from supabase import create_client
+from pdf_extraction import load_pdf_pages, iter_pdf_pages
+from dsm5_splitter import create_text_splitter as create_dsm5_splitter
+from database import SupabaseDB
+from ingest_pipeline import IngestPipeline
 from dotenv import load_dotenv
-import time
 
 load_dotenv()
 
+DSM5_URL = "https://dn790004.ca.archive.org/0/items/APA-DSM-5/DSM5.pdf"
+
+DSM5_METADATA = {
+    "source": "DSM-5",
+    "source_url": DSM5_URL,
+    "document_type": "diagnostic_manual"
+}
+
+def create_text_splitter():
+    """Splitter used for the DSM-5 corpus (CHUNKING_STRATEGY=recursive for fixed 1000/200 chunks)"""
+    return create_dsm5_splitter(os.getenv("CHUNKING_STRATEGY", "structure"))
+
 def download_dsm5_with_progress():
     """Download DSM-5 with progress tracking"""
-    url = "https://dn790004.ca.archive.org/0/items/APA-DSM-5/DSM5.pdf"
+    url = DSM5_URL
     
     print("📥 Downloading DSM-5 PDF...")
     
@@ -39,70 +49,89 @@ def download_dsm5_with_progress():
         print(f"\n✅ Download complete! File size: {downloaded / (1024*1024):.1f} MB")
         return temp_file.name
 
-def process_dsm5_pdf(pdf_path):
+def process_dsm5_pdf(pdf_path, workers=None):
     """Process PDF into chunks"""
     print("📄 Loading PDF...")
-    loader = PyPDFLoader(pdf_path)
-    documents = loader.load()
+    documents = load_pdf_pages(pdf_path, max_workers=workers)
     
     print(f"📚 Loaded {len(documents)} pages")
     
-    # Split into chunks
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        separators=["\n\n", "\n", ". ", " ", ""]
-    )
-    
     print("✂️ Splitting into chunks...")
-    chunks = text_splitter.split_documents(documents)
+    chunks = create_text_splitter().split_documents(documents)
     
     # Add metadata
     for i, chunk in enumerate(chunks):
-        chunk.metadata.update({
-            "source": "DSM-5",
-            "source_url": "https://dn790004.ca.archive.org/0/items/APA-DSM-5/DSM5.pdf",
-            "chunk_id": i,
-            "document_type": "diagnostic_manual"
-        })
+        chunk.metadata.update(DSM5_METADATA)
+        chunk.metadata["chunk_id"] = i
     
     print(f"📦 Created {len(chunks)} chunks")
     return chunks
 
-def upload_to_supabase(chunks, batch_size=10):
-    """Upload chunks to Supabase in batches"""
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_KEY")
+def upload_to_supabase(chunks, batch_size=64, vector_store=None, manifest=None, rate_limiter=None,
+                       lexical_index=None, entity_index=None):
+    """Upload already-split chunks through the streaming ingest pipeline.
     
-    client = create_client(supabase_url, supabase_key)
-    embeddings = OpenAIEmbeddings()
+    Chunks already uploaded unchanged (per the manifest) are skipped, so a
+    re-run after a failure only retries what didn't make it.
+    """
+    if vector_store is None:
+        db = SupabaseDB()
+        vector_store = db.get_vector_store()
+        manifest = manifest or db.get_manifest()
+        rate_limiter = rate_limiter or db.rate_limiter
+        lexical_index = db.get_lexical_index() if lexical_index is None else lexical_index
+        entity_index = db.get_entity_index() if entity_index is None else entity_index
     
-    vector_store = SupabaseVectorStore(
-        client=client,
-        embedding=embeddings,
-        table_name="documents",
-        query_name="match_documents"
-    )
+    print(f"🚀 Uploading {len(chunks)} chunks to the vector store...")
     
-    print(f"🚀 Uploading {len(chunks)} chunks to Supabase...")
+    pipeline = IngestPipeline(
+        vector_store,
+        vector_store.embeddings,
+        batch_size=batch_size,
+        manifest=manifest,
+        rate_limiter=rate_limiter,
+        indexes=[index for index in (lexical_index, entity_index) if index is not None]
+    )
+    report = pipeline.run(chunks)
+    IngestPipeline.print_report(report)
+    print("🎉 Upload complete!")
+    return report
+
+def ingest_dsm5_pdf(pdf_path, workers=None, batch_size=64, vector_store=None, manifest=None, rate_limiter=None,
+                    lexical_index=None, entity_index=None):
+    """Stream the PDF through parse -> split -> embed -> upsert with bounded memory"""
+    if vector_store is None:
+        db = SupabaseDB()
+        vector_store = db.get_vector_store()
+        manifest = manifest or db.get_manifest()
+        rate_limiter = rate_limiter or db.rate_limiter
+        lexical_index = db.get_lexical_index() if lexical_index is None else lexical_index
+        entity_index = db.get_entity_index() if entity_index is None else entity_index
     
-    # Upload in batches to avoid timeouts
-    for i in range(0, len(chunks), batch_size):
-        batch = chunks[i:i + batch_size]
-        try:
-            vector_store.add_documents(batch)
-            print(f"✅ Uploaded batch {i//batch_size + 1}/{(len(chunks) + batch_size - 1)//batch_size}")
-            time.sleep(1)  # Small delay between batches
-        except Exception as e:
-            print(f"❌ Error uploading batch {i//batch_size + 1}: {e}")
-            continue
+    print("🚀 Streaming DSM-5 into the vector store...")
     
+    pipeline = IngestPipeline(
+        vector_store,
+        vector_store.embeddings,
+        text_splitter=create_text_splitter(),
+        batch_size=batch_size,
+        metadata=DSM5_METADATA,
+        manifest=manifest,
+        rate_limiter=rate_limiter,
+        indexes=[index for index in (lexical_index, entity_index) if index is not None]
+    )
+    report = pipeline.run(iter_pdf_pages(pdf_path, max_workers=workers))
+    IngestPipeline.print_report(report)
     print("🎉 Upload complete!")
+    return report
 
 def main():
     try:
         # Check environment variables
-        if not all([os.getenv("OPENAI_API_KEY"), os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY")]):
+        required_vars = ["OPENAI_API_KEY"]
+        if os.getenv("VECTOR_STORE_BACKEND", "supabase") == "supabase":
+            required_vars += ["SUPABASE_URL", "SUPABASE_KEY"]
+        if not all(os.getenv(var) for var in required_vars):
             print("❌ Missing environment variables. Check your .env file.")
             return
         
@@ -110,11 +139,8 @@ def main():
         pdf_path = download_dsm5_with_progress()
         
         try:
-            # Process PDF
-            chunks = process_dsm5_pdf(pdf_path)
-            
-            # Upload to Supabase
-            upload_to_supabase(chunks)
+            # Parse, split, embed and upload as one streaming pipeline
+            ingest_dsm5_pdf(pdf_path)
             
         finally:
             # Clean up
@@ -0,0 +1,379 @@
+"""
+Embedded on-disk vector store used as a local alternative to Supabase/pgvector
+"""
+import json
+import os
+import threading
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from mmr import maximal_marginal_relevance
+from vector_quantization import create_quantizer
+
+
+class LocalVectorStore(VectorStore):
+    """LangChain VectorStore that keeps everything in a local directory.
+
+    Layout of ``persist_directory``:
+
+    - ``store.json``: header with the embedding dimension
+    - ``vectors.f32``: row-major float32 matrix of L2-normalized embeddings,
+      opened as a read-only NumPy memmap
+    - ``docs.jsonl``: append-only log of ``{"row", "id", "text", "metadata"}``
+      records; a record with ``"deleted": true`` tombstones its row
+
+    Vectors are normalized on insert so cosine similarity for every stored
+    chunk is a single matrix-vector product.
+
+    With ``quantization`` (``float16``, ``int8`` or ``pq``), searches score
+    compact in-memory codes instead of the float32 matrix, which stays on
+    disk; the top ``rescore * k`` candidates are then re-scored exactly from
+    it (``rescore=0`` returns the approximate ranking and scores).
+    """
+
+    HEADER_FILE = "store.json"
+    VECTORS_FILE = "vectors.f32"
+    DOCS_FILE = "docs.jsonl"
+
+    def __init__(self, embedding: Embeddings, persist_directory: str = "./vector_store",
+                 quantization: str = "none", rescore: int = 4):
+        self._embedding = embedding
+        self.persist_directory = persist_directory
+        self.quantization = quantization
+        self.rescore = rescore
+        self._quantizer = create_quantizer(quantization)
+        self._lock = threading.Lock()
+
+        self.dim: Optional[int] = None
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._id_to_row: Dict[str, int] = {}
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+
+        os.makedirs(persist_directory, exist_ok=True)
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return int(self._alive.sum())
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def _path(self, name: str) -> str:
+        return os.path.join(self.persist_directory, name)
+
+    def _load(self):
+        """Load the header, replay the document log and map the vectors"""
+        header_path = self._path(self.HEADER_FILE)
+        if not os.path.exists(header_path):
+            return
+
+        with open(header_path) as f:
+            self.dim = json.load(f)["dim"]
+
+        docs_path = self._path(self.DOCS_FILE)
+        if os.path.exists(docs_path):
+            with open(docs_path) as f:
+                for line in f:
+                    if line.strip():
+                        self._apply_record(json.loads(line))
+
+        self._remap()
+
+    def _apply_record(self, record: Dict[str, Any]):
+        """Apply a single document log record to the in-memory tables"""
+        row = record["row"]
+        if row == len(self._ids):
+            self._ids.append(record["id"])
+            self._texts.append("")
+            self._metadatas.append({})
+
+        if record.get("deleted"):
+            self._id_to_row.pop(record["id"], None)
+            self._texts[row] = ""
+            self._metadatas[row] = {}
+        else:
+            self._ids[row] = record["id"]
+            self._texts[row] = record["text"]
+            self._metadatas[row] = record.get("metadata", {})
+            self._id_to_row[record["id"]] = row
+
+    def _remap(self, rows: Optional[List[int]] = None):
+        """Re-open the vector file, rebuild the liveness mask and re-encode ``rows`` (all if None)"""
+        n_rows = len(self._ids)
+        if n_rows == 0 or not self.dim:
+            self._vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+        else:
+            self._vectors = np.memmap(
+                self._path(self.VECTORS_FILE), dtype=np.float32, mode="r", shape=(n_rows, self.dim)
+            )
+
+        alive = np.zeros(n_rows, dtype=bool)
+        if self._id_to_row:
+            alive[list(self._id_to_row.values())] = True
+        self._alive = alive
+        if self._quantizer is not None and n_rows:
+            self._quantizer.update(self._vectors, None if rows is None else np.asarray(rows, dtype=np.int64))
+
+    def _write_header(self):
+        with open(self._path(self.HEADER_FILE), "w") as f:
+            json.dump({"dim": self.dim}, f)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)]
+        vectors = self._embedding.embed_documents(texts)
+        return self.add_vectors(vectors, documents, ids)
+
+    def add_vectors(
+        self,
+        vectors: List[List[float]],
+        documents: List[Document],
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        """Insert or overwrite documents with precomputed embeddings.
+
+        Mirrors ``SupabaseVectorStore.add_vectors``: an id that already exists
+        is updated in place, so callers can upsert with deterministic ids.
+        """
+        if not documents:
+            return []
+
+        ids = ids or [str(uuid.uuid4()) for _ in documents]
+        matrix = self._normalize(np.asarray(vectors, dtype=np.float32))
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = matrix.shape[1]
+                self._write_header()
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Expected embeddings of dimension {self.dim}, got {matrix.shape[1]}")
+
+            next_row = len(self._ids)
+            records = []
+            pending: Dict[str, int] = {}
+            vectors_path = self._path(self.VECTORS_FILE)
+            with open(vectors_path, "r+b" if os.path.exists(vectors_path) else "w+b") as f:
+                for doc_id, doc, vector in zip(ids, documents, matrix):
+                    row = self._id_to_row.get(doc_id, pending.get(doc_id))
+                    if row is None:
+                        row = next_row
+                        next_row += 1
+                    pending[doc_id] = row
+                    f.seek(row * self.dim * 4)
+                    f.write(vector.tobytes())
+                    records.append({
+                        "row": row,
+                        "id": doc_id,
+                        "text": doc.page_content,
+                        "metadata": doc.metadata,
+                    })
+
+            self._append_records(records)
+
+        return list(ids)
+
+    def _append_records(self, records: List[Dict[str, Any]]):
+        with open(self._path(self.DOCS_FILE), "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        for record in records:
+            self._apply_record(record)
+        self._remap([record["row"] for record in records if not record.get("deleted")])
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Tombstone the given ids"""
+        if not ids:
+            return False
+
+        with self._lock:
+            records = [
+                {"row": self._id_to_row[doc_id], "id": doc_id, "deleted": True}
+                for doc_id in ids
+                if doc_id in self._id_to_row
+            ]
+            if records:
+                self._append_records(records)
+        return True
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def get_by_ids(self, ids: List[str]) -> List[Document]:
+        """Return stored documents for the given ids, skipping unknown ones"""
+        rows = [self._id_to_row[doc_id] for doc_id in ids if doc_id in self._id_to_row]
+        return [self._document(row) for row in rows]
+
+    def _document(self, row: int) -> Document:
+        return Document(page_content=self._texts[row], metadata=dict(self._metadatas[row]))
+
+    def _filter_mask(self, filter: Optional[Dict[str, Any]]) -> np.ndarray:
+        mask = self._alive.copy()
+        if filter:
+            for row in np.flatnonzero(mask):
+                metadata = self._metadatas[row]
+                if any(metadata.get(key) != value for key, value in filter.items()):
+                    mask[row] = False
+        return mask
+
+    def get_vectors(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """Stored (normalized) embeddings for the given ids, skipping unknown ones"""
+        return {doc_id: np.array(self._vectors[self._id_to_row[doc_id]])
+                for doc_id in ids if doc_id in self._id_to_row}
+
+    def _top_rows(
+        self,
+        query: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[Tuple[int, float]]:
+        """Cosine top-k rows over every live row (or only the rows of ``ids``),
+        approximate if quantized without re-scoring"""
+        vectors, alive = self._vectors, self._filter_mask(filter)
+        if ids is not None:
+            allowed = np.zeros_like(alive)
+            allowed[[self._id_to_row[doc_id] for doc_id in ids if doc_id in self._id_to_row]] = True
+            alive &= allowed
+        if len(vectors) == 0 or k <= 0:
+            return []
+
+        q = np.asarray(query, dtype=np.float32)
+        q_norm = np.linalg.norm(q)
+        if q_norm:
+            q = q / q_norm
+
+        k = min(k, int(alive.sum()))
+        if k == 0:
+            return []
+        quantizer = self._quantizer
+        if quantizer is None:
+            scores = vectors @ q
+        else:
+            # Approximate scores from the codes; the float32 rows are only read to re-score
+            scores = quantizer.scores(q)[: len(alive)]
+        scores = np.where(alive[: len(scores)], scores, -np.inf)
+
+        if quantizer is not None and self.rescore:
+            n_candidates = min(int(alive.sum()), self.rescore * k)
+            candidates = np.sort(np.argpartition(-scores, n_candidates - 1)[:n_candidates])
+            scores = np.full(len(scores), -np.inf, dtype=np.float32)
+            scores[candidates] = vectors[candidates] @ q
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top]
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self,
+        query: List[float],
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        score_threshold: Optional[float] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Cosine top-k over every live row (or only the rows of ``ids``)"""
+        results = [(self._document(row), score) for row, score in self._top_rows(query, k, filter, ids)]
+        if score_threshold is not None:
+            results = [(doc, score) for doc, score in results if score >= score_threshold]
+        return results
+
+    def similarity_search_by_vector_returning_embeddings(
+        self,
+        query: List[float],
+        k: int,
+        filter: Optional[Dict[str, Any]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float, np.ndarray]]:
+        """Top-k documents with their scores and stored embeddings (as ``SupabaseVectorStore``)"""
+        return [(self._document(row), score, np.array(self._vectors[row]))
+                for row, score in self._top_rows(query, k, filter, ids)]
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        **kwargs: Any,
+    ) -> List[Document]:
+        """Diversify the top ``fetch_k`` rows down to ``k`` with vectorized MMR"""
+        rows = self._top_rows(embedding, fetch_k, kwargs.get("filter"), kwargs.get("ids"))
+        if not rows:
+            return []
+        picked = maximal_marginal_relevance(
+            embedding,
+            self._vectors[[row for row, _ in rows]],
+            k=k,
+            lambda_mult=lambda_mult,
+            relevance=[score for _, score in rows],
+        )
+        return [self._document(rows[i][0]) for i in picked]
+
+    def max_marginal_relevance_search(
+        self, query: str, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5, **kwargs: Any
+    ) -> List[Document]:
+        vector = self._embedding.embed_query(query)
+        return self.max_marginal_relevance_search_by_vector(vector, k, fetch_k, lambda_mult, **kwargs)
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        vector = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_relevance_scores(vector, k=k, **kwargs)
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        results = self.similarity_search_by_vector_with_relevance_scores(embedding, k=k, **kwargs)
+        return [doc for doc, _ in results]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        vector = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector(vector, k=k, **kwargs)
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Scores are already cosine similarities, matching match_documents
+        return lambda score: score
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        persist_directory: str = "./vector_store",
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(embedding=embedding, persist_directory=persist_directory)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
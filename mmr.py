@@ -0,0 +1,49 @@
+"""
+Maximal marginal relevance over retrieved candidates, vectorized with NumPy
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def maximal_marginal_relevance(query_embedding: Optional[Sequence[float]], embeddings: Sequence[Sequence[float]],
+                               k: int = 4, lambda_mult: float = 0.5,
+                               relevance: Optional[Sequence[float]] = None) -> List[int]:
+    """Indices of ``k`` candidates picked by maximal marginal relevance.
+
+    Each step picks the candidate maximizing
+    ``lambda_mult * relevance - (1 - lambda_mult) * max similarity to the picks so far``,
+    so ``lambda_mult=1`` keeps the relevance order and ``0`` maximizes diversity.
+    Relevance is the cosine similarity to ``query_embedding`` unless given
+    (e.g. fused hybrid scores). The candidate similarity matrix is computed
+    once; each step is then a few vector operations over the candidates.
+    A zero embedding (no vector available) is similar to nothing.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    n = len(matrix)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    matrix = _normalize(matrix.reshape(n, -1))
+    if relevance is None:
+        relevance = matrix @ _normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    similarity = matrix @ matrix.T
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    chosen = np.zeros(n, dtype=bool)
+    selected = [int(np.argmax(relevance))]
+    for _ in range(k - 1):
+        last = selected[-1]
+        chosen[last] = True
+        np.maximum(redundancy, similarity[last], out=redundancy)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[chosen] = -np.inf
+        selected.append(int(np.argmax(scores)))
+    return selected
@@ -11,7 +11,9 @@ def main():
     load_dotenv()
     
     # Check if environment variables are set
-    required_vars = ["OPENAI_API_KEY", "SUPABASE_URL", "SUPABASE_KEY"]
+    required_vars = ["OPENAI_API_KEY"]
+    if os.getenv("VECTOR_STORE_BACKEND", "supabase") == "supabase":
+        required_vars += ["SUPABASE_URL", "SUPABASE_KEY"]
     missing_vars = [var for var in required_vars if not os.getenv(var)]
     
     if missing_vars:
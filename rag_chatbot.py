@@ -1,17 +1,23 @@
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
-from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
+from langchain.chains import create_history_aware_retriever
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from database import SupabaseDB
 from document_processor import DSM5Processor
+from answer_cache import SemanticAnswerCache
+from tiered_assessor import TieredAssessor
+from session_store import SessionStore
+from ingest_pipeline import IngestPipeline
+from hybrid_retriever import HybridRetriever
+from context_packer import ContextPacker
+from tracing import ChatTrace, TraceExporter, TraceHistograms
+import tracing
+import asyncio
 import os
-import re
-from typing import Dict
+import time
+from typing import AsyncIterator, Dict, Iterator
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -27,27 +33,88 @@ try:
 except:
     pass
 
+def _with_timings(response: Dict, timings: Dict[str, float], started: float) -> Dict:
+    """Attach per-stage wall-clock timings (seconds) to a chat response"""
+    response["timings"] = {name: round(seconds, 4) for name, seconds in timings.items()}
+    response["timings"]["total"] = round(time.perf_counter() - started, 4)
+    return response
+
+def _cached_events(response: Dict) -> Iterator[Dict]:
+    """Stream events for a response that is already complete"""
+    yield {"type": "assessment", "assessment": response["assessment"]}
+    yield {"type": "sources", "sources": response["sources"]}
+    yield {"type": "token", "content": response["answer"]}
+    yield {"type": "done", "response": response}
+
+def _final_response(events: Iterator[Dict]) -> Dict:
+    """Drain a chat stream and return its final response dict"""
+    response = None
+    for event in events:
+        if event["type"] == "done":
+            response = event["response"]
+    return response
+
 class DSM5Chatbot:
-    def __init__(self):
-        self.db = SupabaseDB()
+    def __init__(self, db: SupabaseDB = None, llm=None, semantic_cache: SemanticAnswerCache = None,
+                 heuristic_assessment: bool = None, session_store: SessionStore = None,
+                 context_packer: ContextPacker = None, trace_exporter: TraceExporter = None):
+        self.db = db or SupabaseDB()
         self.processor = DSM5Processor()
-        self.llm = ChatOpenAI(
+        self.llm = llm or ChatOpenAI(
             temperature=0.1,
             model_name="gpt-3.5-turbo"
         )
         self.vector_store = self.db.get_vector_store()
-        self.store = {}  # Session store for chat histories
+        self.lexical_index = self.db.get_lexical_index()
+        self.entity_index = self.db.get_entity_index()
+        self.retrieval_mode = os.getenv("RETRIEVAL_MODE", "hybrid")
+        self.store = session_store or SessionStore.from_env()  # Bounded session store for chat histories
+        # Merges, dedupes and budgets retrieved chunks before they reach the LLM
+        self.context_packer = context_packer or ContextPacker.from_env()
+        # Every turn is traced per stage; traces are aggregated here and optionally exported
+        self.trace_histograms = TraceHistograms()
+        self.trace_exporter = trace_exporter or TraceExporter.from_env()
+        
+        # Opt-in semantic cache for general information answers
+        if semantic_cache is None and os.getenv("SEMANTIC_CACHE_ENABLED", "").lower() in ("1", "true", "yes"):
+            semantic_cache = SemanticAnswerCache(
+                threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+                max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", "500")),
+                persist_path=os.getenv("SEMANTIC_CACHE_PATH") or None,
+                save_interval=float(os.getenv("SEMANTIC_CACHE_SAVE_INTERVAL", "30"))
+            )
+        self.semantic_cache = semantic_cache
+        
+        # Keyword fast path in front of the LLM assessment (on unless disabled)
+        if heuristic_assessment is None:
+            heuristic_assessment = os.getenv("HEURISTIC_ASSESSMENT", "true").lower() not in ("0", "false", "no")
+        self.assessor = TieredAssessor() if heuristic_assessment else None
         self.setup_chains()
     
     def get_session_history(self, session_id: str) -> BaseChatMessageHistory:
         """Get or create chat history for a session"""
-        if session_id not in self.store:
-            self.store[session_id] = ChatMessageHistory()
-        return self.store[session_id]
+        return self.store.get(session_id)
     
     def setup_chains(self):
         """Set up the RAG chains with chat history"""
-        retriever = self.vector_store.as_retriever(search_kwargs={"k": 5})
+        # Vector + BM25 results fused by reciprocal rank (lexical-only if embeddings fail);
+        # questions naming a disorder or ICD code go straight to that entity's chunks;
+        # MMR keeps near-identical chunks from filling every slot; the number of chunks
+        # follows the score distribution (few for one clear hit, more for broad questions)
+        self.retriever = retriever = HybridRetriever(
+            vector_store=self.vector_store,
+            lexical_index=self.lexical_index,
+            entity_index=self.entity_index,
+            k=5,
+            fetch_k=int(os.getenv("RETRIEVAL_FETCH_K", "20")),
+            mode=self.retrieval_mode,
+            mmr=os.getenv("RETRIEVAL_MMR", "true").lower() not in ("0", "false", "no"),
+            mmr_lambda=float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.7")),
+            adaptive_k=os.getenv("RETRIEVAL_ADAPTIVE_K", "true").lower() not in ("0", "false", "no"),
+            min_k=int(os.getenv("RETRIEVAL_MIN_K", "2")),
+            max_k=int(os.getenv("RETRIEVAL_MAX_K", "8")),
+            score_gap=float(os.getenv("RETRIEVAL_SCORE_GAP", "0.05"))
+        )
         
         # Contextualize question prompt
         contextualize_q_system_prompt = """Given a chat history and the latest user question \
@@ -61,9 +128,9 @@ just reformulate it if needed and otherwise return it as is."""
             ("human", "{input}"),
         ])
         
-        # Create history-aware retriever
+        # Create history-aware retriever (LLM calls are named after their stage in turn traces)
         self.history_aware_retriever = create_history_aware_retriever(
-            self.llm, retriever, contextualize_q_prompt
+            self.llm.with_config(run_name="contextualize"), retriever, contextualize_q_prompt
         )
         
         # Assessment prompt for determining if clarifying questions are needed
@@ -123,123 +190,377 @@ Use the following context from DSM-5 to answer questions accurately while being
             ("human", "{input}"),
         ])
         
+        # Assessment and clarifying chains
+        self.assessment_chain = self.assessment_prompt | self.llm.with_config(run_name="assessment") | StrOutputParser()
+        self.clarifying_chain = self.clarifying_prompt | self.llm.with_config(run_name="clarifying") | StrOutputParser()
+        
         # Create document chain
-        self.question_answer_chain = create_stuff_documents_chain(self.llm, self.qa_prompt)
-        
-        # Create RAG chain
-        self.rag_chain = create_retrieval_chain(self.history_aware_retriever, self.question_answer_chain)
-        
-        # Create conversational RAG chain with history
-        self.conversational_rag_chain = RunnableWithMessageHistory(
-            self.rag_chain,
-            self.get_session_history,
-            input_messages_key="input",
-            history_messages_key="chat_history",
-            output_messages_key="answer",
-        )
+        self.question_answer_chain = create_stuff_documents_chain(self.llm.with_config(run_name="generation"),
+                                                                  self.qa_prompt)
     
     def add_documents(self, file_path: str = None):
-        """Add DSM-5 documents to the vector store"""
+        """Stream DSM-5 documents into the vector store"""
         if file_path:
-            documents = self.processor.load_dsm5_documents(file_path)
-            documents = self.processor.add_metadata(documents)
+            pages = self.processor.iter_documents(file_path)
+            metadata = {"source_type": "dsm5", "document_type": "diagnostic_manual"}
         else:
             # Load from URL
-            documents = self.processor.load_dsm5_from_url()
+            pages = self.processor.iter_dsm5_pages_from_url()
+            metadata = None
+        
+        pipeline = IngestPipeline(
+            self.vector_store,
+            self.db.embeddings,
+            text_splitter=self.processor.text_splitter,
+            metadata=metadata,
+            manifest=self.db.get_manifest(),
+            rate_limiter=self.db.rate_limiter,
+            indexes=[self.lexical_index, self.entity_index]
+        )
+        report = pipeline.run(pages)
+        print(f"Added {report['upserted']} document chunks to the vector store")
+        IngestPipeline.print_report(report)
+        return report
+    
+    @staticmethod
+    def _user_messages(history: BaseChatMessageHistory):
+        return [msg.content for msg in history.messages if msg.type == 'human']
+    
+    def _heuristic_assessment(self, question: str, history: BaseChatMessageHistory):
+        """Keyword fast path; None when the assessment needs the LLM"""
+        if self.assessor is None:
+            return None
+        state = getattr(history, "state", None)
+        if state is not None:
+            return self.assessor.decide(question, state=state)
+        return self.assessor.decide(question, self._user_messages(history))
+    
+    def _llm_assessment(self, question: str, history: BaseChatMessageHistory, config: Dict = None) -> str:
+        result = self.assessment_chain.invoke({
+            "input": question,
+            "chat_history": history.messages
+        }, config).strip()
+        
+        if self.assessor is not None:
+            self.assessor.record_llm(result)
+        return result
+    
+    async def _allm_assessment(self, question: str, history: BaseChatMessageHistory, config: Dict = None) -> str:
+        result = (await self.assessment_chain.ainvoke({
+            "input": question,
+            "chat_history": history.messages
+        }, config)).strip()
         
-        self.vector_store.add_documents(documents)
-        print(f"Added {len(documents)} document chunks to the vector store")
+        if self.assessor is not None:
+            self.assessor.record_llm(result)
+        return result
     
     def assess_information_need(self, question: str, session_id: str = "default") -> str:
-        """Assess if more information is needed using the LLM"""
+        """Assess if more information is needed, asking the LLM only when the heuristic is unsure"""
+        history = self.get_session_history(session_id)
+        return self._heuristic_assessment(question, history) or self._llm_assessment(question, history)
+    
+    async def aassess_information_need(self, question: str, session_id: str = "default") -> str:
+        """Async version of assess_information_need"""
         history = self.get_session_history(session_id)
+        return self._heuristic_assessment(question, history) or await self._allm_assessment(question, history)
+    
+    def _cached_response(self, question: str, history: BaseChatMessageHistory, query_vector):
+        """Serve a fresh session's question from the semantic cache, if possible"""
+        cached = self.semantic_cache.lookup(query_vector)
+        if not cached:
+            return None
         
-        # Use the assessment chain
-        assessment_chain = self.assessment_prompt | self.llm | StrOutputParser()
+        history.add_user_message(question)
+        history.add_ai_message(cached["answer"])
         
-        result = assessment_chain.invoke({
-            "input": question,
-            "chat_history": history.messages
-        })
+        return {
+            "answer": cached["answer"],
+            "sources": cached["sources"],
+            "needs_more_info": False,
+            "assessment": "PROVIDE_INFO",
+            "action_taken": "provided_information",
+            "cache_hit": True
+        }
+    
+    def _use_semantic_cache(self, history: BaseChatMessageHistory) -> bool:
+        # Only fresh sessions are eligible, where the question is already standalone
+        return self.semantic_cache is not None and not history.messages
+    
+    def _clarifying_response(self, question: str, history: BaseChatMessageHistory, answer: str, assessment: str):
+        history.add_user_message(question)
+        history.add_ai_message(answer)
         
-        return result.strip()
+        return {
+            "answer": answer,
+            "sources": [],
+            "needs_more_info": True,
+            "assessment": assessment,
+            "action_taken": "asked_clarifying_questions",
+            "cache_hit": False
+        }
+    
+    def _information_response(self, question: str, history: BaseChatMessageHistory, answer: str, docs,
+                              assessment: str, query_vector, context_packing: Dict = None):
+        history.add_user_message(question)
+        history.add_ai_message(answer)
+        
+        if query_vector is not None and assessment == "PROVIDE_INFO":
+            self.semantic_cache.add(question, query_vector, answer, docs)
+        
+        return {
+            "answer": answer,
+            "sources": docs,
+            "needs_more_info": False,
+            "assessment": assessment,
+            "action_taken": "provided_information",
+            "cache_hit": False,
+            "context_packing": context_packing
+        }
+    
+    @staticmethod
+    def _error_response(error: Exception):
+        return {
+            "answer": f"Error: {str(error)}", 
+            "sources": [], 
+            "needs_more_info": False,
+            "assessment": "ERROR",
+            "action_taken": "error_handling",
+            "cache_hit": False
+        }
     
     def chat(self, question: str, session_id: str = "default"):
         """Chat with the DSM-5 RAG system using multi-step approach"""
+        return _final_response(self.chat_stream(question, session_id))
+    
+    async def achat(self, question: str, session_id: str = "default"):
+        """Async chat that overlaps the assessment with contextualize+retrieve.
+        
+        Most questions are answered with DSM-5 context, so when the assessment
+        needs the LLM, retrieval is started speculatively alongside it and
+        cancelled if the assessment asks for clarification. Returns the same
+        dict as ``chat``.
+        """
+        response = None
+        async for event in self.achat_stream(question, session_id):
+            if event["type"] == "done":
+                response = event["response"]
+        return response
+    
+    def _finish_trace(self, response: Dict, trace: ChatTrace) -> Dict:
+        """Attach the turn's trace to the response, then aggregate and export it"""
+        trace.finish(assessment=response["assessment"], cache_hit=response["cache_hit"])
+        response["trace"] = trace.to_dict()
+        self.trace_histograms.record(trace)
+        if self.trace_exporter is not None:
+            try:
+                self.trace_exporter.export(trace)
+            except Exception as e:
+                print(f"⚠️ Trace export failed: {e}")
+        return response
+    
+    @staticmethod
+    def _partial_answer(question: str, history: BaseChatMessageHistory, parts):
+        # The consumer stopped mid-answer: keep what they saw in the history
+        if parts:
+            history.add_user_message(question)
+            history.add_ai_message("".join(parts))
+    
+    def chat_stream(self, question: str, session_id: str = "default") -> Iterator[Dict]:
+        """Stream a chat turn as events.
+        
+        Yields ``{"type": "assessment", "assessment": ...}``, then (when
+        answering from DSM-5) ``{"type": "sources", "sources": [...]}``, then
+        ``{"type": "token", "content": ...}`` per answer chunk as the LLM
+        produces it, and finally ``{"type": "done", "response": ...}`` with the
+        same dict ``chat`` returns. History is recorded when the answer is
+        complete, or with the partial answer if the consumer stops early.
+        
+        The response carries ``timings`` and a per-stage ``trace`` (LLM calls
+        with their token counts, embedding and search with document counts).
+        """
+        timings = {}
+        started = time.perf_counter()
+        trace = ChatTrace(session_id)
+        config = {"callbacks": [trace.callback_handler()]}
+        history, parts = None, []
         try:
-            # Step 1: Assess if more information is needed
-            assessment = self.assess_information_need(question, session_id)
+            # Resolved once per turn, so the store's hit/miss counters count turns
+            history = self.get_session_history(session_id)
+            
+            # Step 0: Serve repeated general questions from the semantic cache
+            query_vector = None
+            if self._use_semantic_cache(history):
+                stage = time.perf_counter()
+                query_vector = self.db.embeddings.embed_query(question)
+                response = self._cached_response(question, history, query_vector)
+                timings["cache_lookup"] = time.perf_counter() - stage
+                trace.record("cache_lookup", stage, hit=bool(response))
+                if response:
+                    yield from _cached_events(self._finish_trace(_with_timings(response, timings, started), trace))
+                    return
+            
+            # Step 1: Assess if more information is needed, asking the LLM only when the heuristic is unsure
+            stage = time.perf_counter()
+            assessment = self._heuristic_assessment(question, history)
+            if assessment is None:
+                assessment = self._llm_assessment(question, history, config)
+            else:
+                trace.record("assessment", stage, method="heuristic")
+            timings["assessment"] = time.perf_counter() - stage
+            yield {"type": "assessment", "assessment": assessment}
+            
+            inputs = {"input": question, "chat_history": list(history.messages)}
             
             if assessment == "ASK_CLARIFYING":
                 # Generate clarifying questions
-                clarifying_chain = self.clarifying_prompt | self.llm | StrOutputParser()
-                history = self.get_session_history(session_id)
-                
-                answer = clarifying_chain.invoke({
-                    "input": question,
-                    "chat_history": history.messages
-                })
-                
-                # Add to history
-                history.add_user_message(question)
-                history.add_ai_message(answer)
-                
-                return {
-                    "answer": answer,
-                    "sources": [],
-                    "needs_more_info": True,
-                    "assessment": assessment,
-                    "action_taken": "asked_clarifying_questions"
-                }
+                docs = []
+                chain = self.clarifying_chain
+            else:
+                # Retrieve with the history-aware retriever, then answer from the retrieved context
+                stage = time.perf_counter()
+                with tracing.activate(trace):
+                    docs = self.history_aware_retriever.invoke(inputs, config)
+                timings["retrieval"] = time.perf_counter() - stage
+                trace.record("retrieval", stage, docs=len(docs))
+                yield {"type": "sources", "sources": docs}
+                stage = time.perf_counter()
+                context, packing = self.context_packer.pack(docs)
+                timings["packing"] = time.perf_counter() - stage
+                trace.record("packing", stage, docs=len(context), tokens=packing["tokens_after"])
+                chain = self.question_answer_chain
+                inputs = {**inputs, "context": context}
+            
+            stage = time.perf_counter()
+            for chunk in chain.stream(inputs, config):
+                if not parts:
+                    timings["first_token"] = time.perf_counter() - started
+                parts.append(chunk)
+                yield {"type": "token", "content": chunk}
+            timings["generation"] = time.perf_counter() - stage
+            
+            answer = "".join(parts)
+            parts = []
+            if assessment == "ASK_CLARIFYING":
+                response = self._clarifying_response(question, history, answer, assessment)
+            else:
+                response = self._information_response(question, history, answer, docs, assessment, query_vector,
+                                                      packing)
+            yield {"type": "done", "response": self._finish_trace(_with_timings(response, timings, started), trace)}
+        
+        except GeneratorExit:
+            self._partial_answer(question, history, parts)
+            raise
+        except Exception as e:
+            response = _with_timings(self._error_response(e), timings, started)
+            yield {"type": "done", "response": self._finish_trace(response, trace)}
+    
+    async def achat_stream(self, question: str, session_id: str = "default") -> AsyncIterator[Dict]:
+        """Async version of ``chat_stream`` with the concurrency of ``achat``"""
+        timings = {}
+        started = time.perf_counter()
+        trace = ChatTrace(session_id)
+        config = {"callbacks": [trace.callback_handler()]}
+        retrieval = None
+        history, parts = None, []
+        try:
+            # Resolved once per turn, so the store's hit/miss counters count turns. Store reads and
+            # writes (SQLite with SESSION_DB_PATH) and context packing run off the event loop
+            history = await asyncio.to_thread(self.get_session_history, session_id)
             
+            query_vector = None
+            if self._use_semantic_cache(history):
+                stage = time.perf_counter()
+                query_vector = await self.db.embeddings.aembed_query(question)
+                response = await asyncio.to_thread(self._cached_response, question, history, query_vector)
+                timings["cache_lookup"] = time.perf_counter() - stage
+                trace.record("cache_lookup", stage, hit=bool(response))
+                if response:
+                    for event in _cached_events(self._finish_trace(_with_timings(response, timings, started), trace)):
+                        yield event
+                    return
+            
+            inputs = {"input": question, "chat_history": list(history.messages)}
+            
+            async def timed(name, coro):
+                stage = time.perf_counter()
+                result = await coro
+                timings[name] = time.perf_counter() - stage
+                return result
+            
+            async def retrieve():
+                stage = time.perf_counter()
+                # The task runs in a copy of this context, so the trace stays active for the retriever only
+                with tracing.activate(trace):
+                    docs = await timed("retrieval", self.history_aware_retriever.ainvoke(inputs, config))
+                trace.record("retrieval", stage, docs=len(docs))
+                return docs
+            
+            # Step 1: the keyword heuristic settles clear-cut cases without the LLM;
+            # otherwise the LLM assessment and history-aware retrieval run concurrently
+            stage = time.perf_counter()
+            assessment = self._heuristic_assessment(question, history)
+            timings["assessment"] = time.perf_counter() - stage
+            if assessment is None:
+                retrieval = asyncio.ensure_future(retrieve())
+                # A discarded retrieval's errors are irrelevant; don't log them as unretrieved
+                retrieval.add_done_callback(lambda task: task.cancelled() or task.exception())
+                assessment = await timed("assessment", self._allm_assessment(question, history, config))
+            else:
+                trace.record("assessment", stage, method="heuristic")
+            yield {"type": "assessment", "assessment": assessment}
+            
+            if assessment == "ASK_CLARIFYING":
+                if retrieval is not None:
+                    retrieval.cancel()
+                docs = []
+                chain = self.clarifying_chain
+            else:
+                if retrieval is None:
+                    retrieval = asyncio.ensure_future(retrieve())
+                docs = await retrieval
+                yield {"type": "sources", "sources": docs}
+                stage = time.perf_counter()
+                context, packing = await asyncio.to_thread(self.context_packer.pack, docs)
+                timings["packing"] = time.perf_counter() - stage
+                trace.record("packing", stage, docs=len(context), tokens=packing["tokens_after"])
+                chain = self.question_answer_chain
+                inputs = {**inputs, "context": context}
+            
+            stage = time.perf_counter()
+            async for chunk in chain.astream(inputs, config):
+                if not parts:
+                    timings["first_token"] = time.perf_counter() - started
+                parts.append(chunk)
+                yield {"type": "token", "content": chunk}
+            timings["generation"] = time.perf_counter() - stage
+            
+            answer = "".join(parts)
+            parts = []
+            if assessment == "ASK_CLARIFYING":
+                response = await asyncio.to_thread(self._clarifying_response, question, history, answer, assessment)
             else:
-                # Use RAG chain to provide information
-                response = self.conversational_rag_chain.invoke(
-                    {"input": question},
-                    config={"configurable": {"session_id": session_id}}
-                )
-                
-                return {
-                    "answer": response["answer"],
-                    "sources": response.get("context", []),
-                    "needs_more_info": False,
-                    "assessment": assessment,
-                    "action_taken": "provided_information"
-                }
-                
+                response = await asyncio.to_thread(self._information_response, question, history, answer, docs,
+                                                   assessment, query_vector, packing)
+            yield {"type": "done", "response": self._finish_trace(_with_timings(response, timings, started), trace)}
+        
+        except (GeneratorExit, asyncio.CancelledError):
+            if retrieval is not None:
+                retrieval.cancel()
+            # Written inline: a cancelled task can't reliably await a worker thread
+            self._partial_answer(question, history, parts)
+            raise
         except Exception as e:
-            return {
-                "answer": f"Error: {str(e)}", 
-                "sources": [], 
-                "needs_more_info": False,
-                "assessment": "ERROR",
-                "action_taken": "error_handling"
-            }
+            if retrieval is not None:
+                retrieval.cancel()
+            response = _with_timings(self._error_response(e), timings, started)
+            yield {"type": "done", "response": self._finish_trace(response, trace)}
     
     def clear_memory(self, session_id: str = "default"):
         """Clear conversation memory for a session"""
-        if session_id in self.store:
-            del self.store[session_id]
+        self.store.delete(session_id)
     
     def get_conversation_summary(self, session_id: str = "default"):
         """Get a summary of the current conversation"""
-        history = self.get_session_history(session_id)
-        messages = history.messages
-        
-        # Extract information from messages
-        user_messages = [msg.content for msg in messages if hasattr(msg, 'content') and msg.type == 'human']
-        
-        # Simple symptom detection
-        symptom_keywords = ["feel", "feeling", "symptoms", "problems", "difficulty", "trouble"]
-        symptom_mentions = 0
-        
-        for msg in user_messages:
-            msg_lower = msg.lower()
-            symptom_mentions += sum(1 for keyword in symptom_keywords if keyword in msg_lower)
-        
-        return {
-            "total_messages": len(messages),
-            "user_messages": len(user_messages),
-            "symptom_mentions": symptom_mentions,
-            "has_enough_context": symptom_mentions >= 3
-        }
\ No newline at end of file
+        # Maintained incrementally as messages are added, so this is O(1) per turn
+        return self.get_session_history(session_id).state.summary()
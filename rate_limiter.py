@@ -0,0 +1,171 @@
+"""
+Token-bucket rate limiting and adaptive batching for embedding API calls
+"""
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate`` per ``period`` seconds"""
+
+    def __init__(self, rate: float, period: float = 60.0,
+                 timer: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.capacity = float(rate)
+        self.refill_per_second = rate / period
+        self._tokens = float(rate)
+        self._timer = timer
+        self._sleep = sleep
+        self._last = timer()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._timer()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.refill_per_second)
+        self._last = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Block until ``amount`` tokens are available and take them; return seconds waited"""
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.refill_per_second
+            self._sleep(delay)
+            waited += delay
+
+    def drain(self):
+        """Empty the bucket, e.g. after the server reported a rate limit"""
+        with self._lock:
+            self._refill()
+            self._tokens = 0.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for HTTP 429 errors from the OpenAI client or similar"""
+    return (
+        getattr(error, "status_code", None) == 429
+        or getattr(getattr(error, "response", None), "status_code", None) == 429
+        or type(error).__name__ == "RateLimitError"
+    )
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """Wraps an Embeddings model with request/token budgets and adaptive batching.
+
+    Every API call takes one token from the requests-per-minute bucket and the
+    estimated input tokens from the tokens-per-minute bucket. On a 429 the
+    batch size and allowed concurrency are halved and the call is retried with
+    exponential backoff (or the server's Retry-After). After a run of
+    successes they grow again, up to ``max_batch_size`` inputs per call.
+
+    ``batch_size`` and ``concurrency`` are read by ``IngestPipeline`` to size
+    and schedule concurrent embedding batches.
+    """
+
+    def __init__(self, underlying: Embeddings, requests_per_minute: float = 3000,
+                 tokens_per_minute: float = 1_000_000, max_batch_size: int = 2048,
+                 initial_batch_size: int = 64, min_batch_size: int = 8, max_concurrency: int = 8,
+                 initial_concurrency: int = 2, max_retries: int = 8, base_backoff: float = 1.0,
+                 grow_after: int = 3, period: float = 60.0, sleep: Callable[[float], None] = time.sleep):
+        self.underlying = underlying
+        self.requests = TokenBucket(requests_per_minute, period, sleep=sleep)
+        self.tokens = TokenBucket(tokens_per_minute, period, sleep=sleep)
+        self.max_batch_size = max_batch_size
+        self.min_batch_size = min(min_batch_size, max_batch_size)
+        self.batch_size = min(initial_batch_size, max_batch_size)
+        self.max_concurrency = max_concurrency
+        self.concurrency = min(initial_concurrency, max_concurrency)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.grow_after = grow_after
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._successes = 0
+
+        self.api_calls = 0
+        self.rate_limited = 0
+        self.throttled_seconds = 0.0
+
+    @property
+    def model(self) -> str:
+        # Keep embedding cache keys identical to the unwrapped model
+        return getattr(self.underlying, "model", None) or type(self.underlying).__name__
+
+    def _on_success(self):
+        with self._lock:
+            self._successes += 1
+            if self._successes >= self.grow_after:
+                self._successes = 0
+                self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+    def _on_rate_limited(self):
+        with self._lock:
+            self._successes = 0
+            self.rate_limited += 1
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            self.concurrency = max(1, self.concurrency // 2)
+
+    def _call(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            waited = self.requests.acquire(1)
+            waited += self.tokens.acquire(sum(estimate_tokens(text) for text in texts))
+            with self._lock:
+                self.throttled_seconds += waited
+                self.api_calls += 1
+            try:
+                vectors = self.underlying.embed_documents(texts)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                self._on_rate_limited()
+                self.requests.drain()
+                delay = _retry_after(e) or self.base_backoff * (2 ** attempt)
+                self._sleep(delay * (1 + random.random() * 0.25))
+                continue
+            self._on_success()
+            return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        start = 0
+        while start < len(texts):
+            batch = texts[start:start + max(1, self.batch_size)]
+            vectors.extend(self._call(batch))
+            start += len(batch)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        self.requests.acquire(1)
+        self.tokens.acquire(estimate_tokens(text))
+        return self.underlying.embed_query(text)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "api_calls": self.api_calls,
+            "rate_limited": self.rate_limited,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+        }
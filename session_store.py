@@ -0,0 +1,198 @@
+"""
+Bounded chat session store with LRU/TTL eviction and optional SQLite write-through
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from conversation_state import TrackedChatMessageHistory
+from lru_ttl_cache import LRUTTLCache
+
+# Rough per-message object overhead on top of the content bytes
+MESSAGE_OVERHEAD_BYTES = 256
+
+
+def message_size(message: BaseMessage) -> int:
+    """Approximate in-memory size of a message in bytes"""
+    return len(str(message.content).encode("utf-8")) + MESSAGE_OVERHEAD_BYTES
+
+
+class SQLiteSessionBackend:
+    """Append-only message log per session in SQLite.
+
+    Every message is one INSERT, so writing a turn costs the same however long
+    the session is, and a session is loaded on demand by reading only its
+    most recent ``limit`` rows.
+    """
+
+    def __init__(self, path: str = "./sessions.sqlite"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS messages (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, seq)")
+        self._conn.commit()
+
+    def append(self, session_id: str, message: BaseMessage):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO messages (session_id, message, created_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(message_to_dict(message)), time.time()),
+            )
+            self._conn.commit()
+
+    def load(self, session_id: str, limit: Optional[int] = None) -> List[BaseMessage]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                (session_id, -1 if limit is None else limit),
+            ).fetchall()
+        return messages_from_dict([json.loads(row[0]) for row in reversed(rows)])
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM messages WHERE session_id = ? LIMIT 1", (session_id,)).fetchone()
+        return row is not None
+
+
+class SessionHistory(TrackedChatMessageHistory):
+    """Tracked chat history with a message cap, size accounting and write-through.
+
+    When ``max_messages`` is exceeded the oldest messages are dropped from
+    memory (they stay in the SQLite log). ``state`` keeps counting every
+    message the session has seen in this process.
+    """
+
+    session_id: str = ""
+    max_messages: Optional[int] = None
+    approx_bytes: int = 0
+    backend: Any = None
+
+    def _append(self, message: BaseMessage):
+        super().add_message(message)
+        self.approx_bytes += message_size(message)
+        if self.max_messages is not None and len(self.messages) > self.max_messages:
+            dropped = self.messages[:-self.max_messages]
+            self.messages = self.messages[-self.max_messages:]
+            self.approx_bytes -= sum(message_size(m) for m in dropped)
+
+    def add_message(self, message: BaseMessage) -> None:
+        self._append(message)
+        if self.backend is not None:
+            self.backend.append(self.session_id, message)
+
+    def load(self, messages: List[BaseMessage]):
+        """Restore persisted messages without writing them again"""
+        for message in messages:
+            self._append(message)
+
+    def clear(self) -> None:
+        super().clear()
+        self.approx_bytes = 0
+        if self.backend is not None:
+            self.backend.delete(self.session_id)
+
+
+class SessionStore:
+    """Bounded store of chat sessions keyed by session id.
+
+    Holds at most ``max_sessions`` sessions in memory, evicting the least
+    recently used, and drops sessions idle for more than ``ttl`` seconds.
+    Each session keeps at most ``max_messages`` messages. With
+    ``persist_path`` every message is also appended to SQLite, and a session
+    that is not in memory (evicted, expired or from before a restart) is
+    reloaded from its most recent messages on first access.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl: Optional[float] = 86400,
+                 max_messages: Optional[int] = 200, persist_path: str = None,
+                 timer: Callable[[], float] = time.monotonic):
+        self.max_messages = max_messages
+        self.backend = SQLiteSessionBackend(persist_path) if persist_path else None
+        self._sessions = LRUTTLCache(maxsize=max_sessions, ttl=ttl, timer=timer)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.restored = 0
+
+    @classmethod
+    def from_env(cls) -> "SessionStore":
+        ttl = os.getenv("SESSION_TTL", "86400")
+        max_messages = os.getenv("SESSION_MAX_MESSAGES", "200")
+        return cls(
+            max_sessions=int(os.getenv("SESSION_MAX", "1000")),
+            ttl=float(ttl) if ttl else None,
+            max_messages=int(max_messages) if max_messages else None,
+            persist_path=os.getenv("SESSION_DB_PATH") or None,
+        )
+
+    def get(self, session_id: str) -> SessionHistory:
+        """Get, restore or create the history for a session"""
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                self._sessions.purge_expired()
+                history = SessionHistory(session_id=session_id, max_messages=self.max_messages,
+                                         backend=self.backend)
+                if self.backend is not None:
+                    history.load(self.backend.load(session_id, self.max_messages))
+                self.restored += bool(history.messages)
+                self.created += not history.messages
+            # Re-putting refreshes the idle timer
+            self._sessions.put(session_id, history)
+            return history
+
+    def delete(self, session_id: str):
+        """Forget a session, including its persisted messages"""
+        with self._lock:
+            self._sessions.pop(session_id)
+            if self.backend is not None:
+                self.backend.delete(session_id)
+
+    def exists(self, session_id: str) -> bool:
+        """Whether the session is in memory or has persisted messages to restore"""
+        return session_id in self._sessions or (self.backend is not None and self.backend.exists(session_id))
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        sessions = self._sessions.values()
+        cache = self._sessions.stats()
+        return {
+            "sessions": cache["size"],
+            "max_sessions": cache["maxsize"],
+            "messages": sum(len(history.messages) for history in sessions),
+            "approx_bytes": sum(history.approx_bytes for history in sessions),
+            "hits": cache["hits"],
+            "misses": cache["misses"],
+            "hit_rate": cache["hit_rate"],
+            "evictions": cache["evictions"],
+            "expirations": cache["expirations"],
+            "created": self.created,
+            "restored": self.restored,
+            "persistent": self.backend is not None,
+        }
@@ -45,15 +45,19 @@ ON documents USING ivfflat (embedding vector_cosine_ops)
 WITH (lists = 100);
 
 -- 6. Create function for similarity search
+-- Returns embeddings too, so MMR can diversify results without re-embedding them
+-- A loose floor and a generous row cap: the retriever decides how many candidates to keep
+DROP FUNCTION IF EXISTS match_documents(VECTOR(1536), FLOAT, INT);
 CREATE OR REPLACE FUNCTION match_documents(
     query_embedding VECTOR(1536),
-    match_threshold FLOAT DEFAULT 0.78,
-    match_count INT DEFAULT 10
+    match_threshold FLOAT DEFAULT 0.5,
+    match_count INT DEFAULT 50
 )
 RETURNS TABLE(
     id UUID,
     content TEXT,
     metadata JSONB,
+    embedding VECTOR(1536),
     similarity FLOAT
 )
 LANGUAGE SQL STABLE
@@ -62,6 +66,7 @@ AS $$
         documents.id,
         documents.content,
         documents.metadata,
+        documents.embedding,
         1 - (documents.embedding <=> query_embedding) AS similarity
     FROM documents
     WHERE documents.embedding IS NOT NULL
@@ -0,0 +1,82 @@
+"""
+Test adaptive-k retrieval: the result count follows the score distribution (no API keys required)
+"""
+import tempfile
+from langchain_core.documents import Document
+from adaptive_k import choose_k, describe
+from bm25_index import BM25Index
+from fakes import BagOfWordsEmbeddings, build_fake_chatbot
+from hybrid_retriever import HybridRetriever
+from ingest_pipeline import IngestPipeline
+from local_vector_store import LocalVectorStore
+from tracing import ChatTrace, activate
+
+DISORDERS = ["major depressive", "bipolar", "generalized anxiety", "social anxiety", "schizophrenia",
+             "borderline personality", "obsessive compulsive", "posttraumatic stress", "insomnia", "anorexia"]
+
+def criteria_documents():
+    """One distinctive panic attack passage and many near-identical duration criteria"""
+    docs = [Document(page_content="Panic attacks: palpitations, sweating, trembling and fear of dying.",
+                     metadata={"source": "DSM-5", "page": 1})]
+    return docs + [Document(page_content=f"Criterion: symptoms persist for a duration of six months in {name} disorder.",
+                            metadata={"source": "DSM-5", "page": 10 + i}) for i, name in enumerate(DISORDERS)]
+
+def test_choose_k():
+    """One clear hit keeps min_k, a flat run keeps up to max_k, a cluster stops at its elbow"""
+    assert choose_k([0.92, 0.41, 0.40, 0.38, 0.37], min_k=2, max_k=8, max_gap=0.05) == 2
+    assert choose_k([0.81, 0.80, 0.80, 0.79, 0.79, 0.78, 0.78, 0.77, 0.77, 0.76], 2, 8, 0.05) == 8
+    assert choose_k([0.90, 0.86, 0.84, 0.82, 0.55, 0.52, 0.50], 1, 8, 0.05) == 4
+    assert choose_k([0.5, 0.4], 3, 8, 0.05) == 2 and choose_k([], 2, 8, 0.05) == 0
+    # Scores arrive in any order
+    assert choose_k([0.41, 0.92, 0.40], 1, 8, 0.05) == 1
+    report = describe([0.9, 0.86, 0.5], 2)
+    assert report["k"] == 2 and report["kth_score"] == 0.86 and report["next_score"] == 0.5
+    print("✅ choose_k follows the score gap and elbow within [min_k, max_k]")
+
+def test_adaptive_retriever():
+    """Narrow questions get fewer chunks than broad ones; the choice is traced and counted"""
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = BagOfWordsEmbeddings()
+        store = LocalVectorStore(embeddings, tmp)
+        lexical = BM25Index()
+        IngestPipeline(store, embeddings, verbose=False, indexes=[lexical]).run(criteria_documents())
+        narrow = "panic attacks with palpitations, sweating and trembling"
+        broad = "criterion: symptoms persist for a duration of six months"
+
+        fixed = HybridRetriever(vector_store=store, lexical_index=lexical, k=5)
+        assert len(fixed.invoke(narrow)) == len(fixed.invoke(broad)) == 5
+
+        retriever = HybridRetriever(vector_store=store, lexical_index=lexical, k=5, adaptive_k=True, min_k=2, max_k=8)
+        narrow_docs = retriever.invoke(narrow)
+        assert len(narrow_docs) == 2 and narrow_docs[0].metadata["page"] == 1
+        trace = ChatTrace()
+        with activate(trace):
+            broad_docs = retriever.invoke(broad)
+        assert len(broad_docs) == 8 and all(doc.metadata["page"] >= 10 for doc in broad_docs)
+        selection = next(span for span in trace.to_dict()["spans"] if span["name"] == "select_k")
+        assert selection["k"] == 8 and selection["source"] == "vector" and len(selection["scores"]) == 10
+        assert retriever.stats()["mean_k"] == 5.0
+        print(f"✅ Narrow question kept {len(narrow_docs)} chunks, broad question {len(broad_docs)}: {selection}")
+
+        retriever.mode = "lexical"
+        # Only the panic attack passage shares a term with the question; min_k can't add more
+        assert len(retriever.invoke(narrow)) == 1
+        retriever.mode = "vector"
+        assert len(retriever.invoke(broad)) == 8
+        print("✅ Adaptive k in lexical (BM25 scores) and vector modes")
+
+def test_chatbot_reports_k():
+    """Chat responses trace the chosen k and its score distribution"""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot = build_fake_chatbot(tmp, heuristic_assessment=False)
+        response = chatbot.chat("How long must symptoms last before a diagnosis?")
+        selection = next(span for span in response["trace"]["spans"] if span["name"] == "select_k")
+        assert len(response["sources"]) == selection["k"]
+        assert chatbot.retriever.min_k <= selection["k"] <= chatbot.retriever.max_k
+        assert chatbot.retriever.stats()["adaptive_k"]
+        print(f"✅ Chatbot retrieved {selection['k']} chunks (top score {selection['top_score']})")
+
+if __name__ == "__main__":
+    test_choose_k()
+    test_adaptive_retriever()
+    test_chatbot_reports_k()
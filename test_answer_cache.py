@@ -0,0 +1,79 @@
+"""
+Test the semantic answer cache on the PROVIDE_INFO path (no API keys required)
+"""
+import os
+import tempfile
+import threading
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+from answer_cache import SemanticAnswerCache
+from database import SupabaseDB
+from rag_chatbot import DSM5Chatbot
+
+def test_answer_cache():
+    """Cache lookups, LRU eviction and persistence"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "answers.npz")
+        cache = SemanticAnswerCache(threshold=0.9, max_entries=2, persist_path=path)
+        cache.add("q1", [1.0, 0.0, 0.0], "answer 1", [Document(page_content="src", metadata={"page": 1})])
+        cache.add("q2", [0.0, 1.0, 0.0], "answer 2", [])
+
+        hit = cache.lookup([0.99, 0.05, 0.0])
+        assert hit["answer"] == "answer 1" and hit["sources"][0].metadata["page"] == 1
+        assert cache.lookup([0.0, 0.0, 1.0]) is None
+
+        # q2 is least recently used and gets evicted
+        cache.add("q3", [0.0, 0.0, 1.0], "answer 3", [])
+        assert cache.lookup([0.0, 1.0, 0.0]) is None
+        assert cache.stats()["evictions"] == 1
+
+        # Changes are written on save() (or after save_interval), not on every add
+        assert not os.path.exists(path)
+        cache.save()
+        reloaded = SemanticAnswerCache(threshold=0.9, max_entries=2, persist_path=path)
+        assert reloaded.lookup([0.0, 0.0, 1.0])["answer"] == "answer 3"
+
+        # Concurrent writers each use their own temporary file
+        eager = SemanticAnswerCache(threshold=0.9, max_entries=50, persist_path=path, save_interval=0)
+        threads = [threading.Thread(target=eager.add, args=(f"q{i}", [1.0, float(i), 0.0], f"a{i}", []))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        eager.save()
+        assert len(SemanticAnswerCache(max_entries=50, persist_path=path)) == 10
+        assert os.listdir(tmp) == ["answers.npz"]
+
+        eager.clear()
+        assert not os.path.exists(path)
+        print("✅ Lookup, eviction and persistence work")
+
+def test_chat_cache_hit():
+    """A repeated general question in a fresh session skips the LLM entirely"""
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as env:
+        env.setenv("LOCAL_VECTOR_STORE_PATH", os.path.join(tmp, "store"))
+        env.setenv("EMBEDDING_CACHE_PATH", os.path.join(tmp, "cache.sqlite"))
+        env.setenv("RETRIEVAL_INDEX_DIR", os.path.join(tmp, "retrieval_index"))
+        env.setenv("INGEST_MANIFEST_PATH", os.path.join(tmp, "manifest.sqlite"))
+        db = SupabaseDB(backend="local", embeddings=DeterministicFakeEmbedding(size=32))
+        db.get_vector_store().add_texts(["Major depressive disorder criteria A1-A9"])
+
+        llm = FakeListChatModel(responses=["PROVIDE_INFO", "MDD requires five of nine symptoms..."])
+        chatbot = DSM5Chatbot(db=db, llm=llm, semantic_cache=SemanticAnswerCache(), heuristic_assessment=False)
+
+        question = "What are the DSM-5 criteria for major depressive disorder?"
+        first = chatbot.chat(question, "session-1")
+        assert first["cache_hit"] is False and first["assessment"] == "PROVIDE_INFO"
+
+        second = chatbot.chat(question, "session-2")
+        assert second["cache_hit"] is True
+        assert second["answer"] == first["answer"]
+        assert len(chatbot.get_session_history("session-2").messages) == 2
+        print(f"✅ Second session served from cache: {chatbot.semantic_cache.stats()}")
+
+if __name__ == "__main__":
+    test_answer_cache()
+    test_chat_cache_hit()
@@ -0,0 +1,70 @@
+"""
+Test the ASGI chat service against local fakes (no API keys required)
+"""
+import json
+import os
+import tempfile
+from starlette.testclient import TestClient
+from api_server import create_app
+from fakes import FakeChatModel, build_fake_chatbot
+from session_store import SessionStore
+
+def _client(tmp, llm_concurrency=4, **chatbot_kwargs):
+    llm = FakeChatModel(rules=[("clarifying questions", "How long have you felt this way?")],
+                        default="MDD requires five of nine symptoms.")
+    chatbot = build_fake_chatbot(tmp, texts=["Major depressive disorder criteria A1-A9"], embedding_size=32, llm=llm,
+                                 **chatbot_kwargs)
+    return TestClient(create_app(chatbot, llm_concurrency=llm_concurrency))
+
+def test_chat_endpoints():
+    """Chat, summary and clear are scoped to the caller's session"""
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client(tmp)
+
+        reply = client.post("/chat", json={"question": "What are the criteria for MDD?"})
+        assert reply.status_code == 200
+        session_id = reply.headers["x-session-id"]
+        body = reply.json()
+        assert body["answer"] == "MDD requires five of nine symptoms."
+        assert body["sources"][0]["content"].startswith("Major depressive")
+
+        client.post("/chat", json={"question": "Do I have depression?"}, headers={"X-Session-ID": "other"})
+        assert client.get(f"/sessions/{session_id}/summary").json()["total_messages"] == 2
+        assert client.get("/sessions/other/summary").json()["user_messages"] == 1
+
+        assert client.delete(f"/sessions/{session_id}").status_code == 200
+        assert client.get(f"/sessions/{session_id}/summary").status_code == 404
+        assert client.post("/chat", json={}).status_code == 400
+        print("✅ Per-client sessions over HTTP")
+
+def test_summary_of_evicted_session():
+    """A persisted session evicted from memory still has a summary"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(max_sessions=1, persist_path=os.path.join(tmp, "sessions.sqlite"))
+        client = _client(tmp, session_store=store)
+        client.post("/chat", json={"question": "What are the criteria for MDD?", "session_id": "first"})
+        client.post("/chat", json={"question": "What are the criteria for MDD?", "session_id": "second"})
+        assert "first" not in store
+
+        assert client.get("/sessions/first/summary").json()["total_messages"] == 2
+        assert client.get("/sessions/never-seen/summary").status_code == 404
+        print("✅ Evicted session restored for its summary")
+
+def test_chat_stream_endpoint():
+    """Streaming endpoint emits NDJSON events ending with the full response"""
+    with tempfile.TemporaryDirectory() as tmp:
+        client = _client(tmp)
+        with client.stream("POST", "/chat/stream", json={"question": "What is MDD?", "session_id": "s1"}) as reply:
+            events = [json.loads(line) for line in reply.iter_lines() if line]
+        assert [e["type"] for e in events[:2]] == ["assessment", "sources"]
+        tokens = "".join(e["content"] for e in events if e["type"] == "token")
+        assert tokens == events[-1]["response"]["answer"]
+
+        health = client.get("/health").json()
+        assert health["llm"]["calls"] == 1 and health["llm"]["max_concurrency"] == 4
+        print(f"✅ Streamed {len(events)} events; limiter {health['llm']}")
+
+if __name__ == "__main__":
+    test_chat_endpoints()
+    test_summary_of_evicted_session()
+    test_chat_stream_endpoint()
@@ -0,0 +1,79 @@
+"""
+Test the async chat path: assessment overlaps retrieval (no API keys required)
+"""
+import asyncio
+import os
+import tempfile
+import threading
+from fakes import FakeChatModel, build_fake_chatbot
+from session_store import SessionStore
+
+ASSESSMENT_PROMPT = "You are a diagnostic assessment agent"
+
+def _chatbot(tmp, assessment, latency=0.2):
+    llm = FakeChatModel(rules=[
+        (ASSESSMENT_PROMPT, assessment),
+        ("formulate a standalone question", "What are the criteria for major depressive disorder?"),
+        ("clarifying questions", "How long have you felt this way?"),
+    ], default="MDD requires five of nine symptoms...", latency=latency)
+    texts = ["Major depressive disorder criteria A1-A9", "Generalized anxiety disorder criteria A-F"]
+    return build_fake_chatbot(tmp, texts=texts, embedding_size=32, llm=llm, heuristic_assessment=False)
+
+def test_achat_overlaps_retrieval():
+    """PROVIDE_INFO: contextualize+retrieve runs while the assessment is in flight"""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot = _chatbot(tmp, "PROVIDE_INFO")
+        history = chatbot.get_session_history("s1")
+        history.add_user_message("Tell me about depression")
+        history.add_ai_message("Depression is a mood disorder...")
+
+        sync = chatbot.chat("What are its criteria?", "s2-sync")
+        response = asyncio.run(chatbot.achat("What are its criteria?", "s1"))
+
+        assert set(response) == set(sync)
+        assert response["assessment"] == "PROVIDE_INFO" and response["sources"]
+        assert response["answer"] == "MDD requires five of nine symptoms..."
+        timings = response["timings"]
+        sequential = timings["assessment"] + timings["retrieval"] + timings["generation"]
+        assert timings["total"] < sequential - 0.1
+        assert len(history.messages) == 4
+        print(f"✅ Assessment and retrieval overlapped: {timings}")
+
+def test_achat_cancels_retrieval():
+    """ASK_CLARIFYING: the speculative retrieval is discarded, no sources returned"""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot = _chatbot(tmp, "ASK_CLARIFYING", latency=0.05)
+        response = asyncio.run(chatbot.achat("Do I have depression?", "s1"))
+
+        assert response["needs_more_info"] is True and response["sources"] == []
+        assert response["action_taken"] == "asked_clarifying_questions"
+        assert len(chatbot.get_session_history("s1").messages) == 2
+        print(f"✅ Retrieval cancelled for clarifying questions: {response['timings']}")
+
+def test_achat_keeps_blocking_work_off_the_loop():
+    """Session SQLite reads/writes and context packing run in worker threads"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(persist_path=os.path.join(tmp, "sessions.sqlite"))
+        chatbot = _chatbot(tmp, "PROVIDE_INFO", latency=0.0)
+        chatbot.store = store
+        on_loop = []
+
+        def record(name, method):
+            def wrapper(*args, **kwargs):
+                on_loop.append((name, threading.current_thread() is threading.main_thread()))
+                return method(*args, **kwargs)
+            return wrapper
+        store.backend.load = record("load", store.backend.load)
+        store.backend.append = record("append", store.backend.append)
+        chatbot.context_packer.pack = record("pack", chatbot.context_packer.pack)
+
+        response = asyncio.run(chatbot.achat("What are the criteria for MDD?", "s1"))
+        assert sorted(name for name, _ in on_loop) == ["append", "append", "load", "pack"]
+        assert not any(main for _, main in on_loop)
+        assert response["sources"] and store.backend.load("s1")[-1].content == response["answer"]
+        print("✅ Session persistence and packing ran off the event loop")
+
+if __name__ == "__main__":
+    test_achat_overlaps_retrieval()
+    test_achat_cancels_retrieval()
+    test_achat_keeps_blocking_work_off_the_loop()
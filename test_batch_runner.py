@@ -0,0 +1,121 @@
+"""
+Test the concurrent batch question runner and resuming a partial run (no API keys required)
+"""
+import asyncio
+import json
+import os
+import tempfile
+from batch_runner import BatchRunner, main, read_turns
+from fakes import build_fake_chatbot
+
+SESSIONS = {
+    "clinician-1": ["What are the DSM-5 criteria for major depressive disorder?",
+                    "How long must those symptoms last?", "What about in children?"],
+    "clinician-2": ["Do I have depression?", "I have felt sad and tired for two months",
+                    "It affects my work"],
+    "clinician-3": ["How is generalized anxiety disorder defined?", "Which specifiers apply?",
+                    "How is it different from panic disorder?"],
+    "clinician-4": ["What is the difference between bipolar I and bipolar II?",
+                    "Which one has hypomania?", "How long is a hypomanic episode?"],
+}
+
+def write_questions(path):
+    with open(path, "w") as f:
+        for turn in range(3):
+            for session_id, questions in SESSIONS.items():
+                f.write(json.dumps({"id": f"{session_id}/{turn}", "session_id": session_id,
+                                    "question": questions[turn]}) + "\n")
+
+def spy_history(chatbot):
+    """Record (session, question, messages in its history) for every turn the chatbot answers"""
+    seen, achat = [], chatbot.achat
+    async def spy(question, session_id="default"):
+        seen.append((session_id, question, len(chatbot.get_session_history(session_id).messages)))
+        return await achat(question, session_id)
+    chatbot.achat = spy
+    return seen
+
+def read_output(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_concurrent_run():
+    """Sessions run concurrently, turns within a session in order"""
+    with tempfile.TemporaryDirectory() as tmp:
+        questions, answers = os.path.join(tmp, "questions.jsonl"), os.path.join(tmp, "answers.jsonl")
+        write_questions(questions)
+        sessions = read_turns(questions)
+        assert list(sessions) == list(SESSIONS) and all(len(turns) == 3 for turns in sessions.values())
+
+        chatbot = build_fake_chatbot(tmp, latency=0.05)
+        seen = spy_history(chatbot)
+        report = asyncio.run(BatchRunner(chatbot, workers=4).run(sessions, answers))
+        records = read_output(answers)
+        assert report["run"] == len(records) == 12 and report["errors"] == 0
+        for session_id, questions_asked in SESSIONS.items():
+            turns = [record for record in records if record["session_id"] == session_id]
+            assert [record["turn"] for record in turns] == [0, 1, 2]
+            assert [record["question"] for record in turns] == questions_asked
+            assert turns[0]["id"] == f"{session_id}/0"
+        rag = next(record for record in records if record["sources"])
+        assert rag["answer"] and rag["assessment"] and rag["timings"]["total"] > 0
+        assert set(rag["sources"][0]) == {"content", "metadata"}
+        # Each turn was answered on the history of the session's earlier turns, isolated from live sessions
+        for session_id, questions_asked in SESSIONS.items():
+            assert [(question, messages) for key, question, messages in seen if key == f"batch:{session_id}"] == \
+                [(question, 2 * turn) for turn, question in enumerate(questions_asked)]
+        assert len(chatbot.store) == 0
+        sequential = sum(record["timings"]["total"] for record in records)
+        assert report["elapsed_seconds"] < sequential / 2
+        print(f"✅ {report['run']} turns in {report['elapsed_seconds']}s "
+              f"({sequential:.2f}s sequential): {report['assessments']}")
+
+def test_resume():
+    """A resumed run keeps finished turns and re-runs failed, missing and later ones"""
+    with tempfile.TemporaryDirectory() as tmp:
+        questions, answers = os.path.join(tmp, "questions.jsonl"), os.path.join(tmp, "answers.jsonl")
+        write_questions(questions)
+        sessions = read_turns(questions)
+        chatbot = build_fake_chatbot(tmp)
+        asyncio.run(BatchRunner(chatbot, workers=2).run(sessions, answers))
+        records = read_output(answers)
+
+        # Interrupted run: clinician-1 finished, clinician-2 failed on turn 1,
+        # clinician-3 has one turn, clinician-4 none, and the last write was cut off
+        kept = [r for r in records if r["session_id"] == "clinician-1"]
+        kept += [r for r in records if r["session_id"] == "clinician-2"]
+        kept[4]["error"] = "Error: timeout"
+        kept += [r for r in records if r["session_id"] == "clinician-3" and r["turn"] == 0]
+        with open(answers, "w") as f:
+            f.writelines(json.dumps(record) + "\n" for record in kept)
+            f.write('{"session_id": "clinician-4", "tur')
+
+        seen = spy_history(chatbot)
+        report = asyncio.run(BatchRunner(chatbot, workers=2).run(sessions, answers, resume=True))
+        assert report["resumed"] == 3 + 1 + 1 and report["run"] == 12 - 5
+        # Resumed sessions continue on the history of their kept turns
+        assert sorted(seen) == sorted([("batch:clinician-2", SESSIONS["clinician-2"][1], 2),
+                                       ("batch:clinician-2", SESSIONS["clinician-2"][2], 4),
+                                       ("batch:clinician-3", SESSIONS["clinician-3"][1], 2),
+                                       ("batch:clinician-3", SESSIONS["clinician-3"][2], 4)] +
+                                      [("batch:clinician-4", question, 2 * turn)
+                                       for turn, question in enumerate(SESSIONS["clinician-4"])])
+        records = read_output(answers)
+        assert len(records) == 12 and len({(r["session_id"], r["turn"]) for r in records}) == 12
+        assert not any("error" in record for record in records)
+        print(f"✅ Resumed: {report['resumed']} turns kept, {report['run']} run again")
+
+        # Resuming a finished run does nothing
+        report = asyncio.run(BatchRunner(chatbot).run(sessions, answers, resume=True))
+        assert report["run"] == 0 and len(read_output(answers)) == 12
+
+        try:
+            main([questions, answers])
+            raise AssertionError("an existing output needs --resume")
+        except SystemExit as e:
+            assert e.code == 1
+        print("✅ Finished run left as is; existing output not overwritten")
+
+if __name__ == "__main__":
+    test_concurrent_run()
+    test_resume()
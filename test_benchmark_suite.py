@@ -0,0 +1,38 @@
+"""
+Test the offline benchmark suite and its baseline comparison (no API keys required)
+"""
+import json
+from benchmarks.suite import compare, run_suite
+
+def test_suite_results():
+    """A small suite run covers both chat paths, both ingest entry points and memory"""
+    results = run_suite(turns=3, session_turns=8, sessions=5, corpus_copies=1)
+    assert set(results["chat"]) == {"clarifying", "rag"}
+    assert results["chat"]["rag"]["turns"] == 3 and results["chat"]["rag"]["p50_ms"] > 0
+    assert results["ingest"]["upload"]["chunks"] > 0 and results["ingest"]["add_documents"]["chunks_per_sec"] > 0
+    assert results["memory"]["long_session"]["turns"] == 8
+    metrics = results["metrics"]
+    assert "chat.clarifying.p99_ms" in metrics and "ingest.upload.chunks_per_sec" in metrics
+    assert "memory.sessions.kb_per_session" in metrics and "chat.rag.turns" not in metrics
+    json.dumps(results)
+    print(f"✅ Suite measured {len(metrics)} metrics")
+
+def test_compare_with_baseline():
+    """Slower latencies and lower throughput are regressions beyond the tolerance"""
+    baseline = {"metrics": {"chat.rag.p50_ms": 10.0, "ingest.upload.chunks_per_sec": 1000.0,
+                            "memory.sessions.kb_per_session": 2.0, "chat.cache.p50_ms": 1.0}}
+    results = {"metrics": {"chat.rag.p50_ms": 14.0, "ingest.upload.chunks_per_sec": 1500.0,
+                           "memory.sessions.kb_per_session": 2.1, "chat.clarifying.p50_ms": 3.0}}
+    rows = {row["metric"]: row for row in compare(results, baseline, tolerance=0.25)}
+    assert rows["chat.rag.p50_ms"]["status"] == "regression" and rows["chat.rag.p50_ms"]["change_pct"] == 40.0
+    assert rows["ingest.upload.chunks_per_sec"]["status"] == "improvement"
+    assert rows["memory.sessions.kb_per_session"]["status"] == "ok"
+    assert "chat.clarifying.p50_ms" not in rows and "chat.cache.p50_ms" not in rows
+
+    results["metrics"]["ingest.upload.chunks_per_sec"] = 600.0
+    assert compare(results, baseline)[1]["status"] == "regression"
+    print("✅ Baseline comparison flags regressions in either direction")
+
+if __name__ == "__main__":
+    test_suite_results()
+    test_compare_with_baseline()
@@ -0,0 +1,73 @@
+"""
+Test context packing: overlap merging, near-duplicate removal and the token budget (no API keys required)
+"""
+import tempfile
+from langchain_core.documents import Document
+from context_packer import ContextPacker, overlap_join
+from dsm5_splitter import legacy_text_splitter
+from fakes import build_fake_chatbot, sample_dsm5_lines
+from token_counter import count_tokens
+
+def legacy_chunks(page: int = 12):
+    """Consecutive 1000/200 chunks of one DSM-5 page, as the old ingestion stored them"""
+    text = "\n".join(sample_dsm5_lines()[:120])
+    chunks = legacy_text_splitter().split_text(text)
+    return text, [Document(page_content=chunk, metadata={"source": "DSM-5", "page": page, "chunk_id": i})
+                  for i, chunk in enumerate(chunks)]
+
+def test_merge_overlapping_chunks():
+    """Overlapping chunks of a page are stitched back together without the repeated text"""
+    assert overlap_join("criterion A depressed mood most of the day",
+                        "depressed mood most of the day, nearly every day") == \
+        "criterion A depressed mood most of the day, nearly every day"
+    assert overlap_join("unrelated text about sleep here", "another passage entirely on mood") is None
+
+    text, chunks = legacy_chunks()
+    packer = ContextPacker(max_tokens=10_000)
+    context, report = packer.pack([chunks[1], chunks[0], chunks[2]])
+    assert len(context) == 1 and report["merged_chunks"] == 2
+    assert context[0].page_content in text
+    assert context[0].metadata["chunk_ids"] == [0, 1, 2]
+    assert report["tokens_saved"] > 0 and report["tokens_after"] < report["tokens_before"]
+    print(f"✅ 3 overlapping chunks merged, {report['tokens_saved']} tokens saved")
+
+def test_near_duplicates_and_budget():
+    """Near-duplicate passages are dropped and the context fits the token budget"""
+    _, chunks = legacy_chunks()
+    copy = Document(page_content=chunks[3].page_content.replace("\n", " ") + " Reprinted.",
+                    metadata={"source": "DSM-5 handout", "page": 2})
+    distant = Document(page_content=chunks[6].page_content, metadata={"source": "DSM-5", "page": 40})
+    packer = ContextPacker(max_tokens=10_000)
+    context, report = packer.pack([chunks[3], copy, distant])
+    assert report["duplicates_dropped"] == 1 and len(context) == 2
+    print("✅ Near-duplicate passage from another source dropped")
+
+    packer = ContextPacker(max_tokens=300)
+    context, report = packer.pack(chunks[:2] + [distant, copy])
+    assert report["truncated"] and report["tokens_after"] <= 300
+    assert sum(count_tokens(doc.page_content) for doc in context) == report["tokens_after"]
+    stats = packer.stats()
+    assert stats["requests"] == 1 and stats["tokens_saved"] == report["tokens_saved"]
+    print(f"✅ Context packed into the budget: {report}")
+
+def test_chatbot_packs_context():
+    """RAG answers are generated from the packed context and report the tokens saved"""
+    _, chunks = legacy_chunks()
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot = build_fake_chatbot(tmp, texts=[chunk.page_content for chunk in chunks])
+        chatbot.context_packer.max_tokens = 250
+        chatbot.retriever.adaptive_k = False  # a fixed 5 chunks to pack
+        response = chatbot.chat("What are the diagnostic criteria and features?")
+        packing = response["context_packing"]
+        assert response["assessment"] == "PROVIDE_INFO" and len(response["sources"]) == 5
+        assert packing["retrieved_chunks"] == 5 and packing["tokens_after"] <= 250
+        assert packing["tokens_saved"] > 0 and "packing" in response["timings"]
+        prompt = chatbot.llm.last_prompt
+        assert sum(source.page_content in prompt for source in response["sources"]) < 5
+        print(f"✅ Chatbot prompt carried {packing['tokens_after']} context tokens "
+              f"({packing['tokens_saved']} saved)")
+
+if __name__ == "__main__":
+    test_merge_overlapping_chunks()
+    test_near_duplicates_and_budget()
+    test_chatbot_packs_context()
@@ -0,0 +1,48 @@
+"""
+Test incremental per-session conversation analytics
+"""
+from conversation_state import ConversationState, TrackedChatMessageHistory
+from tiered_assessor import TieredAssessor
+
+def test_incremental_summary():
+    """Summary and signals update as messages are added, and reset on clear"""
+    history = TrackedChatMessageHistory()
+    history.add_user_message("Do I have depression? I feel sad and have trouble sleeping")
+    history.add_ai_message("Can you tell me how long you have been feeling this way?")
+    history.add_user_message("For months, and it is affecting my work")
+
+    summary = history.state.summary()
+    assert summary == {
+        "total_messages": 3,
+        "user_messages": 2,
+        "symptom_mentions": 2,  # "feel" and "trouble" in the first message
+        "has_duration": True,
+        "has_impact": True,
+        "has_enough_context": False
+    }
+    assert history.state.is_diagnostic and history.state.personal_reference
+
+    history.clear()
+    assert history.state.summary()["total_messages"] == 0 and not history.state.hits
+    print("✅ Conversation state updates incrementally")
+
+def test_assessor_reuses_state():
+    """Classifying from the running state matches rescanning the history"""
+    turns = [
+        "Do I have ADHD?",
+        "I am restless and have trouble with concentration",
+        "It started years ago and affects school",
+    ]
+    state = ConversationState()
+    history = TrackedChatMessageHistory()
+    for i, turn in enumerate(turns):
+        question = f"What else should I know? ({i})"
+        assert TieredAssessor.classify(question, turns[:i]) == TieredAssessor.classify(question, state=history.state)
+        history.add_user_message(turn)
+        state.update(history.messages[-1])
+    assert state.hits == history.state.hits
+    print("✅ Assessor decisions match with and without the running state")
+
+if __name__ == "__main__":
+    test_incremental_summary()
+    test_assessor_reuses_state()
@@ -0,0 +1,107 @@
+"""
+Test structure-aware DSM-5 chunking and its savings report (no API keys required)
+"""
+import tempfile
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from dsm5_splitter import DSM5StructureSplitter, chunking_report, print_chunking_report
+from fakes import sample_dsm5_lines, sample_dsm5_pages
+from ingest_pipeline import IngestPipeline
+from local_vector_store import LocalVectorStore
+
+PAGE_1 = """Depressive Disorders
+Major Depressive Disorder
+Diagnostic Criteria 296.2x (F32.x)
+A. Five (or more) of the following symptoms have been present during the same 2-week
+period and represent a change from previous functioning.
+1. Depressed mood most of the day, nearly every day.
+2. Markedly diminished interest or pleasure in all, or almost all, activities.
+3. Insomnia or hypersomnia nearly every day.
+B. The symptoms cause clinically significant distress or impairment.
+C. The episode is not attributable to the physiological effects of a substance.
+Specify if:
+With anxious distress: Presence of at least two of the following symptoms.
+Diagnostic Features
+The essential feature of major depressive disorder is a period of at least 2 weeks.
+161"""
+
+PAGE_2 = """Depressive Disorders
+Major Depressive Disorder
+Individuals may also report irritability, obsessive rumination and excessive worry over physical health.
+Prevalence
+Twelve-month prevalence of major depressive disorder in the United States is approximately 7%.
+Persistent Depressive Disorder
+Diagnostic Criteria 300.4 (F34.1)
+A. Depressed mood for most of the day, for more days than not, for at least 2 years.
+162"""
+
+def test_structure_splitter():
+    """Criteria stay together and every chunk carries its heading path and codes"""
+    splitter = DSM5StructureSplitter(max_chars=400)
+    pages = [Document(page_content=text, metadata={"source": "DSM-5", "page": i + 161})
+             for i, text in enumerate([PAGE_1, PAGE_2])]
+    chunks = [chunk for page in pages for chunk in splitter.split_documents([page])]
+
+    criteria = chunks[0]
+    assert criteria.page_content.startswith("Depressive Disorders\nMajor Depressive Disorder\nDiagnostic Criteria")
+    assert "1. Depressed mood" in criteria.page_content and "3. Insomnia" in criteria.page_content
+    assert criteria.metadata["heading_path"] == "Depressive Disorders > Major Depressive Disorder > Diagnostic Criteria"
+    assert criteria.metadata["disorder"] == "Major Depressive Disorder"
+    assert criteria.metadata["codes"] == ["296.2x", "F32.x"]
+    assert criteria.metadata["criteria"][0] == "A" and criteria.metadata["page"] == 161
+    print("✅ Criterion A stays whole with its numbered items")
+
+    specifier = next(chunk for chunk in chunks if "Specify if:" in chunk.page_content)
+    assert specifier.metadata["section"] == "Diagnostic Criteria"
+    assert not any(chunk.page_content.strip().isdigit() or chunk.page_content.endswith("161") for chunk in chunks)
+    print("✅ Specifiers kept in their section, page numbers dropped")
+
+    # Page 2 continues the disorder from page 1 despite the running header
+    prevalence = next(chunk for chunk in chunks if chunk.metadata["section"] == "Prevalence")
+    assert prevalence.metadata["page"] == 162
+    assert prevalence.metadata["heading_path"] == "Depressive Disorders > Major Depressive Disorder > Prevalence"
+    assert chunks[-1].metadata["disorder"] == "Persistent Depressive Disorder"
+    assert chunks[-1].metadata["codes"] == ["300.4", "F34.1"]
+    assert not any(chunk.page_content.startswith(("Depressive Disorders", "Major Depressive Disorder"))
+                   for chunk in chunks[1:])
+    # Text under the disorder's running head continues the section it left off in
+    continued = next(chunk for chunk in chunks if chunk.page_content.startswith("Individuals may also report"))
+    assert continued.metadata["page"] == 162 and continued.metadata["section"] == "Diagnostic Features"
+    assert continued.metadata["codes"] == ["296.2x", "F32.x"]
+    print("✅ Heading path carried across pages")
+
+def test_chunking_report():
+    """The structured splitter stores and embeds less text than the 1000/200 splitter"""
+    pages = sample_dsm5_pages()
+    report = chunking_report(pages)
+    print_chunking_report(report)
+    assert report["tokens_saved"] > 0
+    assert report["structured"]["chars"] < report["legacy"]["chars"]
+    assert report["structured"]["max_chunk_chars"] <= 1500
+    assert report["stored_overhead_pct"]["legacy"] > 10
+
+    # No text is lost: every content line lands in exactly one chunk
+    splitter = DSM5StructureSplitter()
+    stored = "\n".join(chunk.page_content for chunk in splitter.split_documents(pages))
+    for line in sample_dsm5_lines():
+        assert line in stored, line
+    print("✅ Structured chunks cover the corpus without overlap")
+
+def test_pipeline_with_structure_splitter():
+    """Streaming ingestion splits page by page with heading metadata"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(DeterministicFakeEmbedding(size=16), tmp)
+        splitter = DSM5StructureSplitter()
+        pipeline = IngestPipeline(store, store.embeddings, text_splitter=splitter, verbose=False)
+        report = pipeline.run(sample_dsm5_pages())
+        docs = store.get_by_ids(list(store._id_to_row))
+        assert report["upserted"] == len(docs) > 0
+        paths = {doc.metadata["heading_path"] for doc in docs}
+        assert "Anxiety Disorders > Panic Disorder > Diagnostic Criteria" in paths
+        assert all(doc.metadata["disorder"] for doc in docs if doc.metadata["section"])
+        print(f"✅ {len(docs)} structured chunks ingested across {len(paths)} heading paths")
+
+if __name__ == "__main__":
+    test_structure_splitter()
+    test_chunking_report()
+    test_pipeline_with_structure_splitter()
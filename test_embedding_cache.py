@@ -0,0 +1,79 @@
+"""
+Test the chunk and query embedding caches (no API keys required)
+"""
+import os
+import tempfile
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from embedding_cache import CachedEmbeddings
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Fake embeddings that record how many texts were sent to the 'API'"""
+    calls: int = 0
+    query_calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.query_calls += 1
+        return super().embed_query(text)
+
+def test_embedding_cache():
+    """Re-embedding unchanged chunks should be served from the cache"""
+    chunks = ["criterion A", "criterion B", "criterion C", "criterion A"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "cache.sqlite")
+        underlying = CountingEmbeddings(size=16)
+
+        cached = CachedEmbeddings(underlying, cache_path=cache_path)
+        first = cached.embed_documents(chunks)
+        assert underlying.calls == 3  # duplicate chunk embedded once
+        assert cached.stats()["misses"] == 3
+
+        # Re-run with one changed chunk, through a fresh cache object
+        cached = CachedEmbeddings(underlying, cache_path=cache_path)
+        second = cached.embed_documents(["criterion A", "criterion B", "criterion C (revised)"])
+        assert underlying.calls == 4
+        assert cached.stats() == {"hits": 2, "misses": 1, "hit_rate": 2 / 3}
+        assert second[0] == first[0]
+        print(f"✅ Cache stats after re-run: {cached.stats()}")
+
+        # Different model names don't share entries
+        other = CachedEmbeddings(underlying, cache_path=cache_path, model_name="other-model")
+        other.embed_documents(["criterion A"])
+        assert underlying.calls == 5
+        print("✅ Cache is keyed by model name")
+
+def test_query_cache():
+    """Repeated questions should skip the embedding call until the TTL expires"""
+    now = [0.0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        underlying = CountingEmbeddings(size=16)
+        cached = CachedEmbeddings(underlying, cache_path=os.path.join(tmp, "cache.sqlite"),
+                                  query_cache_size=2, query_cache_ttl=60)
+        cached.query_cache._timer = lambda: now[0]
+
+        cached.embed_query("What are the criteria for MDD?")
+        cached.embed_query("what are the criteria for  MDD")
+        assert underlying.query_calls == 1
+        print("✅ Normalized repeat question served from cache")
+
+        # LRU eviction at maxsize=2
+        cached.embed_query("What is PTSD?")
+        cached.embed_query("What is GAD?")
+        cached.embed_query("What are the criteria for MDD?")
+        assert underlying.query_calls == 4
+        assert cached.query_cache.stats()["evictions"] == 2
+
+        # TTL expiry
+        now[0] = 120.0
+        cached.embed_query("What is GAD?")
+        assert underlying.query_calls == 5
+        print(f"✅ Query cache stats: {cached.query_cache.stats()}")
+
+if __name__ == "__main__":
+    test_embedding_cache()
+    test_query_cache()
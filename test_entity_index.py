@@ -0,0 +1,107 @@
+"""
+Test the disorder/ICD-code entity index and the retriever's entity shortcut (no API keys required)
+"""
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from bm25_index import BM25Index
+from dsm5_splitter import DSM5StructureSplitter
+from entity_index import EntityIndex
+from fakes import SAMPLE_DSM5_TEXTS, build_fake_chatbot, sample_dsm5_pages
+from hybrid_retriever import HybridRetriever
+from ingest_pipeline import IngestPipeline
+from local_vector_store import LocalVectorStore
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Fake embeddings that count query embeddings"""
+    queries: int = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+def test_entity_index():
+    """Names, aliases and codes (exact, x-coded or by category) resolve to chunk ids"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "entities.json")
+        index = EntityIndex(path=path)
+        index.add([f"row-{i}" for i in range(len(SAMPLE_DSM5_TEXTS))],
+                  [Document(page_content=text) for text in SAMPLE_DSM5_TEXTS])
+        assert len(index) == len(SAMPLE_DSM5_TEXTS)
+
+        assert index.resolve("What are the criteria for F43.10?") == ["row-4"]
+        assert index.resolve("Does ADHD start in childhood?") == ["row-2"]
+        assert index.resolve("posttraumatic stress disorder in adults") == ["row-4"]
+        assert index.resolve("296.23 vs bipolar 1") == ["row-0", "row-3"]
+        assert index.resolve("code f32.1") == ["row-0"]
+        assert index.resolve("I have been feeling sad lately") == []
+        print("✅ Disorder names, aliases and codes resolved")
+
+        index.save()
+        reloaded = EntityIndex(path=path)
+        assert reloaded.resolve("GAD") == ["row-1"]
+        reloaded.remove(["row-1"])
+        assert reloaded.resolve("GAD") == []
+        print("✅ Entity index saved, reloaded and updated")
+
+def test_entity_shortcut():
+    """Named disorders are served from their own chunks, small ones without embedding the query"""
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = CountingEmbeddings(size=16)
+        store = LocalVectorStore(embeddings, tmp)
+        lexical, entities = BM25Index(), EntityIndex()
+        pipeline = IngestPipeline(store, embeddings, text_splitter=DSM5StructureSplitter(max_chars=600),
+                                  verbose=False, indexes=[lexical, entities])
+        pipeline.run(sample_dsm5_pages())
+
+        retriever = HybridRetriever(vector_store=store, lexical_index=lexical, entity_index=entities, k=3)
+        docs = retriever.invoke("What are the diagnostic criteria for F43.10?")
+        assert len(docs) == 3
+        assert all(doc.metadata["disorder"] == "Posttraumatic Stress Disorder" for doc in docs)
+        assert docs[0].metadata["section"] == "Diagnostic Criteria"
+        print("✅ Code question prefiltered to the disorder's chunks")
+
+        # A named disorder with at most k chunks is fetched directly
+        embeddings.queries = 0
+        ids = entities.resolve("Narcolepsy")
+        retriever.k = len(ids)
+        docs = retriever.invoke("Narcolepsy")
+        assert {doc.id for doc in docs} == set(ids) and embeddings.queries == 0
+        print("✅ Small entity fetched directly without an embedding call")
+
+        retriever.invoke("how common is excessive worry in adults")
+        stats = retriever.stats()
+        assert stats["queries"] == 3 and stats["entity_shortcuts"] == 2
+        assert stats["shortcut_rate"] == round(2 / 3, 3)
+        print(f"✅ Shortcut fired for {stats['shortcut_rate']:.0%} of queries")
+
+        # Vector mode never consults BM25, shortcut included
+        retriever.mode, retriever.k = "vector", 3
+        lexical.search = lexical.get = None
+        docs = retriever.invoke("What are the diagnostic criteria for F43.10?")
+        assert all(doc.metadata["disorder"] == "Posttraumatic Stress Disorder" for doc in docs)
+        narcolepsy = retriever.invoke("Narcolepsy")
+        assert len(narcolepsy) == 3 and all(doc.metadata["disorder"] == "Narcolepsy" for doc in narcolepsy)
+
+        # Counters stay exact under concurrent queries
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(retriever.invoke, ["Narcolepsy"] * 64))
+        stats = retriever.stats()
+        assert stats["queries"] == 5 + 64 and stats["entity_shortcuts"] == 4 + 64
+        print("✅ Vector-mode shortcut skips BM25; counters exact across threads")
+
+def test_chatbot_entity_shortcut():
+    """The chatbot's retriever uses the entity index built during ingestion"""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot = build_fake_chatbot(tmp)
+        response = chatbot.chat("What does the DSM-5 say about OCD?")
+        assert response["sources"][0].page_content.startswith("Obsessive-Compulsive Disorder")
+        assert chatbot.retriever.stats()["entity_shortcuts"] == 1
+        print("✅ Chatbot answered from the entity shortcut")
+
+if __name__ == "__main__":
+    test_entity_index()
+    test_entity_shortcut()
+    test_chatbot_entity_shortcut()
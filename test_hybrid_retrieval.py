@@ -0,0 +1,133 @@
+"""
+Test the BM25 index, reciprocal rank fusion and the hybrid retriever (no API keys required)
+"""
+import json
+import os
+import tempfile
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from agent_tools import RetrieveDSM5InfoTool
+from bm25_index import BM25Index, tokenize
+from fakes import SAMPLE_DSM5_TEXTS, build_fake_chatbot
+from hybrid_retriever import HybridRetriever, reciprocal_rank_fusion
+from ingest_manifest import ChunkManifest
+from ingest_pipeline import IngestPipeline
+from local_vector_store import LocalVectorStore
+
+class SwitchableEmbeddings(DeterministicFakeEmbedding):
+    """Fake embeddings whose API can be taken down"""
+    down: bool = False
+
+    def embed_query(self, text):
+        if self.down:
+            raise ConnectionError("embedding API unavailable")
+        return super().embed_query(text)
+
+def sample_documents():
+    return [Document(page_content=text, metadata={"source": "DSM-5", "page": i + 1})
+            for i, text in enumerate(SAMPLE_DSM5_TEXTS)]
+
+def test_bm25_index():
+    """Exact terms and diagnostic codes rank the right chunk first; the index persists"""
+    assert tokenize("Major Depressive Disorder (F32.1), 296.23") == [
+        "major", "depressive", "disorder", "f32.1", "f32", "296.23", "296"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bm25.json")
+        docs = sample_documents()
+        index = BM25Index(path=path)
+        index.add([f"row-{i}" for i in range(len(docs))], docs)
+
+        top, _ = index.search("F32.1", k=1)[0]
+        assert top.page_content.startswith("Major Depressive Disorder")
+        top, _ = index.search("PTSD code 309.81 intrusion symptoms", k=1)[0]
+        assert top.page_content.startswith("Posttraumatic Stress Disorder")
+        assert top.id == "row-4" and top.metadata["page"] == 5
+        assert index.search("zzz unknown", k=3) == []
+        print("✅ BM25 ranks exact-term and code matches first")
+
+        index.save()
+        reloaded = BM25Index(path=path)
+        assert len(reloaded) == len(docs)
+        assert reloaded.search("panic attacks", k=1)[0][0].id == "row-5"
+        reloaded.remove(["row-5"])
+        assert all(doc.id != "row-5" for doc, _ in reloaded.search("panic attacks", k=8))
+        print("✅ Index saved, reloaded and updated")
+
+def test_ingest_updates_lexical_index():
+    """Ingestion fills the index, rebuilds it from skipped chunks and prunes stale ones"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(DeterministicFakeEmbedding(size=16), os.path.join(tmp, "store"))
+        manifest = ChunkManifest(os.path.join(tmp, "manifest.sqlite"))
+        path = os.path.join(tmp, "bm25.json")
+
+        def ingest(docs, index):
+            pipeline = IngestPipeline(store, store.embeddings, batch_size=3, verbose=False,
+                                      manifest=manifest, indexes=[index])
+            return pipeline.run(docs)
+
+        ingest(sample_documents(), BM25Index(path=path))
+        index = BM25Index(path=path)
+        assert len(index) == len(store) == len(SAMPLE_DSM5_TEXTS)
+        assert set(index._docs) == set(store._id_to_row)
+        print("✅ Index written alongside the vector store")
+
+        # A lost index is rebuilt from unchanged chunks without re-embedding
+        os.remove(path)
+        report = ingest(sample_documents(), BM25Index(path=path))
+        assert report["upserted"] == 0 and len(BM25Index(path=path)) == len(SAMPLE_DSM5_TEXTS)
+        print("✅ Index rebuilt from skipped chunks")
+
+        ingest(sample_documents()[:5], BM25Index(path=path))
+        index = BM25Index(path=path)
+        assert len(index) == len(store) == 5
+        print("✅ Stale chunks pruned from the index")
+
+def test_hybrid_retriever():
+    """RRF favours chunks both sides agree on; lexical results survive an embedding outage"""
+    a, b, c = (Document(page_content=text) for text in ("a", "b", "c"))
+    fused = reciprocal_rank_fusion([[a, b, c], [b, c]], k=3)
+    assert [doc.page_content for doc in fused] == ["b", "c", "a"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = SwitchableEmbeddings(size=16)
+        store = LocalVectorStore(embeddings, tmp)
+        index = BM25Index()
+        IngestPipeline(store, embeddings, verbose=False, indexes=[index]).run(sample_documents())
+
+        retriever = HybridRetriever(vector_store=store, lexical_index=index, k=3)
+        docs = retriever.invoke("criteria for F41.1 excessive worry")
+        assert len(docs) == 3 and docs[0].page_content.startswith("Generalized Anxiety Disorder")
+        print("✅ Hybrid retrieval returns the exact-code match first")
+
+        embeddings.down = True
+        docs = retriever.invoke("obsessions and compulsions")
+        assert docs[0].page_content.startswith("Obsessive-Compulsive Disorder")
+        assert retriever.vector_failures == 1
+        print("✅ Embedding outage falls back to lexical retrieval")
+
+        tool = RetrieveDSM5InfoTool(store, retriever=retriever)
+        result = json.loads(tool._run("insomnia", ["3 nights per week"]))
+        assert result["retrieved_documents"][0]["content"].startswith("Insomnia Disorder")
+        print("✅ Retrieval tool uses the hybrid retriever")
+
+def test_chatbot_answers_without_embeddings():
+    """The chatbot still answers from lexical results when the embedding API is down"""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot = build_fake_chatbot(tmp, heuristic_assessment=True)
+        assert len(chatbot.lexical_index) == len(SAMPLE_DSM5_TEXTS)
+
+        def unavailable(*args, **kwargs):
+            raise ConnectionError("embedding API unavailable")
+        chatbot.db.embeddings.embed_query = unavailable
+
+        response = chatbot.chat("What are the DSM-5 criteria for panic disorder?")
+        assert response["assessment"] == "PROVIDE_INFO"
+        assert response["sources"][0].page_content.startswith("Panic Disorder")
+        print("✅ Chatbot answered from lexical retrieval")
+
+if __name__ == "__main__":
+    test_bm25_index()
+    test_ingest_updates_lexical_index()
+    test_hybrid_retriever()
+    test_chatbot_answers_without_embeddings()
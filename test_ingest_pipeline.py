@@ -0,0 +1,113 @@
+"""
+Test the streaming ingest pipeline end to end (no API keys required)
+"""
+import os
+import tempfile
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from ingest_manifest import ChunkManifest
+from ingest_pipeline import IngestPipeline
+from local_vector_store import LocalVectorStore
+from pdf_extraction import iter_pdf_pages
+from test_pdf_extraction import write_text_pdf
+
+class FlakyEmbeddings(DeterministicFakeEmbedding):
+    """Fails the embedding call for any batch containing the word 'flaky'"""
+    healthy: bool = False
+
+    def embed_documents(self, texts):
+        if not self.healthy and any("flaky" in text for text in texts):
+            raise RuntimeError("rate limited")
+        return super().embed_documents(texts)
+
+def test_ingest_pipeline():
+    """Pages stream through split/embed/upsert and every chunk lands in the store"""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=40, chunk_overlap=0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "sample.pdf")
+        write_text_pdf(pdf_path, [f"Page {i} criterion A depressed mood criterion B anhedonia" for i in range(30)])
+
+        store = LocalVectorStore(DeterministicFakeEmbedding(size=16), os.path.join(tmp, "store"))
+        pipeline = IngestPipeline(store, store.embeddings, text_splitter=splitter, batch_size=7,
+                                  queue_size=2, metadata={"source": "DSM-5"}, verbose=False)
+        report = pipeline.run(iter_pdf_pages(pdf_path, max_workers=2, pages_per_task=4))
+
+        assert report["pages"] == 30
+        assert report["chunks"] == report["upserted"] == len(store)
+        assert report["failed_batches"] == 0
+        chunk_ids = sorted(doc.metadata["chunk_id"] for doc in store.get_by_ids(list(store._id_to_row)))
+        assert chunk_ids == list(range(report["chunks"]))
+        IngestPipeline.print_report(report)
+        print("✅ All chunks ingested with bounded queues")
+
+def test_ingest_pipeline_failures():
+    """A failed embedding batch is skipped; a parse error aborts the run"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(FlakyEmbeddings(size=16), tmp)
+        chunks = [Document(page_content=f"chunk {i}") for i in range(10)]
+        chunks[4] = Document(page_content="flaky chunk")
+
+        pipeline = IngestPipeline(store, store.embeddings, batch_size=3, verbose=False)
+        report = pipeline.run(chunks)
+        assert report["failed_batches"] == 1
+        assert report["upserted"] == 7
+        print("✅ Failed batch skipped, remaining batches uploaded")
+
+        def broken_pages():
+            yield Document(page_content="page 1")
+            raise ValueError("corrupt PDF")
+
+        pipeline = IngestPipeline(store, store.embeddings, verbose=False)
+        try:
+            pipeline.run(broken_pages())
+            assert False, "expected the parse error to propagate"
+        except ValueError as e:
+            assert "corrupt PDF" in str(e)
+        print("✅ Parse errors abort the pipeline")
+
+def test_resumable_ingestion():
+    """Re-runs skip stored chunks, retry failed batches and prune stale ones"""
+    def corpus(handout_text):
+        docs = [Document(page_content=f"DSM-5 chunk {i}", metadata={"source": "DSM-5"}) for i in range(9)]
+        docs[4] = Document(page_content="flaky DSM-5 chunk", metadata={"source": "DSM-5"})
+        docs += [Document(page_content=text, metadata={"source": "handout.pdf"}) for text in handout_text]
+        return docs
+
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = FlakyEmbeddings(size=16)
+        store = LocalVectorStore(embeddings, os.path.join(tmp, "store"))
+        manifest = ChunkManifest(os.path.join(tmp, "manifest.sqlite"))
+
+        def ingest(docs):
+            pipeline = IngestPipeline(store, embeddings, batch_size=3, manifest=manifest, verbose=False)
+            return pipeline.run(docs)
+
+        # First run: the batch with the flaky chunk fails
+        report = ingest(corpus(["handout 1", "handout 2"]))
+        assert report["failed_batches"] == 1 and len(store) == 8
+        assert manifest.counts() == {"done": 8, "failed": 3}
+
+        # Resume: only the failed batch is retried, nothing is duplicated
+        embeddings.healthy = True
+        report = ingest(corpus(["handout 1", "handout 2"]))
+        assert report["upserted"] == 3 and report["skipped_unchanged"] == 8
+        assert len(store) == 11
+        print("✅ Resume retried only the failed batch")
+
+        # Unchanged corpus is a no-op
+        report = ingest(corpus(["handout 1", "handout 2"]))
+        assert report["upserted"] == 0 and report["skipped_unchanged"] == 11
+        print("✅ Re-ingesting an unchanged corpus is a no-op")
+
+        # Editing the handout touches only its chunks and drops the removed one
+        report = ingest(corpus(["handout 1 (revised)"]))
+        assert report["upserted"] == 1 and report["deleted_stale"] == 1
+        assert len(store) == 10
+        print("✅ Changed document re-uploaded, stale chunk deleted")
+
+if __name__ == "__main__":
+    test_ingest_pipeline()
+    test_ingest_pipeline_failures()
+    test_resumable_ingestion()
@@ -0,0 +1,40 @@
+"""
+Test the single-pass keyword matcher used by the assessment heuristics
+"""
+from agent_tools import INDICATOR_MATCHER, score_information_need
+from keyword_matcher import KeywordMatcher
+
+def test_keyword_matcher():
+    """Word boundaries, prefix credit, multi-word phrases and context windows"""
+    matcher = KeywordMatcher({
+        "symptom": ["feel", "feeling", "can't sleep"],
+        "duration": ["for", "weeks"],
+    }, whole_word=["duration"], window=2)
+
+    hits = matcher.scan("Lately I keep feeling tired and can't  sleep for weeks, unfeeling")
+    assert matcher.found(hits, "symptom") == ["feel", "feeling", "can't sleep"]
+    assert matcher.found(hits, "duration") == ["for", "weeks"]
+    assert hits["feeling"] == "i keep feeling tired and"
+
+    # "for" must be a whole word; "feel" must start a word
+    assert matcher.scan("Information about the format of unfeeling") == {}
+
+    merged = matcher.scan_all(["nothing here", "I feel fine", "feeling low for weeks"])
+    assert merged["feel"] == "i feel fine"
+    print("✅ Keyword matcher finds all indicators in one pass")
+
+def test_shared_with_scoring():
+    """The shared matcher drives score_information_need and memoizes per message"""
+    history = ["My mood has been low for months", "It affects my work"]
+    score = score_information_need("Do I have depression?", history)
+    assert score["is_diagnostic"] and score["has_duration"] and score["has_impact"]
+    assert score["details_count"] == 2  # mood, depression
+
+    hits_before = INDICATOR_MATCHER.scan.cache_info().hits
+    score_information_need("Do I have depression?", history)
+    assert INDICATOR_MATCHER.scan.cache_info().hits >= hits_before + 3
+    print("✅ Repeated history scans are served from the memo")
+
+if __name__ == "__main__":
+    test_keyword_matcher()
+    test_shared_with_scoring()
@@ -0,0 +1,69 @@
+"""
+Test the embedded local vector store backend (no API keys required)
+"""
+import tempfile
+import time
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from local_vector_store import LocalVectorStore
+
+def test_local_vector_store():
+    """Test add/search/upsert/delete and reloading from disk"""
+    embeddings = DeterministicFakeEmbedding(size=64)
+    texts = [
+        "Major Depressive Disorder diagnostic criteria",
+        "Generalized Anxiety Disorder diagnostic criteria",
+        "Attention-Deficit/Hyperactivity Disorder symptoms",
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print("🧪 Adding documents...")
+        store = LocalVectorStore(embedding=embeddings, persist_directory=tmp)
+        ids = store.add_texts(texts, metadatas=[{"page": i + 1} for i in range(len(texts))], ids=["a", "b", "c"])
+        assert ids == ["a", "b", "c"]
+        assert len(store) == 3
+
+        # Exact match should be the top hit with cosine similarity ~1
+        results = store.similarity_search_with_score(texts[1], k=2)
+        assert results[0][0].page_content == texts[1]
+        assert abs(results[0][1] - 1.0) < 1e-5
+        print("✅ Exact cosine top-k returns the matching chunk")
+
+        # Retriever interface works unchanged
+        retriever = store.as_retriever(search_kwargs={"k": 5})
+        docs = retriever.invoke(texts[2])
+        assert len(docs) == 3 and docs[0].metadata["page"] == 3
+        print("✅ as_retriever works")
+
+        # Upsert by id overwrites in place, delete tombstones
+        store.add_texts(["Posttraumatic Stress Disorder"], ids=["a"])
+        store.delete(["b"])
+        assert len(store) == 2
+        assert store.get_by_ids(["a"])[0].page_content == "Posttraumatic Stress Disorder"
+
+        # Reload from disk
+        reloaded = LocalVectorStore(embedding=embeddings, persist_directory=tmp)
+        assert len(reloaded) == 2
+        top = reloaded.similarity_search("Posttraumatic Stress Disorder", k=1)[0]
+        assert top.page_content == "Posttraumatic Stress Disorder"
+        print("✅ Upsert, delete and reload from disk work")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Search cost on a DSM-5 sized corpus (a few thousand 1536-dim chunks)
+        store = LocalVectorStore(embedding=DeterministicFakeEmbedding(size=1536), persist_directory=tmp)
+        import numpy as np
+        from langchain_core.documents import Document
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((3000, 1536)).astype(np.float32)
+        store.add_vectors(vectors, [Document(page_content=str(i)) for i in range(3000)])
+
+        query = vectors[42]
+        store.similarity_search_by_vector(query, k=5)
+        start = time.perf_counter()
+        for _ in range(100):
+            top = store.similarity_search_by_vector(query, k=5)
+        elapsed_ms = (time.perf_counter() - start) * 10
+        assert top[0].page_content == "42"
+        print(f"⏱️ Top-5 search over 3000 chunks: {elapsed_ms:.3f} ms")
+
+if __name__ == "__main__":
+    test_local_vector_store()
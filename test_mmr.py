@@ -0,0 +1,89 @@
+"""
+Test MMR diversification in the vector store, the hybrid retriever and the agent tool (no API keys required)
+"""
+import json
+import tempfile
+from langchain_core.documents import Document
+from agent_tools import RetrieveDSM5InfoTool
+from bm25_index import BM25Index
+from fakes import SAMPLE_DSM5_TEXTS, BagOfWordsEmbeddings
+from hybrid_retriever import HybridRetriever
+from ingest_pipeline import IngestPipeline
+from local_vector_store import LocalVectorStore
+from mmr import maximal_marginal_relevance
+
+def repeated_documents():
+    """The depression criteria repeated on three consecutive pages, then the other disorders"""
+    criteria = SAMPLE_DSM5_TEXTS[0]
+    docs = [Document(page_content=criteria + suffix, metadata={"source": "DSM-5", "page": 10 + i})
+            for i, suffix in enumerate(["", " (continued)", " See also Table 3."])]
+    return docs + [Document(page_content=text, metadata={"source": "DSM-5", "page": 20 + i})
+                   for i, text in enumerate(SAMPLE_DSM5_TEXTS[1:])]
+
+def is_depression(doc):
+    return doc.page_content.startswith(SAMPLE_DSM5_TEXTS[0][:40])
+
+def test_maximal_marginal_relevance():
+    """MMR skips near-duplicates of earlier picks; lambda 1 keeps the relevance order"""
+    query = [1.0, 0.0, 0.0]
+    candidates = [[1.0, 0.1, 0.0], [1.0, 0.12, 0.0], [0.6, 0.0, 0.8], [0.0, 1.0, 0.0]]
+    assert maximal_marginal_relevance(query, candidates, k=2, lambda_mult=0.5) == [0, 2]
+    assert maximal_marginal_relevance(query, candidates, k=3, lambda_mult=1.0) == [0, 1, 2]
+    assert len(maximal_marginal_relevance(query, candidates, k=10)) == 4
+    assert maximal_marginal_relevance(query, [], k=3) == []
+    # Given relevance scores replace the query similarity
+    assert maximal_marginal_relevance(None, candidates, k=1, relevance=[0.1, 0.2, 0.9, 0.3]) == [2]
+    print("✅ MMR picks relevant but diverse candidates")
+
+def test_vector_store_and_tool_mmr():
+    """The local store's MMR search and the agent tool return one copy of repeated criteria"""
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = BagOfWordsEmbeddings()
+        store = LocalVectorStore(embeddings, tmp)
+        IngestPipeline(store, embeddings, verbose=False).run(repeated_documents())
+        query = "major depressive disorder symptoms: depressed mood, diminished interest, weight loss, insomnia"
+
+        plain = store.similarity_search(query, k=3)
+        assert sum(map(is_depression, plain)) == 3
+        diverse = store.max_marginal_relevance_search(query, k=3, fetch_k=10, lambda_mult=0.5)
+        assert is_depression(diverse[0]) and sum(map(is_depression, diverse)) == 1
+        print("✅ Vector store MMR keeps one of three repeated chunks")
+
+        candidates = store.similarity_search_by_vector_returning_embeddings(embeddings.embed_query(query), 4)
+        assert len(candidates) == 4 and candidates[0][2].shape == (256,)
+
+        result = json.loads(RetrieveDSM5InfoTool(store, k=3, mmr_lambda=0.5)._run(query, []))
+        pages = [doc["metadata"]["page"] for doc in result["retrieved_documents"]]
+        assert len(pages) == 3 and len([page for page in pages if page < 20]) == 1
+        result = json.loads(RetrieveDSM5InfoTool(store, k=3, mmr_lambda=None)._run(query, []))
+        assert all(doc["metadata"]["page"] < 20 for doc in result["retrieved_documents"])
+        print("✅ Agent tool diversifies its vector search")
+
+def test_hybrid_retriever_mmr():
+    """Fused hybrid candidates are diversified; lexical mode reuses stored vectors"""
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = BagOfWordsEmbeddings()
+        store = LocalVectorStore(embeddings, tmp)
+        lexical = BM25Index()
+        IngestPipeline(store, embeddings, verbose=False, indexes=[lexical]).run(repeated_documents())
+        query = "major depressive disorder symptoms: depressed mood, diminished interest, weight loss, insomnia"
+
+        retriever = HybridRetriever(vector_store=store, lexical_index=lexical, k=3)
+        assert sum(map(is_depression, retriever.invoke(query))) == 3
+
+        retriever = HybridRetriever(vector_store=store, lexical_index=lexical, k=3, mmr=True, mmr_lambda=0.5)
+        docs = retriever.invoke(query)
+        assert is_depression(docs[0]) and sum(map(is_depression, docs)) == 1
+        assert retriever.stats()["mmr"]
+        print("✅ Hybrid retrieval with MMR fills the slots with distinct chunks")
+
+        embeddings.queries = 0
+        retriever.mode = "lexical"
+        docs = retriever.invoke(query)
+        assert sum(map(is_depression, docs)) == 1 and embeddings.queries == 0
+        print("✅ Lexical MMR uses stored vectors without an embedding call")
+
+if __name__ == "__main__":
+    test_maximal_marginal_relevance()
+    test_vector_store_and_tool_mmr()
+    test_hybrid_retriever_mmr()
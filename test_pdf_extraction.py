@@ -0,0 +1,59 @@
+"""
+Test that parallel PDF extraction matches the serial PyPDFLoader output
+"""
+import os
+import tempfile
+from langchain_community.document_loaders import PyPDFLoader
+from pdf_extraction import load_pdf_pages, page_ranges
+
+def write_text_pdf(path, pages):
+    """Write a minimal PDF with one line of Helvetica text per page"""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # pages tree, filled in below
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+def test_pdf_extraction():
+    """Parallel extraction should reproduce the serial loader exactly"""
+    assert page_ranges(10, 2) == [(0, 2), (2, 4), (4, 6), (6, 8), (8, 10)]
+    assert page_ranges(0, 4) == []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "sample.pdf")
+        write_text_pdf(pdf_path, [f"Criterion {i}: depressed mood most of the day" for i in range(23)])
+
+        serial = PyPDFLoader(pdf_path).load()
+        parallel = load_pdf_pages(pdf_path, max_workers=3)
+
+        assert len(serial) == 23
+        assert [d.page_content for d in parallel] == [d.page_content for d in serial]
+        assert [d.metadata for d in parallel] == [d.metadata for d in serial]
+        assert "Criterion 7" in parallel[7].page_content
+        print(f"✅ Parallel extraction matches serial loader on {len(serial)} pages")
+
+if __name__ == "__main__":
+    test_pdf_extraction()
@@ -0,0 +1,80 @@
+"""
+Test the adaptive rate-limited embedding uploader against a local fake embedding server
+"""
+import os
+import tempfile
+import openai
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from fakes import FakeEmbeddingServer
+from ingest_pipeline import IngestPipeline
+from local_vector_store import LocalVectorStore
+from rate_limiter import RateLimitedEmbeddings, TokenBucket
+
+class OpenAIClientEmbeddings(Embeddings):
+    """One batched /v1/embeddings request per call through the real OpenAI client"""
+
+    def __init__(self, base_url):
+        self.client = openai.OpenAI(base_url=base_url, api_key="test", max_retries=0)
+
+    def embed_documents(self, texts):
+        response = self.client.embeddings.create(input=texts, model="text-embedding-ada-002",
+                                                 encoding_format="float")
+        return [item.embedding for item in response.data]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+def test_token_bucket():
+    """Bucket refills continuously and blocks callers until tokens are available"""
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=60, period=60.0, timer=lambda: now[0], sleep=sleep)
+    assert bucket.acquire(60) == 0.0
+    waited = bucket.acquire(30)
+    assert abs(waited - 30.0) < 1e-6
+    print("✅ Token bucket throttles to the configured rate")
+
+def _run_upload(server, limiter_kwargs, chunks=300):
+    embeddings = OpenAIClientEmbeddings(server.base_url)
+    limiter = RateLimitedEmbeddings(embeddings, **limiter_kwargs)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(limiter, tmp)
+        docs = [Document(page_content=f"DSM-5 chunk {i} " * 5, metadata={"source": "DSM-5"}) for i in range(chunks)]
+        pipeline = IngestPipeline(store, limiter, batch_size=16, rate_limiter=limiter, verbose=False)
+        report = pipeline.run(docs)
+        assert len(store) == chunks
+    return report, limiter
+
+def test_adaptive_backoff():
+    """429s from the server shrink batches and back off; all chunks still land"""
+    with FakeEmbeddingServer(requests_per_window=4, window=0.25, max_inputs=64, dimensions=16) as server:
+        report, limiter = _run_upload(server, dict(
+            requests_per_minute=100_000, max_batch_size=64, initial_batch_size=8,
+            initial_concurrency=4, base_backoff=0.05, grow_after=2
+        ))
+        assert report["upserted"] == 300 and report["failed_batches"] == 0
+        assert server.rejected > 0 and limiter.rate_limited > 0
+        assert server.max_batch_seen <= 64
+        assert server.max_batch_seen > 8  # batch size grew past its initial value
+        print(f"✅ Recovered from {server.rejected} 429s: {report['rate_limiter']}")
+
+def test_client_side_limits():
+    """With client budgets under the server's limit, no requests are rejected"""
+    with FakeEmbeddingServer(requests_per_window=4, window=0.25, max_inputs=64, dimensions=16) as server:
+        report, limiter = _run_upload(server, dict(
+            # A full bucket plus one period of refill stays under 4 requests per 0.25s
+            requests_per_minute=2, period=0.3, max_batch_size=64, initial_batch_size=32,
+            initial_concurrency=4
+        ), chunks=200)
+        assert server.rejected == 0
+        print(f"✅ Token buckets kept under the server limit: {report['rate_limiter']}")
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_adaptive_backoff()
+    test_client_side_limits()
@@ -0,0 +1,81 @@
+"""
+Test the bounded session store and its SQLite write-through
+"""
+import os
+import sqlite3
+import tempfile
+from fakes import build_fake_chatbot
+from session_store import SessionStore
+
+def test_eviction_and_caps():
+    """LRU eviction, idle TTL and the per-session message cap"""
+    now = [0.0]
+    store = SessionStore(max_sessions=2, ttl=60, max_messages=4, timer=lambda: now[0])
+
+    store.get("a").add_user_message("hello")
+    store.get("b")
+    store.get("a")          # a is now most recently used
+    store.get("c")          # evicts b
+    assert "b" not in store and "a" in store and len(store) == 2
+
+    history = store.get("a")
+    for i in range(10):
+        history.add_user_message(f"message {i}")
+    assert len(history.messages) == 4 and history.messages[0].content == "message 6"
+    assert history.state.user_messages == 11  # analytics still count every message
+    assert 0 < history.approx_bytes < 4 * 300
+
+    now[0] = 30
+    store.get("a")          # refreshes a's idle timer
+    now[0] = 70
+    assert "c" not in store and "a" in store
+    store.get("d")          # new sessions purge idle ones
+
+    stats = store.stats()
+    assert stats["evictions"] == 1 and stats["expirations"] == 1
+    assert stats["sessions"] == 2 and stats["messages"] == 4
+    print(f"✅ Session store bounded: {stats}")
+
+def test_sqlite_write_through():
+    """Messages are appended to SQLite and sessions survive a restart"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.sqlite")
+        store = SessionStore(max_messages=3, persist_path=path)
+        history = store.get("clinician-1")
+        for i in range(5):
+            history.add_user_message(f"question {i}")
+            history.add_ai_message(f"answer {i}")
+
+        # Append-only log keeps every message even though memory holds 3
+        rows = sqlite3.connect(path).execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        assert rows == 10
+
+        restarted = SessionStore(max_messages=3, persist_path=path)
+        restored = restarted.get("clinician-1")
+        assert [m.content for m in restored.messages] == ["answer 3", "question 4", "answer 4"]
+        assert restored.messages[1].type == "human"
+        assert restarted.stats()["restored"] == 1
+
+        assert SessionStore(persist_path=path).exists("clinician-1") and not restarted.exists("clinician-2")
+        restarted.delete("clinician-1")
+        assert restarted.get("clinician-1").messages == []
+        print("✅ Sessions persisted append-only and restored after restart")
+
+def test_chat_counts_turns():
+    """Store hits and misses count turns served from memory vs new sessions, not internal lookups"""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot = build_fake_chatbot(tmp)
+        chatbot.chat("What are the DSM-5 criteria for major depressive disorder?", "clinician-1")
+        chatbot.chat("Do I have depression?", "clinician-2")
+        stats = chatbot.store.stats()
+        assert stats["hits"] == 0 and stats["misses"] == 2 and stats["created"] == 2
+
+        chatbot.chat("How long must those symptoms last?", "clinician-1")
+        stats = chatbot.store.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 2
+        print(f"✅ One store lookup per turn: {stats['hits']} hit, {stats['misses']} misses")
+
+if __name__ == "__main__":
+    test_eviction_and_caps()
+    test_sqlite_write_through()
+    test_chat_counts_turns()
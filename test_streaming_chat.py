@@ -0,0 +1,67 @@
+"""
+Test token streaming from chat_stream / achat_stream (no API keys required)
+"""
+import asyncio
+import tempfile
+from fakes import FakeChatModel, build_fake_chatbot
+
+ANSWER = "Major depressive disorder requires five or more of nine symptoms during the same two-week period."
+
+def _chatbot(tmp, token_latency=0.0):
+    llm = FakeChatModel(rules=[("clarifying questions", "How long have you felt this way?")],
+                        default=ANSWER, token_latency=token_latency)
+    return build_fake_chatbot(tmp, texts=["Major depressive disorder criteria A1-A9"], embedding_size=32, llm=llm)
+
+def test_chat_stream():
+    """Events arrive in order and history is recorded when the answer completes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot = _chatbot(tmp)
+        question = "What are the criteria for major depressive disorder?"
+        events = chatbot.chat_stream(question, "s1")
+
+        assert next(events) == {"type": "assessment", "assessment": "PROVIDE_INFO"}
+        sources = next(events)
+        assert sources["type"] == "sources" and sources["sources"]
+
+        tokens = []
+        for event in events:
+            if event["type"] == "token":
+                tokens.append(event["content"])
+                assert chatbot.get_session_history("s1").messages == []
+            else:
+                response = event["response"]
+        assert len(tokens) > 1 and "".join(tokens) == response["answer"] == ANSWER
+        assert [m.content for m in chatbot.get_session_history("s1").messages] == [question, ANSWER]
+        assert response["sources"] == sources["sources"]
+        print(f"✅ Streamed {len(tokens)} tokens: {response['timings']}")
+
+def test_stream_closed_early():
+    """Stopping mid-answer records the partial answer the user saw"""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot = _chatbot(tmp)
+        events = chatbot.chat_stream("Do I have depression?", "s1")
+        assert next(events)["assessment"] == "ASK_CLARIFYING"
+        assert next(events) == {"type": "token", "content": "How "}
+        events.close()
+        assert [m.content for m in chatbot.get_session_history("s1").messages] == ["Do I have depression?", "How "]
+        print("✅ Partial answer recorded on early close")
+
+def test_achat_stream_first_token():
+    """The first token arrives well before the full answer"""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot = _chatbot(tmp, token_latency=0.01)
+
+        async def run():
+            return [event async for event in chatbot.achat_stream("What is bipolar disorder?", "s1")]
+
+        events = asyncio.run(run())
+        assert [e["type"] for e in events[:2]] == ["assessment", "sources"]
+        timings = events[-1]["response"]["timings"]
+        assert timings["first_token"] < timings["total"] / 2
+        assert len(chatbot.get_session_history("s1").messages) == 2
+        print(f"✅ Time to first token {timings['first_token']:.3f}s of {timings['total']:.3f}s")
+
+if __name__ == "__main__":
+    test_chat_stream()
+    test_stream_closed_early()
+    test_achat_stream_first_token()
@@ -0,0 +1,69 @@
+"""
+Test the tiered assessor: keyword fast path with LLM escalation (no API keys required)
+"""
+import os
+import tempfile
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from database import SupabaseDB
+from fakes import FakeChatModel
+from rag_chatbot import DSM5Chatbot
+from tiered_assessor import TieredAssessor, agreement_report
+
+def test_heuristic_tier():
+    """Clear-cut questions are decided without the LLM; ambiguous ones escalate"""
+    classify = TieredAssessor.classify
+    assert classify("What are the DSM-5 criteria for major depressive disorder?", []) == "PROVIDE_INFO"
+    assert classify("Do I have depression?", []) == "ASK_CLARIFYING"
+    assert classify(
+        "Do I have ADHD? I feel restless, have trouble with concentration and low energy for months at work", []
+    ) == "PROVIDE_INFO"
+    # Personal but not phrased as a diagnosis question
+    assert classify("I've been feeling down lately", []) is None
+    # Diagnostic follow-up with partial detail
+    assert classify("It has been going on for weeks", ["Do I have depression? My mood is low"]) is None
+    print("✅ Heuristic tier decides only clear-cut cases")
+
+def test_chat_skips_llm_assessment():
+    """General questions skip the assessment call; tier counters track both paths"""
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as env:
+        env.setenv("LOCAL_VECTOR_STORE_PATH", os.path.join(tmp, "store"))
+        env.setenv("EMBEDDING_CACHE_PATH", os.path.join(tmp, "cache.sqlite"))
+        env.setenv("RETRIEVAL_INDEX_DIR", os.path.join(tmp, "retrieval_index"))
+        env.setenv("INGEST_MANIFEST_PATH", os.path.join(tmp, "manifest.sqlite"))
+        db = SupabaseDB(backend="local", embeddings=DeterministicFakeEmbedding(size=32))
+        db.get_vector_store().add_texts(["Major depressive disorder criteria A1-A9"])
+        llm = FakeChatModel(rules=[("You are a diagnostic assessment agent", "PROVIDE_CAUTIOUS")],
+                            default="MDD requires five of nine symptoms...")
+        chatbot = DSM5Chatbot(db=db, llm=llm)
+
+        response = chatbot.chat("What are the DSM-5 criteria for major depressive disorder?", "s1")
+        assert response["assessment"] == "PROVIDE_INFO"
+        assert llm.calls == 1  # generation only
+
+        response = chatbot.chat("I've been feeling down lately", "s2")
+        assert response["assessment"] == "PROVIDE_CAUTIOUS"
+        assert llm.calls == 3  # assessment + generation
+
+        stats = chatbot.assessor.stats()
+        assert stats["heuristic"] == 1 and stats["llm"] == 1
+        print(f"✅ Tier counters: {stats}")
+
+def test_agreement_report():
+    """Offline report compares heuristic decisions with LLM labels"""
+    examples = [
+        {"question": "What is bipolar disorder?", "llm_label": "PROVIDE_INFO"},
+        {"question": "Do I have depression?", "llm_label": "ASK_CLARIFYING"},
+        {"question": "Could I have anxiety?", "llm_label": "PROVIDE_CAUTIOUS"},
+        {"question": "I've been feeling down lately", "llm_label": "ASK_CLARIFYING"},
+    ]
+    report = agreement_report(examples)
+    assert report["examples"] == 4 and report["heuristic_decided"] == 3
+    assert abs(report["agreement"] - 2 / 3) < 1e-9
+    assert report["disagreements"][0]["question"] == "Could I have anxiety?"
+    print(f"✅ Agreement report: coverage {report['coverage']:.0%}, agreement {report['agreement']:.0%}")
+
+if __name__ == "__main__":
+    test_heuristic_tier()
+    test_chat_skips_llm_assessment()
+    test_agreement_report()
@@ -0,0 +1,104 @@
+"""
+Test per-stage chat traces, their histograms and JSONL/OTLP export (no API keys required)
+"""
+import asyncio
+import json
+import os
+import tempfile
+from fakes import build_fake_chatbot
+from tracing import ChatTrace, TraceExporter, TraceHistograms
+
+def span_names(response):
+    return [span["name"] for span in response["trace"]["spans"]]
+
+def test_rag_turn_trace():
+    """A follow-up RAG turn traces every stage with tokens and document counts"""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot = build_fake_chatbot(tmp, heuristic_assessment=False)
+        chatbot.chat("What are the symptoms of panic disorder?", "rag")
+        response = chatbot.chat("How long must those symptoms last?", "rag")
+        names = span_names(response)
+        for stage in ("assessment", "contextualize", "embed", "vector_search", "retrieval", "packing", "generation"):
+            assert stage in names, (stage, names)
+
+        spans = {span["name"]: span for span in response["trace"]["spans"]}
+        for stage in ("assessment", "contextualize", "generation"):
+            assert spans[stage]["prompt_tokens"] > 0 and spans[stage]["completion_tokens"] > 0
+        assert spans["retrieval"]["docs"] == len(response["sources"]) > 0
+        assert spans["vector_search"]["docs"] > 0
+        # Retrieval internals fall inside the retrieval span
+        assert spans["retrieval"]["start_ms"] <= spans["embed"]["start_ms"]
+        assert spans["retrieval"]["duration_ms"] >= spans["embed"]["duration_ms"] + spans["vector_search"]["duration_ms"]
+        assert response["trace"]["total_ms"] >= sum(spans[stage]["duration_ms"] for stage in ("retrieval", "generation"))
+        print(f"✅ Traced stages: {names}")
+
+def test_clarifying_and_async_traces():
+    """Clarifying turns trace the heuristic; async turns trace the concurrent retrieval"""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot = build_fake_chatbot(tmp)
+        response = chatbot.chat("Do I have depression?", "clarify")
+        assert response["assessment"] == "ASK_CLARIFYING"
+        assert span_names(response) == ["assessment", "clarifying"]
+        assert response["trace"]["spans"][0]["method"] == "heuristic"
+        print("✅ Clarifying turn traced: heuristic assessment, then clarifying questions")
+
+        chatbot = build_fake_chatbot(tmp, heuristic_assessment=False)
+        response = asyncio.run(chatbot.achat("How long must symptoms last before a diagnosis?", "async"))
+        names = span_names(response)
+        assert {"assessment", "retrieval", "embed", "vector_search", "generation"} <= set(names)
+        print(f"✅ Async turn traced: {names}")
+
+def test_histograms():
+    """Histograms aggregate stage latencies and tokens across turns"""
+    with tempfile.TemporaryDirectory() as tmp:
+        chatbot = build_fake_chatbot(tmp, heuristic_assessment=False)
+        for i in range(3):
+            chatbot.chat("What are the symptoms of panic disorder?", f"session-{i}")
+        stats = chatbot.trace_histograms.stats()
+        assert stats["traces"] == 3 and stats["stages"]["total"]["count"] == 3
+        generation = stats["stages"]["generation"]
+        assert generation["count"] == 3 and generation["completion_tokens"] > 0
+        assert sum(generation["buckets"].values()) == 3
+        assert generation["p50_ms"] <= generation["p95_ms"] <= generation["max_ms"]
+
+    histograms = TraceHistograms(buckets_ms=(10, 100))
+    for ms in (5, 50, 50, 500):
+        trace = ChatTrace()
+        trace.start -= ms / 1000
+        histograms.record(trace.finish())
+    total = histograms.stats()["stages"]["total"]
+    assert total["buckets"] == {"10": 1, "100": 2, "inf": 1}
+    assert total["p50_ms"] == 100 and total["p99_ms"] == total["max_ms"] >= 500
+    print(f"✅ Histograms: generation p50 {generation['p50_ms']} ms over {generation['count']} turns")
+
+def test_export():
+    """Traces export as JSON lines and as OTLP/JSON"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for format in TraceExporter.FORMATS:
+            path = os.path.join(tmp, f"traces.{format}")
+            chatbot = build_fake_chatbot(tmp, heuristic_assessment=False,
+                                         trace_exporter=TraceExporter(path, format=format))
+            first = chatbot.chat("What are the symptoms of panic disorder?", "export")
+            chatbot.chat("Do I have depression?", "export")
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+            assert len(lines) == 2
+
+            if format == "jsonl":
+                assert lines[0]["trace_id"] == first["trace"]["trace_id"]
+                assert lines[0]["session_id"] == "export" and "question" not in lines[0]
+            else:
+                spans = lines[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+                root = spans[0]
+                assert root["name"] == "chat" and root["traceId"] == first["trace"]["trace_id"]
+                assert all(span["parentSpanId"] == root["spanId"] for span in spans[1:])
+                assert all(int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"]) for span in spans)
+                generation = next(span for span in spans if span["name"] == "generation")
+                assert any(attr["key"] == "completion_tokens" for attr in generation["attributes"])
+            print(f"✅ Exported {len(lines)} traces as {format}")
+
+if __name__ == "__main__":
+    test_rag_turn_trace()
+    test_clarifying_and_async_traces()
+    test_histograms()
+    test_export()
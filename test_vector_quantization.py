@@ -0,0 +1,102 @@
+"""
+Test quantized (float16/int8/PQ) search in the local vector store (no API keys required)
+"""
+import os
+import tempfile
+import numpy as np
+from langchain_core.documents import Document
+from dsm5_splitter import DSM5StructureSplitter
+from fakes import BagOfWordsEmbeddings, sample_dsm5_pages
+from ingest_pipeline import IngestPipeline
+from local_vector_store import LocalVectorStore
+from vector_quantization import Int8Vectors, ProductQuantizedVectors, create_quantizer, main, recall_report
+
+def sample_chunks():
+    return DSM5StructureSplitter(max_chars=600).split_documents(sample_dsm5_pages())
+
+def test_codes():
+    """Codes approximate inner products and shrink the in-memory index"""
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 64)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    query = vectors[7]
+    exact = vectors @ query
+    for quantization, tolerance, ratio in (("float16", 1e-3, 2), ("int8", 0.02, 3.5)):
+        codes = create_quantizer(quantization)
+        codes.update(vectors)
+        assert np.abs(codes.scores(query) - exact).max() < tolerance
+        assert vectors.nbytes / codes.nbytes >= ratio
+    print("✅ float16 and int8 codes score within tolerance at 2x/4x less memory")
+
+    pq = ProductQuantizedVectors(subspaces=8)
+    pq.update(vectors)
+    assert pq.codes.shape == (500, 8) and pq.codes.dtype == np.uint8
+    assert np.argmax(pq.scores(query)) == 7
+    # Changed rows are re-encoded without retraining until the data doubles
+    grown = np.vstack([vectors, -vectors[:10]])
+    pq.update(grown, np.arange(500, 510))
+    assert len(pq) == 510 and pq.trained_on == 500
+    assert np.argmax(pq.scores(-vectors[3])) == 503
+    print("✅ Product quantization encodes 64 dims into 8 bytes and grows incrementally")
+
+    with np.errstate(all="raise"):
+        codes, scales = Int8Vectors.encode(np.zeros((2, 4), dtype=np.float32))
+    assert not codes.any() and (scales == 1.0).all()
+
+def test_quantized_store():
+    """Quantized stores re-score to the exact ranking and keep their codes in sync"""
+    chunks = sample_chunks()
+    query = "diagnostic criteria for panic disorder with recurrent attacks"
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings = BagOfWordsEmbeddings(size=512)
+        exact = LocalVectorStore(embeddings, f"{tmp}/exact")
+        IngestPipeline(exact, embeddings, verbose=False).run(chunks)
+        expected = exact.similarity_search_with_score(query, k=5)
+
+        for quantization in ("float16", "int8", "pq"):
+            store = LocalVectorStore(embeddings, f"{tmp}/{quantization}", quantization=quantization)
+            IngestPipeline(store, embeddings, verbose=False).run([Document(**chunk.dict()) for chunk in chunks])
+            results = store.similarity_search_with_score(query, k=5)
+            assert [round(score, 5) for _, score in results] == [round(score, 5) for _, score in expected]
+            assert store._quantizer.nbytes < store._vectors.nbytes
+            print(f"✅ {quantization} store matches exact top-5 after re-scoring "
+                  f"({store._vectors.nbytes / store._quantizer.nbytes:.1f}x smaller)")
+
+        # Reloading rebuilds the codes; deletes and upserts keep them in sync
+        store = LocalVectorStore(embeddings, f"{tmp}/int8", quantization="int8", rescore=0)
+        assert len(store._quantizer) == len(store._ids)
+        top, _ = store.similarity_search_with_score(query, k=1)[0]
+        assert top.page_content == expected[0][0].page_content
+        ids = list(store._id_to_row)
+        store.delete([ids[0]])
+        store.add_texts([query], ids=["question"])
+        assert len(store._quantizer) == len(store._ids)
+        assert store.similarity_search(query, k=1)[0].page_content == query
+        print("✅ Codes rebuilt on load and updated on upsert")
+
+def test_recall_report():
+    """The report compares every quantization against exact float32 search"""
+    embeddings = BagOfWordsEmbeddings(size=512)
+    vectors = np.asarray(embeddings.embed_documents([chunk.page_content for chunk in sample_chunks()]))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[:20] + vectors[20:40]
+    rows = {row["quantization"]: row for row in recall_report(vectors, queries, k=5)}
+    assert rows["none"]["recall"] == 1.0 and rows["none"]["compression"] == 1.0
+    assert rows["int8"]["recall"] >= 0.95 and rows["int8"]["compression"] >= 3.9
+    assert rows["pq + rescore 20"]["recall"] >= rows["pq"]["recall"]
+    print(f"✅ Recall report: int8 {rows['int8']['recall']}, pq {rows['pq']['recall']} "
+          f"-> {rows['pq + rescore 20']['recall']} with re-scoring")
+
+    # A missing or empty store is reported instead of producing an empty table
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in (tmp, os.path.join(tmp, "missing")):
+            try:
+                main([path])
+                raise AssertionError("an unusable store should exit")
+            except SystemExit as e:
+                assert e.code == 1
+
+if __name__ == "__main__":
+    test_codes()
+    test_quantized_store()
+    test_recall_report()
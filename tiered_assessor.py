@@ -0,0 +1,158 @@
+"""
+Tiered information-need assessment: keyword heuristics first, LLM only when unsure
+"""
+import json
+import sys
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional
+
+from agent_tools import INDICATOR_MATCHER, PERSONAL_REFERENCE, score_information_need
+from conversation_state import ConversationState
+
+ASSESSMENT_LABELS = ("ASK_CLARIFYING", "PROVIDE_INFO", "PROVIDE_CAUTIOUS")
+
+
+class TieredAssessor:
+    """Decides clear-cut assessments from keyword heuristics, escalating the rest.
+
+    ``decide`` returns a label when the heuristic is confident:
+
+    - PROVIDE_INFO for general questions (no diagnostic phrasing and no
+      personal reference anywhere in the conversation)
+    - PROVIDE_INFO for diagnostic conversations with 3+ symptoms, a duration
+      and a functional impact
+    - ASK_CLARIFYING for diagnostic conversations with fewer than 2 symptoms
+      and neither duration nor impact
+
+    Otherwise it returns None and the caller asks the LLM, reporting the
+    result through ``record_llm`` so both tiers are counted. Pass the
+    session's ``ConversationState`` to reuse its accumulated keyword signals
+    instead of rescanning the history.
+    """
+
+    def __init__(self):
+        self.counts = {"heuristic": Counter(), "llm": Counter()}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def classify(question: str, history: List[str] = (), state: ConversationState = None) -> Optional[str]:
+        """Heuristic label for a question given earlier user messages, or None if ambiguous"""
+        if state is None:
+            history_hits = INDICATOR_MATCHER.scan_all(history)
+            personal_history = any(PERSONAL_REFERENCE.search(text) for text in history)
+        else:
+            history_hits = state.hits
+            personal_history = state.personal_reference
+        score = score_information_need(question, history, history_hits=history_hits)
+        is_diagnostic = score["is_diagnostic"] or bool(INDICATOR_MATCHER.found(history_hits, "diagnostic"))
+
+        if not is_diagnostic:
+            if personal_history or PERSONAL_REFERENCE.search(question):
+                return None
+            return "PROVIDE_INFO"
+
+        if score["details_count"] >= 3 and score["has_duration"] and score["has_impact"]:
+            return "PROVIDE_INFO"
+        if score["details_count"] < 2 and not score["has_duration"] and not score["has_impact"]:
+            return "ASK_CLARIFYING"
+        return None
+
+    def decide(self, question: str, history: List[str] = (), state: ConversationState = None) -> Optional[str]:
+        """Heuristic tier: return a confident label (and count it) or None to escalate"""
+        label = self.classify(question, history, state)
+        if label is not None:
+            with self._lock:
+                self.counts["heuristic"][label] += 1
+        return label
+
+    def record_llm(self, label: str):
+        """Count an assessment that was escalated to the LLM"""
+        with self._lock:
+            self.counts["llm"][label] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            heuristic = sum(self.counts["heuristic"].values())
+            llm = sum(self.counts["llm"].values())
+            return {
+                "heuristic": heuristic,
+                "llm": llm,
+                "heuristic_rate": heuristic / (heuristic + llm) if heuristic + llm else 0.0,
+                "labels": {tier: dict(counts) for tier, counts in self.counts.items()},
+            }
+
+
+def agreement_report(examples: Iterable[Dict], llm_label: Callable[[Dict], str] = None) -> Dict:
+    """Compare heuristic decisions with LLM labels over a set of examples.
+
+    Each example is ``{"question": str, "history": [user messages], "llm_label": str}``;
+    examples without ``llm_label`` are labelled with ``llm_label(example)``.
+    Reports how many examples the heuristic would decide (coverage) and how
+    often those decisions match the LLM (agreement), overall and per label.
+    """
+    total = decided = agreed = 0
+    by_label = {}
+    disagreements = []
+
+    for example in examples:
+        label = example.get("llm_label") or llm_label(example)
+        history = list(example.get("history", []))
+        heuristic = TieredAssessor.classify(example["question"], history)
+        total += 1
+        if heuristic is None:
+            continue
+
+        decided += 1
+        counts = by_label.setdefault(heuristic, {"decided": 0, "agreed": 0})
+        counts["decided"] += 1
+        if heuristic == label.strip():
+            agreed += 1
+            counts["agreed"] += 1
+        else:
+            disagreements.append({"question": example["question"], "heuristic": heuristic, "llm": label})
+
+    return {
+        "examples": total,
+        "heuristic_decided": decided,
+        "coverage": decided / total if total else 0.0,
+        "agreement": agreed / decided if decided else 0.0,
+        "by_label": by_label,
+        "disagreements": disagreements,
+    }
+
+
+def main():
+    """Agreement report for a JSONL file of examples (labels missing ones with the LLM)"""
+    if len(sys.argv) < 2:
+        print("Usage: python tiered_assessor.py examples.jsonl")
+        sys.exit(1)
+
+    with open(sys.argv[1], encoding="utf-8") as f:
+        examples = [json.loads(line) for line in f if line.strip()]
+
+    chatbot = None
+
+    def llm_label(example):
+        nonlocal chatbot
+        if chatbot is None:
+            from rag_chatbot import DSM5Chatbot
+            chatbot = DSM5Chatbot(heuristic_assessment=False)
+        session_id = "agreement-report"
+        chatbot.clear_memory(session_id)
+        history = chatbot.get_session_history(session_id)
+        for message in example.get("history", []):
+            history.add_user_message(message)
+        return chatbot.assess_information_need(example["question"], session_id)
+
+    report = agreement_report(examples, llm_label)
+    print(f"📊 Heuristic decided {report['heuristic_decided']}/{report['examples']} "
+          f"({report['coverage']:.0%}), agreeing with the LLM on {report['agreement']:.0%}")
+    for label, counts in sorted(report["by_label"].items()):
+        print(f"   {label}: {counts['agreed']}/{counts['decided']} agree")
+    for item in report["disagreements"][:10]:
+        print(f"   ❌ {item['question']!r}: heuristic {item['heuristic']}, LLM {item['llm']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Token counting for embedding and prompt budgets
+"""
+import os
+from functools import lru_cache
+
+# Average characters per token for English text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    """The tiktoken encoding used by the OpenAI models, or None if unavailable.
+
+    tiktoken downloads its encoding files on first use; offline (and without
+    a cached copy) token counts fall back to a characters-per-token estimate.
+    """
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(os.getenv("TOKEN_ENCODING", "cl100k_base"))
+    except Exception as e:
+        print(f"⚠️ tiktoken unavailable ({type(e).__name__}); estimating tokens from characters")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of ``text`` within ``max_tokens``, cut back to a word boundary"""
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding()
+    if encoding is None:
+        prefix = text[:max_tokens * CHARS_PER_TOKEN]
+    else:
+        prefix = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    if len(prefix) < len(text) and " " in prefix:
+        prefix = prefix.rsplit(" ", 1)[0]
+    return prefix
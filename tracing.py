@@ -0,0 +1,315 @@
+"""
+Per-turn tracing of the chat pipeline: stage spans, token counts, histograms and export
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from token_counter import count_tokens
+
+# Trace that spans opened by nested code (e.g. the retriever) are added to
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("chat_trace", default=None)
+
+# Histogram bucket upper bounds in milliseconds (the last bucket is unbounded)
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+class Span:
+    """One timed stage of a chat turn with its attributes (tokens, docs, ...)"""
+
+    def __init__(self, name: str, start: float = None, **attributes: Any):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes = dict(attributes)
+        self.start = time.perf_counter() if start is None else start
+        self.end: Optional[float] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+
+class ChatTrace:
+    """Spans recorded for one chat turn.
+
+    Stages add spans with ``span()`` (or ``tracing.span()`` from nested code
+    while the trace is ``activate``d); LLM calls are recorded by the
+    ``callback_handler()`` passed in the LangChain config, each span named
+    after the call's ``run_name``.
+    """
+
+    def __init__(self, session_id: str = None):
+        self.trace_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.start = time.perf_counter()
+        self.start_ns = time.time_ns()
+        self.end: Optional[float] = None
+        self.spans: List[Span] = []
+        self.attributes: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> Span:
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        span = self.add(Span(name, **attributes))
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.end = time.perf_counter()
+
+    def record(self, name: str, start: float, **attributes: Any) -> Span:
+        """Add a span that began at ``start`` (a ``time.perf_counter()`` value) and ends now"""
+        span = self.add(Span(name, start, **attributes))
+        span.end = time.perf_counter()
+        return span
+
+    def callback_handler(self) -> "TraceCallbackHandler":
+        return TraceCallbackHandler(self)
+
+    def finish(self, **attributes: Any) -> "ChatTrace":
+        self.attributes.update(attributes)
+        self.end = time.perf_counter()
+        return self
+
+    @property
+    def total_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Spans in start order, times in milliseconds relative to the start of the turn"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round(self.total_ms, 3),
+            **self.attributes,
+            "spans": [{
+                "name": span.name,
+                "start_ms": round((span.start - self.start) * 1000, 3),
+                "duration_ms": round(span.duration_ms, 3),
+                **span.attributes,
+            } for span in spans],
+        }
+
+    def to_otlp(self, service_name: str = "dsm5-chatbot") -> Dict[str, Any]:
+        """The trace as an OTLP/JSON ``ExportTraceServiceRequest`` (a root ``chat`` span and its stages)"""
+        def nanos(perf: float) -> str:
+            return str(self.start_ns + int((perf - self.start) * 1e9))
+
+        def attributes(values: Dict[str, Any]) -> List[Dict[str, Any]]:
+            encoded = []
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    encoded.append({"key": key, "value": {"boolValue": value}})
+                elif isinstance(value, int):
+                    encoded.append({"key": key, "value": {"intValue": str(value)}})
+                elif isinstance(value, float):
+                    encoded.append({"key": key, "value": {"doubleValue": value}})
+                elif value is not None:
+                    encoded.append({"key": key, "value": {"stringValue": str(value)}})
+            return encoded
+
+        root_id = uuid.uuid4().hex[:16]
+        end = self.end or time.perf_counter()
+        root_attributes = {"session.id": self.session_id, **self.attributes}
+        spans = [{
+            "traceId": self.trace_id,
+            "spanId": root_id,
+            "name": "chat",
+            "kind": 2,  # SERVER
+            "startTimeUnixNano": nanos(self.start),
+            "endTimeUnixNano": nanos(end),
+            "attributes": attributes(root_attributes),
+        }]
+        with self._lock:
+            stages = list(self.spans)
+        for span in stages:
+            spans.append({
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": root_id,
+                "name": span.name,
+                "kind": 3 if "prompt_tokens" in span.attributes else 1,  # CLIENT for LLM calls, else INTERNAL
+                "startTimeUnixNano": nanos(span.start),
+                "endTimeUnixNano": nanos(span.end or end),
+                "attributes": attributes(span.attributes),
+            })
+        return {"resourceSpans": [{
+            "resource": {"attributes": attributes({"service.name": service_name})},
+            "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}],
+        }]}
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """Records every LLM call in a chain run as a span of the trace, with its
+    prompt and completion tokens (from the provider's usage report when
+    available, else counted with ``token_counter``)"""
+
+    run_inline = True
+
+    def __init__(self, trace: ChatTrace):
+        self.trace = trace
+        self._runs: Dict[UUID, Span] = {}
+
+    def _start(self, run_id: UUID, name: Optional[str], prompt: str):
+        self._runs[run_id] = self.trace.add(Span(name or "llm", prompt_tokens=count_tokens(prompt)))
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID,
+                            name: Optional[str] = None, **kwargs: Any):
+        self._start(run_id, name, "\n".join(str(message.content) for batch in messages for message in batch))
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+                     name: Optional[str] = None, **kwargs: Any):
+        self._start(run_id, name, "\n".join(prompts))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        span = self._runs.pop(run_id, None)
+        if span is None:
+            return
+        span.end = time.perf_counter()
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage.get("prompt_tokens"):
+            span.set(prompt_tokens=usage["prompt_tokens"])
+        completion = usage.get("completion_tokens")
+        if completion is None:
+            completion = count_tokens("".join(generation.text for batch in response.generations for generation in batch))
+        span.set(completion_tokens=completion)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        span = self._runs.pop(run_id, None)
+        if span is not None:
+            span.end = time.perf_counter()
+            span.set(error=type(error).__name__)
+
+
+@contextmanager
+def activate(trace: Optional[ChatTrace]) -> Iterator[Optional[ChatTrace]]:
+    """Make ``trace`` the one ``span()`` records into for the enclosed (non-yielding) block"""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """A span of the active trace; a detached span when no trace is active"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield Span(name, **attributes)
+        return
+    with trace.span(name, **attributes) as current:
+        yield current
+
+
+class TraceHistograms:
+    """In-process aggregate of traced turns: a latency histogram and token
+    totals per span name (and ``total`` per turn), with bucketed percentiles"""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self.traces = 0
+
+    def _stage(self, name: str) -> Dict[str, Any]:
+        if name not in self._stages:
+            self._stages[name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "prompt_tokens": 0,
+                                  "completion_tokens": 0, "counts": [0] * (len(self.buckets_ms) + 1)}
+        return self._stages[name]
+
+    def _observe(self, name: str, ms: float, attributes: Dict[str, Any]):
+        stage = self._stage(name)
+        stage["count"] += 1
+        stage["total_ms"] += ms
+        stage["max_ms"] = max(stage["max_ms"], ms)
+        stage["prompt_tokens"] += attributes.get("prompt_tokens", 0)
+        stage["completion_tokens"] += attributes.get("completion_tokens", 0)
+        bucket = next((i for i, bound in enumerate(self.buckets_ms) if ms <= bound), len(self.buckets_ms))
+        stage["counts"][bucket] += 1
+
+    def record(self, trace: ChatTrace):
+        with self._lock:
+            self.traces += 1
+            self._observe("total", trace.total_ms, {})
+            for span in list(trace.spans):
+                self._observe(span.name, span.duration_ms, span.attributes)
+
+    def _percentile(self, stage: Dict[str, Any], pct: float) -> float:
+        # Upper bound of the bucket holding the percentile (the observed max for the last one)
+        rank, seen = pct / 100 * stage["count"], 0
+        for i, count in enumerate(stage["counts"]):
+            seen += count
+            if seen >= rank and count:
+                return min(self.buckets_ms[i], stage["max_ms"]) if i < len(self.buckets_ms) else stage["max_ms"]
+        return stage["max_ms"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "traces": self.traces,
+                "stages": {name: {
+                    "count": stage["count"],
+                    "mean_ms": round(stage["total_ms"] / stage["count"], 3),
+                    "p50_ms": round(self._percentile(stage, 50), 3),
+                    "p95_ms": round(self._percentile(stage, 95), 3),
+                    "p99_ms": round(self._percentile(stage, 99), 3),
+                    "max_ms": round(stage["max_ms"], 3),
+                    "prompt_tokens": stage["prompt_tokens"],
+                    "completion_tokens": stage["completion_tokens"],
+                    "buckets": dict(zip([*map(str, self.buckets_ms), "inf"], stage["counts"])),
+                } for name, stage in self._stages.items()},
+            }
+
+
+class TraceExporter:
+    """Appends each finished trace as one JSON line: the ``to_dict`` form
+    (``jsonl``) or an OTLP/JSON request (``otlp``) that OpenTelemetry
+    collectors can ingest with their OTLP JSON file receiver"""
+
+    FORMATS = ("jsonl", "otlp")
+
+    def __init__(self, path: str, format: str = "jsonl", service_name: str = "dsm5-chatbot"):
+        if format not in self.FORMATS:
+            raise ValueError(f"Unknown trace export format: {format}")
+        self.path = path
+        self.format = format
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["TraceExporter"]:
+        path = os.getenv("TRACE_EXPORT_PATH")
+        if not path:
+            return None
+        return cls(path, format=os.getenv("TRACE_EXPORT_FORMAT", "jsonl"))
+
+    def export(self, trace: ChatTrace):
+        if self.format == "otlp":
+            record = trace.to_otlp(self.service_name)
+        else:
+            record = {"timestamp": trace.start_ns // 1_000_000, "session_id": trace.session_id, **trace.to_dict()}
+        line = json.dumps(record, default=str)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
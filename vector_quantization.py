@@ -0,0 +1,324 @@
+"""
+Compact in-memory codes for the local vector store: float16, int8 and product quantization
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+QUANTIZATIONS = ("none", "float16", "int8", "pq")
+
+# Rows converted to float32 at a time when scoring codes, bounding the temporary memory
+SCORE_BLOCK_ROWS = 256
+
+
+def _blocked_dot(codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+    # The float32 conversion, not the product, dominates (float16 has no fast path in numpy),
+    # so blocks are converted into one reused buffer and the product written in place
+    query = np.asarray(query, dtype=np.float32)
+    scores = np.empty(len(codes), dtype=np.float32)
+    buffer = np.empty((min(len(codes), SCORE_BLOCK_ROWS),) + codes.shape[1:], dtype=np.float32)
+    for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+        block = codes[start:start + SCORE_BLOCK_ROWS]
+        np.copyto(buffer[:len(block)], block)
+        np.dot(buffer[:len(block)], query, out=scores[start:start + len(block)])
+    return scores
+
+
+class QuantizedVectors:
+    """Codes for the rows of a float32 embedding matrix, scored against a query.
+
+    ``update(vectors, rows)`` re-encodes the given rows of ``vectors`` (all
+    rows if None) and grows the codes to ``len(vectors)``. Arrays are replaced
+    rather than modified, so searches running concurrently see a consistent
+    snapshot.
+    """
+
+    name = "none"
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def update(self, vectors: np.ndarray, rows: Optional[np.ndarray] = None):
+        raise NotImplementedError
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Approximate inner products of every row with ``query``"""
+        raise NotImplementedError
+
+    @property
+    def nbytes(self) -> int:
+        raise NotImplementedError
+
+    @staticmethod
+    def _grow(codes: np.ndarray, n_rows: int) -> np.ndarray:
+        grown = np.zeros((n_rows,) + codes.shape[1:], dtype=codes.dtype)
+        grown[:min(len(codes), n_rows)] = codes[:n_rows]
+        return grown
+
+
+class Float16Vectors(QuantizedVectors):
+    """Half-precision copies of the embeddings (2 bytes per dimension)"""
+
+    name = "float16"
+
+    def __init__(self):
+        self.codes = np.zeros((0, 0), dtype=np.float16)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def update(self, vectors: np.ndarray, rows: Optional[np.ndarray] = None):
+        if rows is None or len(self.codes) == 0:
+            self.codes = np.asarray(vectors, dtype=np.float16)
+            return
+        codes = self._grow(self.codes, len(vectors))
+        codes[rows] = vectors[rows]
+        self.codes = codes
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        return _blocked_dot(self.codes, query)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes
+
+
+class Int8Vectors(QuantizedVectors):
+    """Scalar quantization: int8 codes with one float32 scale per vector (~1 byte per dimension)"""
+
+    name = "int8"
+
+    def __init__(self):
+        self.codes = np.zeros((0, 0), dtype=np.int8)
+        self.scales = np.zeros(0, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @staticmethod
+    def encode(vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.zeros(0, dtype=np.float32)
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def update(self, vectors: np.ndarray, rows: Optional[np.ndarray] = None):
+        if rows is None or len(self.codes) == 0:
+            self.codes, self.scales = self.encode(vectors)
+            return
+        codes, scales = self._grow(self.codes, len(vectors)), self._grow(self.scales, len(vectors))
+        codes[rows], scales[rows] = self.encode(vectors[rows])
+        self.codes, self.scales = codes, scales
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        return _blocked_dot(self.codes, query) * self.scales
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+
+class ProductQuantizedVectors(QuantizedVectors):
+    """Product quantization: each vector split into ``subspaces`` parts, each stored
+    as the index of its nearest of up to 256 k-means centroids (1 byte per part).
+
+    Queries are scored by table lookup (asymmetric distance): the query part is
+    multiplied with every centroid once, then each row sums its parts' entries.
+    The codebooks are retrained on all rows whenever the store has doubled in
+    size since the last training, so incremental ingestion stays accurate.
+    """
+
+    name = "pq"
+
+    def __init__(self, subspaces: int = 96, iterations: int = 12, train_size: int = 20_000, seed: int = 0):
+        self.subspaces = subspaces
+        self.iterations = iterations
+        self.train_size = train_size
+        self.seed = seed
+        self.codebooks: Optional[np.ndarray] = None  # (subspaces, centroids, part_dim)
+        self.codes = np.zeros((0, subspaces), dtype=np.uint8)
+        self.trained_on = 0
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def _parts(self, vectors: np.ndarray) -> np.ndarray:
+        """(rows, subspaces, part_dim) view of the vectors, zero-padded to a multiple of ``subspaces``"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        pad = (-vectors.shape[1]) % self.subspaces
+        if pad:
+            vectors = np.pad(vectors, ((0, 0), (0, pad)))
+        return vectors.reshape(len(vectors), self.subspaces, -1)
+
+    def _nearest(self, parts: np.ndarray) -> np.ndarray:
+        # argmin ||x - c||^2 = argmax (x . c - ||c||^2 / 2), one batched matmul per subspace
+        products = np.matmul(parts.transpose(1, 0, 2), self.codebooks.transpose(0, 2, 1))
+        products -= 0.5 * np.einsum("skd,skd->sk", self.codebooks, self.codebooks)[:, None, :]
+        return products.argmax(axis=2).T.astype(np.uint8)
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        parts = self._parts(vectors)
+        codes = np.empty((len(parts), self.subspaces), dtype=np.uint8)
+        for start in range(0, len(parts), SCORE_BLOCK_ROWS):
+            codes[start:start + SCORE_BLOCK_ROWS] = self._nearest(parts[start:start + SCORE_BLOCK_ROWS])
+        return codes
+
+    def train(self, vectors: np.ndarray):
+        """k-means codebooks per subspace, on a sample of at most ``train_size`` rows"""
+        rng = np.random.default_rng(self.seed)
+        sample = np.asarray(vectors, dtype=np.float32)
+        if len(sample) > self.train_size:
+            sample = sample[np.sort(rng.choice(len(sample), self.train_size, replace=False))]
+        parts = self._parts(sample)
+        centroids = min(256, len(parts))
+        self.codebooks = parts[rng.choice(len(parts), centroids, replace=False)].transpose(1, 0, 2).copy()
+        for _ in range(self.iterations):
+            assignment = self._nearest(parts)  # (rows, subspaces)
+            for s in range(self.subspaces):
+                counts = np.bincount(assignment[:, s], minlength=centroids)
+                sums = np.zeros((centroids, parts.shape[2]), dtype=np.float32)
+                np.add.at(sums, assignment[:, s], parts[:, s])
+                filled = counts > 0
+                self.codebooks[s, filled] = sums[filled] / counts[filled, None]
+        self.trained_on = len(vectors)
+
+    def update(self, vectors: np.ndarray, rows: Optional[np.ndarray] = None):
+        if len(vectors) == 0:
+            return
+        if self.codebooks is None or len(vectors) >= 2 * self.trained_on:
+            self.train(vectors)
+            rows = None
+        if rows is None or len(self.codes) == 0:
+            self.codes = self._encode(vectors)
+            return
+        codes = self._grow(self.codes, len(vectors))
+        codes[rows] = self._encode(vectors[rows])
+        self.codes = codes
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        table = np.einsum("sd,skd->sk", self._parts(query[None, :])[0], self.codebooks)
+        scores = np.zeros(len(self.codes), dtype=np.float32)
+        for s in range(self.subspaces):
+            scores += table[s, self.codes[:, s]]
+        return scores
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.codebooks.nbytes if self.codebooks is not None else 0)
+
+
+def create_quantizer(quantization: str) -> Optional[QuantizedVectors]:
+    """Codes for a ``LocalVectorStore`` (``none`` keeps searching the float32 matrix)"""
+    if quantization == "none":
+        return None
+    if quantization == "float16":
+        return Float16Vectors()
+    if quantization == "int8":
+        return Int8Vectors()
+    if quantization == "pq":
+        return ProductQuantizedVectors()
+    raise ValueError(f"Unknown vector quantization: {quantization} (expected one of {', '.join(QUANTIZATIONS)})")
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def recall_report(vectors: np.ndarray, queries: np.ndarray, k: int = 5, rescore: int = 4) -> List[Dict[str, Any]]:
+    """recall@k against exact float32 search, memory and query time per quantization.
+
+    ``vectors`` must be L2-normalized (as stored); each quantization is
+    measured searching its codes alone and with the top ``rescore * k``
+    candidates re-scored in float32.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    k = min(k, len(vectors))
+    exact_scores = [vectors @ query for query in queries]
+    # Rows tied with the k-th exact score count as hits, so ties don't read as misses
+    cutoffs = [np.partition(-scores, k - 1)[k - 1] * -1 - 1e-6 for scores in exact_scores]
+
+    rows = []
+    for quantization in QUANTIZATIONS:
+        quantizer = create_quantizer(quantization)
+        if quantizer is not None:
+            quantizer.update(vectors)
+        nbytes = quantizer.nbytes if quantizer is not None else vectors.nbytes
+        for factor in ((0,) if quantizer is None else (0, rescore)):
+            hits, start = 0, time.perf_counter()
+            for query, exact, cutoff in zip(queries, exact_scores, cutoffs):
+                scores = quantizer.scores(query) if quantizer is not None else vectors @ query
+                if factor:
+                    candidates = _top_k(scores, min(len(vectors), factor * k))
+                    top = candidates[_top_k(vectors[candidates] @ query, k)]
+                else:
+                    top = _top_k(scores, k)
+                hits += int((exact[top] >= cutoff).sum())
+            rows.append({
+                "quantization": quantization if not factor else f"{quantization} + rescore {factor * k}",
+                "recall": round(hits / (len(queries) * k), 4) if len(queries) else 0.0,
+                "bytes_per_vector": round(nbytes / len(vectors), 1),
+                "memory_mb": round(nbytes / 2 ** 20, 2),
+                "compression": round(vectors.nbytes / nbytes, 1),
+                "query_ms": round((time.perf_counter() - start) * 1000 / max(1, len(queries)), 3),
+            })
+    return rows
+
+
+def print_recall_report(rows: List[Dict[str, Any]], n_vectors: int, dim: int, k: int):
+    print(f"📐 {n_vectors:,} vectors x {dim} dims, recall@{k} vs exact float32 search")
+    print(f"{'quantization':>22} {'recall':>7} {'bytes/vec':>10} {'MB':>8} {'ratio':>6} {'ms/query':>9}")
+    for row in rows:
+        print(f"{row['quantization']:>22} {row['recall']:>7.3f} {row['bytes_per_vector']:>10} "
+              f"{row['memory_mb']:>8} {row['compression']:>5}x {row['query_ms']:>9}")
+
+
+def main(argv: Optional[List[str]] = None):
+    """Report for a local vector store directory, or the synthetic DSM-5 chunk set"""
+    parser = argparse.ArgumentParser(description="recall@k, memory and query time of each vector quantization")
+    parser.add_argument("store", nargs="?", help="Local vector store directory (default: synthetic DSM-5 chunks)")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    if args.store:
+        from local_vector_store import LocalVectorStore
+
+        if not os.path.isdir(args.store):
+            print(f"❌ No vector store at {args.store}")
+            sys.exit(1)
+        store = LocalVectorStore(None, args.store)
+        vectors = np.asarray(store._vectors)[store._alive]
+        if not len(vectors):
+            print(f"❌ The vector store at {args.store} is empty")
+            sys.exit(1)
+        # Queries between two chunks, so they don't coincide with a stored vector
+        pairs = rng.integers(0, len(vectors), size=(min(200, len(vectors)), 2))
+        queries = vectors[pairs[:, 0]] + vectors[pairs[:, 1]]
+    else:
+        from dsm5_splitter import DSM5StructureSplitter
+        from fakes import SAMPLE_DSM5_DISORDERS, BagOfWordsEmbeddings, sample_dsm5_pages
+
+        print("ℹ️ No store given; using the synthetic DSM-5 chunk set with bag-of-words embeddings")
+        embeddings = BagOfWordsEmbeddings(size=1536)
+        # Several seeds of the sample corpus, about the chunk count of the full manual
+        chunks = [chunk for seed in range(30)
+                  for chunk in DSM5StructureSplitter().split_documents(sample_dsm5_pages(seed=seed))]
+        vectors = np.asarray(embeddings.embed_documents([chunk.page_content for chunk in chunks]), dtype=np.float32)
+        questions = [f"{template} {name}" for _, name, _ in SAMPLE_DSM5_DISORDERS
+                     for template in ("diagnostic criteria for", "prevalence and course of", "symptoms of")]
+        queries = np.asarray(embeddings.embed_documents(questions), dtype=np.float32)
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1.0, norms)
+    print_recall_report(recall_report(vectors, queries, k=args.k), len(vectors), vectors.shape[1], args.k)
+
+
+if __name__ == "__main__":
+    main()